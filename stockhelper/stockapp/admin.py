@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Card, Portfolio, Stock, User
+from .models import Card, Company, DailyBar, Portfolio, Stock, Trade, User
 
 
 class CustomUserAdmin(admin.ModelAdmin):
@@ -10,6 +10,9 @@ class CustomUserAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Card)
+admin.site.register(Company)
+admin.site.register(DailyBar)
 admin.site.register(Portfolio)
 admin.site.register(Stock)
+admin.site.register(Trade)
 admin.site.register(User, CustomUserAdmin)
@@ -0,0 +1,105 @@
+from django.core.cache import cache
+
+from datetime import timedelta
+import math
+import numpy as np
+
+SHORT_TERM_LENGTH = int((52 / 12) * 5)  # average # of weekdays per month
+LONG_TERM_LENGTH = 52 * 5  # average # of weekdays per year
+# Calendar days that hold LONG_TERM_LENGTH trading days, with 3 weeks to spare for market holidays
+LONG_TERM_SPAN = timedelta(days=LONG_TERM_LENGTH * 7 // 5 + 21)
+
+
+def normal_prob(x, mu, sigma):
+    # Calculate the x value of a normal curve given the mean and standard deviation
+    return np.exp(-((x - mu) ** 2) / (2 * sigma ** 2)) / (sigma * np.sqrt(2 * np.pi))
+
+
+def get_stats(prices):
+    # Get the statistical properties of the price array
+    n = len(prices)
+    mean = prices.mean()
+    variance = prices.var(ddof=1)  # sample variance
+    standard_deviation = np.sqrt(variance)
+    standard_error = standard_deviation / np.sqrt(n)
+    # Sort the array and find the first and third quartiles
+    sorted_prices = np.sort(prices)
+    q1 = sorted_prices[n // 4]
+    q3 = sorted_prices[min(math.ceil(n * 3 / 4), n - 1)]
+
+    return {
+        "mean": float(mean),
+        "variance": float(variance),
+        "standardDeviation": float(standard_deviation),
+        "standardError": float(standard_error),
+        "min": float(sorted_prices[0]),
+        "max": float(sorted_prices[-1]),
+        "iqr": float(q3 - q1)
+    }
+
+
+def bayes_prob(predicted_price, past_prices, stats):
+    """
+    p(v|m) = prod(p(mi|v) * p(v), for i in m)
+    p(mi|v): mi is x, v is mu, and se is sigma
+    p(v): v is x, mu is mu, and sigma is sigma
+    """
+    return float(np.prod(
+        normal_prob(past_prices, predicted_price, stats["standardError"]) *
+        normal_prob(predicted_price, stats["mean"], stats["standardDeviation"])
+    ))
+
+
+def predict_price(prices):
+    # Perform linear regression to find the best line of fit given the data points
+    x = np.arange(len(prices))
+    slope, intercept = np.polyfit(x, prices, 1)
+    line = slope * x + intercept
+    # Predict the price for the next day
+    prediction = slope * len(prices) + intercept
+    return float(slope), float(intercept), line, float(prediction)
+
+
+def analyze_window(history, length):
+    # history is sorted from newest to oldest, but the stats are displayed from oldest to newest
+    window = history[:length][::-1]
+    dates = [bar["date"] for bar in window]
+    prices = np.array([bar["close"] for bar in window], dtype=float)
+
+    stats = get_stats(prices)
+    slope, intercept, line, prediction = predict_price(prices)
+
+    return {
+        "dates": dates,
+        "prices": prices.tolist(),
+        **stats,
+        "probability": bayes_prob(stats["mean"], prices, stats),
+        "slope": slope,
+        "intercept": intercept,
+        "line": line.tolist(),
+        "prediction": prediction
+    }
+
+
+def analyze(history):
+    # Compute the short-term and long-term stats of the daily history (newest first)
+    # Raises a ValueError if there isn't enough history to compute the variance
+    if len(history) < 2:
+        raise ValueError("Not enough price history to analyze")
+
+    return {
+        "shortTerm": analyze_window(history, SHORT_TERM_LENGTH),
+        "longTerm": analyze_window(history, LONG_TERM_LENGTH)
+    }
+
+
+def get_analysis(ticker, history):
+    # The stats only change when a new daily bar comes in, so compute them once per trading day
+    key = f"analytics:{ticker.upper()}:{history[0]['date'] if history else None}"
+    analysis = cache.get(key)
+
+    if analysis is None:
+        analysis = analyze(history)
+        cache.set(key, analysis, timeout=60 * 60 * 24)
+
+    return analysis
@@ -1,18 +1,42 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from decimal import Decimal
 import dotenv
+import hashlib
 import os
 from pathlib import Path
 import requests
-from time import sleep
+from threading import Lock, Thread
+
+from . import metrics, timing, transport
+from .ratelimit import RateLimiter
+from time import monotonic, sleep
+from urllib.parse import urlencode, urlsplit
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 dotenv_file = os.path.join(BASE_DIR, ".env")
 if os.path.isfile(dotenv_file):
     dotenv.load_dotenv(dotenv_file)
 
+
+def get_api_key():
+    # Only optional when replaying recorded responses, FMP would reject every call without it
+    if not os.environ.get("FMP_API_KEY") and settings.FMP_TRANSPORT != "replay":
+        raise ImproperlyConfigured("FMP_API_KEY must be set unless FMP_TRANSPORT is replay")
+
+    return os.environ.get("FMP_API_KEY", "")
+
+
 # Data provided by Financial Modeling Prep: https://site.financialmodelingprep.com/developer/docs
-API_KEY = os.environ["FMP_API_KEY"]
-FMP = "https://financialmodelingprep.com/stable"
-RETRY_LIMIT = 100
+API_KEY = get_api_key()
+# Can be pointed at another server, such as the fake_fmp command when load testing
+FMP = os.environ.get("FMP_BASE_URL", "https://financialmodelingprep.com/stable").rstrip("/")
+# Returned instead of calling FMP when the shared quota is used up, views can render it like any
+# other FMP error
+RATE_LIMITED = {"Error Message": "Rate limit reached. Please try again in a few seconds."}
 
 # Source: https://site.financialmodelingprep.com/developer/docs#historical-price-eod-full
 # Excluded delisted symbols, see comment:
@@ -102,32 +126,222 @@ FREE_TIER_SYMBOLS = {
 }
 
 
-def get_request(req_str, retry=0):
-    req = requests.get(req_str)
+# Reuse the same connections to FMP instead of doing a new TCP + TLS handshake for every call
+_session = None
+_session_lock = Lock()
+
+
+def get_session():
+    global _session
+
+    # Double-checked locking so only one session is created across all the threads in a worker
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Depending on FMP_TRANSPORT, responses can also be recorded or replayed
+                adapter = transport.get_adapter(
+                    settings.FMP_TRANSPORT, settings.FMP_RECORDINGS, FMP, pool_connections=1,
+                    pool_maxsize=settings.FMP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Accept": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive"
+                })
+                _session = session
+
+    return _session
+
+
+@receiver(setting_changed)
+def reset_session(setting, **kwargs):
+    # Create a new session if a test changes how FMP is called
+    global _session
+
+    if setting in ["FMP_TRANSPORT", "FMP_RECORDINGS", "FMP_POOL_SIZE"]:
+        with _session_lock:
+            _session = None
+
+
+def get_rate_limiter():
+    # Every worker shares the same bucket, so the quota is tracked for the whole app
+    return RateLimiter("fmp:ratelimit", settings.FMP_RATE_LIMIT["calls"],
+                       settings.FMP_RATE_LIMIT["period"], settings.FMP_RATE_LIMIT["burst"])
+
+
+def is_rate_limited(json):
+    return json == RATE_LIMITED
+
+
+def get_endpoint(req_str):
+    # e.g. https://financialmodelingprep.com/stable/historical-price-eod/full?... -->
+    # historical-price-eod/full
+    return urlsplit(req_str).path.removeprefix(urlsplit(FMP).path).strip("/")
+
+
+def get_cache_key(req_str):
+    # Strip the API key and sort the parameters so equivalent URLs share the same entry
+    endpoint = get_endpoint(req_str)
+    params = transport.get_params(req_str)
+    digest = hashlib.sha256(urlencode(params).encode()).hexdigest()
+    # Include the ticker's generation so all of its entries can be invalidated at once
+    symbol = dict(params).get("symbol")
+
+    if symbol is None:
+        return f"fmp:{endpoint}:{digest}"
+
+    generation = cache.get(f"fmp:generation:{symbol.upper()}", 0)
+    return f"fmp:{endpoint}:{symbol.upper()}:{generation}:{digest}"
+
+
+def is_cacheable(json):
+    # Only cache successful responses, not error messages or rate limit warnings
+    if isinstance(json, list):
+        return True
+
+    return isinstance(json, dict) and "Error Message" not in json and \
+        "X-Rate-Limit-Retry-After-Milliseconds" not in json
+
+
+def get_cache_stats():
+    # Count how many FMP calls were saved by the cache for each endpoint
+    stats = {}
+
+    for endpoint in settings.FMP_CACHE_TTL:
+        hits = cache.get(f"fmp:stats:{endpoint}:hits", 0)
+        misses = cache.get(f"fmp:stats:{endpoint}:misses", 0)
+        total = hits + misses
+        stats[endpoint] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total > 0 else 0
+        }
+
+    return stats
+
+
+def invalidate_ticker(ticker):
+    # Bump the ticker's generation so any cached profiles or histories become unreachable
+    # (they'll be evicted once their TTL expires)
+    metrics.increment(f"fmp:generation:{ticker.upper()}")
+
+
+def get_cached_request(req_str, max_wait=None):
+    # Check if another request (from any worker) already fetched this URL recently
+    endpoint = get_endpoint(req_str)
+    timeout = settings.FMP_CACHE_TTL.get(endpoint, 0)
+
+    if timeout <= 0:
+        return get_request(req_str, max_wait)
 
-    try:
-        json = req.json()
-    except requests.exceptions.JSONDecodeError:
-        return req.text
+    key = get_cache_key(req_str)
+    stale_timeout = settings.FMP_CACHE_STALE.get(endpoint, 0)
+    entries = cache.get_many([key, f"{key}:fresh"])
+    json = entries.get(key)
+
+    if json is not None:
+        metrics.increment(f"fmp:stats:{endpoint}:hits")
+        timing.record("cache_hit")
+
+        # The entry is past its TTL, so serve it as is and refresh it without making anyone wait
+        if stale_timeout > 0 and f"{key}:fresh" not in entries:
+            revalidate(req_str, key, timeout, stale_timeout)
+
+        return json
+
+    metrics.increment(f"fmp:stats:{endpoint}:misses")
+    timing.record("cache_miss")
+    json = get_request(req_str, max_wait)
+    set_cached(key, json, timeout, stale_timeout)
+    return json
+
+
+def set_cached(key, json, timeout, stale_timeout=0):
+    if not is_cacheable(json):
+        return
+
+    # Keep the entry around for the stale window after it stops being fresh
+    cache.set(key, json, timeout=timeout + stale_timeout)
+
+    if stale_timeout > 0:
+        cache.set(f"{key}:fresh", True, timeout=timeout)
+
+
+def revalidate(req_str, key, timeout, stale_timeout):
+    # Only one thread (in any worker) refreshes an entry at a time
+    lock = f"{key}:refreshing"
+
+    if not cache.add(lock, True, timeout=settings.FMP_TIMEOUT + settings.FMP_RATE_LIMIT_WAIT):
+        return
+
+    def refresh():
+        try:
+            set_cached(key, get_request(req_str), timeout, stale_timeout)
+        finally:
+            cache.delete(lock)
+
+    Thread(target=refresh, daemon=True).start()
+
+
+def get_request(req_str, max_wait=None):
+    # Wait up to max_wait seconds for a free slot in the quota, or fail fast if max_wait is 0
+    if max_wait is None:
+        max_wait = settings.FMP_RATE_LIMIT_WAIT
+
+    limiter = get_rate_limiter()
+    deadline = monotonic() + max_wait
+    endpoint = get_endpoint(req_str)
+
+    while True:
+        wait = limiter.reserve(max(deadline - monotonic(), 0))
+
+        if wait is None:
+            metrics.record_rate_limited(endpoint)
+            return RATE_LIMITED
+
+        if wait > 0:
+            metrics.record_sleep(endpoint, wait)
+            sleep(wait)
+
+        start = monotonic()
+
+        try:
+            req = get_session().get(req_str, timeout=settings.FMP_TIMEOUT)
+        except requests.exceptions.RequestException:
+            metrics.observe_request(endpoint, None, monotonic() - start)
+            raise
+
+        duration = monotonic() - start
+        timing.record("fmp", duration)
+        metrics.observe_request(endpoint, req.status_code, duration)
+
+        try:
+            json = req.json()
+        except requests.exceptions.JSONDecodeError:
+            metrics.record_json_error(endpoint)
+            return req.text
+
+        # FMP imposes a rate limit, so check to see if an error occurred
+        if not (isinstance(json, dict) and "X-Rate-Limit-Retry-After-Milliseconds" in json):
+            return json
 
-    # FMP imposes a rate limit, so check to see if an error occurred
-    # Give up after RETRY_LIMIT attempts
-    if retry < RETRY_LIMIT and isinstance(json, dict) and "X-Rate-Limit-Retry-After-Milliseconds" in json:
         # Use X-Rate-Limit-Retry-After-Seconds and X-Rate-Limit-Retry-After-Milliseconds to
-        # determine how long to sleep for before retrying
+        # hold back every worker, then try again if there's still time before the deadline
         secs = json.get("X-Rate-Limit-Retry-After-Seconds", 0)
         msecs = json["X-Rate-Limit-Retry-After-Milliseconds"]
-        sleep(secs + msecs / 1000)
-        return get_request(req_str, retry + 1)
+        limiter.penalize(secs + msecs / 1000)
+        metrics.record_retry(endpoint)
 
-    return json
 
-
-def get_stocks(form_data):
+def get_stocks(form_data, max_wait=None):
     # Collect the form data
     country = form_data["country"]
     price_relation = "priceMoreThan" if form_data["price_relation"] == ">" else "priceLowerThan"
-    price_value = form_data["price_value"]
+    # Format the price the same way no matter how it was entered (e.g. 100, 100.0, and 100.00)
+    # so equivalent searches share the same cache entry
+    price_value = f"{Decimal(str(form_data['price_value'])).normalize():f}"
     sector = form_data["sector"]
     exchange = form_data["exchange"]
 
@@ -144,12 +358,39 @@ def get_stocks(form_data):
     elif exchange != "Any":
         search_str += f"&exchange={exchange}"
 
-    return get_request(search_str)
+    # e.g. market_cap_min --> marketCapMoreThan
+    for name, param in [("market_cap", "marketCap"), ("beta", "beta"), ("volume", "volume")]:
+        if form_data.get(f"{name}_min") is not None:
+            search_str += f"&{param}MoreThan={form_data[f'{name}_min']}"
+        if form_data.get(f"{name}_max") is not None:
+            search_str += f"&{param}LowerThan={form_data[f'{name}_max']}"
+
+    return get_cached_request(search_str, max_wait)
+
+
+def get_company_universe(limit=10000, max_wait=None):
+    # Download every actively trading company for the local screener (too big to cache)
+    return get_request(f"{FMP}/company-screener?apikey={API_KEY}&isActivelyTrading=true"
+                       f"&limit={limit}", max_wait)
+
+
+def get_company_profile(ticker, max_wait=None):
+    return get_cached_request(f"{FMP}/profile?apikey={API_KEY}&symbol={ticker}", max_wait)
+
+
+def get_stock_history(ticker, start=None, end=None, max_wait=None):
+    # Only download the bars between start and end (inclusive dates) if given
+    history_str = f"{FMP}/historical-price-eod/full?apikey={API_KEY}&symbol={ticker}"
 
+    if start is not None:
+        history_str += f"&from={start.isoformat()}"
+    if end is not None:
+        history_str += f"&to={end.isoformat()}"
 
-def get_company_profile(ticker):
-    return get_request(f"{FMP}/profile?apikey={API_KEY}&symbol={ticker}")
+    return get_cached_request(history_str, max_wait)
 
 
-def get_stock_history(ticker):
-    return get_request(f"{FMP}/historical-price-eod/full?apikey={API_KEY}&symbol={ticker}")
+def get_quotes(tickers, max_wait=None):
+    # Get the latest quotes for multiple tickers in one call (sorted so the cache key is stable)
+    symbols = ",".join(sorted(tickers))
+    return get_cached_request(f"{FMP}/batch-quote?apikey={API_KEY}&symbols={symbols}", max_wait)
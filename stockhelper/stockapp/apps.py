@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class StockappConfig(AppConfig):
     name = 'stockapp'
+
+    def ready(self):
+        # Register the system checks and the signal handlers that keep the glossary up to date and
+        # time the queries of every connection, even ones opened before the middleware is loaded
+        from . import checks, glossary, timing  # noqa: F401
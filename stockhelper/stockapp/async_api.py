@@ -0,0 +1,25 @@
+from asgiref.sync import sync_to_async
+
+from . import api
+
+
+# Each call runs the synchronous client (with its pooled session, cache, and rate limiter) in a
+# thread pool, so awaiting a slow FMP response doesn't block the event loop or other requests
+def run_in_thread(func, *args, **kwargs):
+    return sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
+
+async def get_stocks(form_data, max_wait=None):
+    return await run_in_thread(api.get_stocks, form_data, max_wait)
+
+
+async def get_company_profile(ticker, max_wait=None):
+    return await run_in_thread(api.get_company_profile, ticker, max_wait)
+
+
+async def get_stock_history(ticker, start=None, end=None, max_wait=None):
+    return await run_in_thread(api.get_stock_history, ticker, start, end, max_wait)
+
+
+async def get_quotes(tickers, max_wait=None):
+    return await run_in_thread(api.get_quotes, tickers, max_wait)
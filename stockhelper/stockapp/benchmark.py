@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+import math
+from queue import Queue
+import re
+import requests
+from threading import local
+from time import perf_counter
+
+VIEWS = ["home", "screener", "detail", "portfolio", "price"]
+SCREENER_FORM = {"country": "US", "price_relation": ">", "price_value": "100", "sector": "Any",
+                 "exchange": "Any"}
+
+
+def get_percentile(durations, percent):
+    # Nearest-rank percentile of a sorted list
+    if not durations:
+        return 0
+
+    return durations[max(math.ceil(percent / 100 * len(durations)) - 1, 0)]
+
+
+def get_query_count(response):
+    # Read the number of queries from the Server-Timing header, e.g. db;desc="3 queries";dur=1.2
+    match = re.search(r'db;desc="(\d+) queries"', response.headers.get("Server-Timing", ""))
+    return int(match.group(1)) if match is not None else 0
+
+
+def summarize(samples, elapsed):
+    # samples are (duration in seconds, # of queries, succeeded) for each request
+    durations = sorted(duration for duration, _, _ in samples)
+
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, succeeded in samples if not succeeded),
+        "throughput": len(samples) / elapsed if elapsed > 0 else 0,
+        "p50": get_percentile(durations, 50) * 1000,
+        "p95": get_percentile(durations, 95) * 1000,
+        "p99": get_percentile(durations, 99) * 1000,
+        "queries": sum(queries for _, queries, _ in samples) / len(samples) if samples else 0
+    }
+
+
+class Benchmark:
+    """
+    Drives the app's views over HTTP from several threads at once. Each thread uses its own
+    logged in session, like separate browser tabs of the same user.
+    """
+
+    def __init__(self, base_url, username, password, ticker="AAPL"):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.ticker = ticker
+
+    def create_session(self):
+        session = requests.Session()
+        self.login(session)
+        return session
+
+    def post(self, session, path, **kwargs):
+        # Pass the CSRF token along like the forms and fetch() calls do
+        return session.post(f"{self.base_url}{path}", headers={
+            "X-CSRFToken": session.cookies.get("csrftoken", ""),
+            "Referer": f"{self.base_url}{path}"
+        }, **kwargs)
+
+    def login(self, session):
+        session.get(f"{self.base_url}/accounts/login/")
+        self.post(session, "/accounts/login/", data={
+            "username": self.username, "password": self.password})
+
+        if "sessionid" not in session.cookies:
+            raise ValueError(f"Couldn't log in as {self.username}")
+
+        # The session cookie is only sent over HTTPS, but the app is usually tested over HTTP
+        for cookie in session.cookies:
+            cookie.secure = False
+
+    def prepare(self):
+        # The price API only works for stocks in the portfolio, so buy a share first
+        response = self.post(self.create_session(), "/stockapp/api/orders", json={"orders": [{
+            "ticker": self.ticker, "isBuying": True, "shares": 1, "price": 1, "name": self.ticker,
+            "change": 0
+        }]}, allow_redirects=False)
+
+        if response.status_code != 200:
+            raise ValueError(f"Couldn't buy {self.ticker}: {response.text}")
+
+    def request(self, session, view):
+        start = perf_counter()
+
+        if view == "home":
+            response = session.get(f"{self.base_url}/stockapp/")
+        elif view == "screener":
+            response = self.post(session, "/stockapp/screener", data=SCREENER_FORM)
+        elif view == "detail":
+            response = session.get(f"{self.base_url}/stockapp/details/{self.ticker}")
+        elif view == "portfolio":
+            response = session.get(f"{self.base_url}/stockapp/portfolio")
+        else:
+            response = session.get(f"{self.base_url}/stockapp/api/price/{self.ticker}")
+
+        duration = perf_counter() - start
+        # Count the queries of any redirects too
+        queries = sum(get_query_count(hop) for hop in response.history + [response])
+        # An error or a redirect to the login page means the request failed
+        succeeded = response.ok and "/accounts/login/" not in response.url
+
+        if succeeded and view == "price":
+            succeeded = "error" not in response.json()
+
+        return duration, queries, succeeded
+
+    def run(self, view, count, concurrency):
+        # Make count requests to the view from concurrency threads and summarize them
+        # Log in one at a time before timing anything, then each thread takes a session
+        sessions = Queue()
+
+        for _ in range(concurrency):
+            sessions.put(self.create_session())
+
+        thread_data = local()
+
+        def request(_):
+            if not hasattr(thread_data, "session"):
+                thread_data.session = sessions.get_nowait()
+
+            return self.request(thread_data.session, view)
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            start = perf_counter()
+            samples = list(executor.map(request, range(count)))
+            elapsed = perf_counter() - start
+
+        return summarize(samples, elapsed)
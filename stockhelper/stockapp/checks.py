@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends that don't share an atomic add() and incr() between processes
+NON_ATOMIC_BACKENDS = [
+    "django.core.cache.backends.db.DatabaseCache",
+    "django.core.cache.backends.filebased.FileBasedCache",
+]
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # The FMP rate limit locks its bucket with cache.add() and the metrics count with cache.incr(),
+    # which race between workers when the backend gets the value and sets it in separate steps
+    if settings.CACHES["default"]["BACKEND"] in NON_ATOMIC_BACKENDS:
+        return [Warning(
+            "The default cache can't share the FMP rate limit and metrics between workers",
+            hint="Use a cache with an atomic add() and incr(), such as RedisCache.",
+            id="stockapp.W001",
+        )]
+
+    return []
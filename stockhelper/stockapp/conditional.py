@@ -0,0 +1,47 @@
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+import hashlib
+import json
+
+# How long shared caches can keep a page that's the same for every anonymous user
+PUBLIC_MAX_AGE = 60
+
+
+def get_etag(request, user, *versions):
+    # Hash the versions of the data a response is built from, along with who it's for
+    # The CSRF cookie is included since pages embed tokens that only work with the same cookie
+    parts = [user.pk, request.META.get("CSRF_COOKIE", ""), *versions]
+    return f'"{hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]}"'
+
+
+def set_validators(response, etag, last_modified=None, public=False):
+    response.headers["ETag"] = etag
+
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+
+    if public:
+        patch_cache_control(response, public=True, max_age=PUBLIC_MAX_AGE)
+    else:
+        # Only the user's browser can keep it, and it has to check that it's current each time
+        patch_cache_control(response, private=True, no_cache=True)
+
+    # The content depends on who's logged in
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+def get_not_modified(request, etag, last_modified=None, public=False):
+    # Return a 304 if the client's copy is still current, otherwise None so the view responds
+    if request.method not in ["GET", "HEAD"]:
+        return None
+
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None)
+
+    if response is None:
+        return None
+
+    return set_validators(response, etag, last_modified, public)
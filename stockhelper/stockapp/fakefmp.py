@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.utils import timezone
+
+from datetime import date, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+from stockapp.transport import RecordingStore
+from threading import Lock
+from time import monotonic, sleep
+from urllib.parse import parse_qsl, urlsplit
+
+# e.g. priceMoreThan --> price
+SCREENER_RANGES = ["price", "marketCap", "beta", "volume"]
+
+
+class FakeFmp:
+    """
+    A stand-in for FMP that answers from the recorded responses in FMP_RECORDINGS, so the app can
+    be load tested without using up the real quota. Unlike replaying them, any symbol, date range,
+    or screener filter can be requested. Point FMP_BASE_URL at it to use it.
+    """
+
+    def __init__(self, latency=0, jitter=0, rate_limit=0, period=60, recordings_dir=None):
+        self.latency = latency  # milliseconds added to every response
+        self.jitter = jitter  # up to this many extra milliseconds, picked at random
+        self.rate_limit = rate_limit  # calls allowed per period, 0 means unlimited
+        self.period = period
+        store = RecordingStore(recordings_dir or settings.FMP_RECORDINGS, "")
+        # Only use the successful responses, e.g. not FMP's subscription errors
+        responses = {endpoint: [recording["json"] for recording in store.get_all(endpoint)
+                                if recording["status"] == HTTPStatus.OK and
+                                isinstance(recording.get("json"), list)]
+                     for endpoint in ["profile", "historical-price-eod/full", "company-screener"]}
+        self.profiles = {profile["symbol"]: profile for profiles in responses["profile"]
+                         for profile in profiles}
+        self.histories = {}  # symbol --> the longest recorded bars, newest first
+
+        for bars in responses["historical-price-eod/full"]:
+            if bars and len(bars) > len(self.histories.get(bars[0]["symbol"], [])):
+                self.histories[bars[0]["symbol"]] = sorted(bars, key=lambda bar: bar["date"],
+                                                           reverse=True)
+
+        self.companies = list({company["symbol"]: company for companies in
+                               responses["company-screener"] for company in companies}.values())
+        self.calls = 0
+        self.window_start = monotonic()
+        self.lock = Lock()
+
+    def get_retry_after(self):
+        # Count the call in the current window and return how long to wait if it's over the limit
+        if self.rate_limit <= 0:
+            return None
+
+        with self.lock:
+            now = monotonic()
+
+            if now - self.window_start >= self.period:
+                self.window_start = now
+                self.calls = 0
+
+            self.calls += 1
+            return self.period - (now - self.window_start) if self.calls > self.rate_limit \
+                else None
+
+    def respond(self, path, params):
+        # Returns the status and JSON of a call, like FMP would
+        sleep((self.latency + random.uniform(0, self.jitter)) / 1000)
+        retry_after = self.get_retry_after()
+
+        if retry_after is not None:
+            return HTTPStatus.TOO_MANY_REQUESTS, {
+                "X-Rate-Limit-Retry-After-Seconds": int(retry_after),
+                "X-Rate-Limit-Retry-After-Milliseconds": int(retry_after % 1 * 1000)
+            }
+
+        # e.g. /stable/historical-price-eod/full --> historical-price-eod/full
+        endpoint = path.removeprefix("/stable").strip("/")
+        handlers = {
+            "profile": self.get_profile,
+            "batch-quote": self.get_quotes,
+            "historical-price-eod/full": self.get_history,
+            "company-screener": self.get_companies
+        }
+
+        if endpoint not in handlers:
+            return HTTPStatus.NOT_FOUND, {"Error Message": f"Unknown endpoint: {endpoint}"}
+
+        return HTTPStatus.OK, handlers[endpoint](params)
+
+    def get_profile(self, params):
+        profile = self.profiles.get(params.get("symbol", "").upper())
+        return [profile] if profile is not None else []
+
+    def get_quotes(self, params):
+        symbols = params.get("symbols", "").upper().split(",")
+        return [{key: self.profiles[symbol][key] for key in ["symbol", "price", "change"]}
+                | {"name": self.profiles[symbol]["companyName"]}
+                for symbol in symbols if symbol in self.profiles]
+
+    def get_history(self, params):
+        bars = self.histories.get(params.get("symbol", "").upper(), [])
+
+        if not bars:
+            return []
+
+        # Move the recording forward by whole weeks so the latest bar is from the past week
+        today = timezone.localdate()
+        shift = timedelta(weeks=(today - date.fromisoformat(bars[0]["date"])).days // 7)
+        start = date.fromisoformat(params["from"]) if "from" in params else date.min
+        end = date.fromisoformat(params["to"]) if "to" in params else date.max
+        history = []
+
+        for bar in bars:
+            bar_date = date.fromisoformat(bar["date"]) + shift
+
+            if start <= bar_date <= end:
+                history.append({**bar, "date": bar_date.isoformat()})
+
+        return history
+
+    def get_companies(self, params):
+        companies = self.companies
+
+        for name in SCREENER_RANGES:
+            if f"{name}MoreThan" in params:
+                companies = [company for company in companies if company[name] is not None and
+                             company[name] > float(params[f"{name}MoreThan"])]
+            if f"{name}LowerThan" in params:
+                companies = [company for company in companies if company[name] is not None and
+                             company[name] < float(params[f"{name}LowerThan"])]
+
+        for param, key in [("country", "country"), ("sector", "sector"),
+                           ("exchange", "exchangeShortName")]:
+            if param in params:
+                companies = [company for company in companies
+                             if company[key].lower() == params[param].lower()]
+
+        for param in ["isEtf", "isFund", "isActivelyTrading"]:
+            if param in params:
+                companies = [company for company in companies
+                             if company[param] == (params[param] == "true")]
+
+        return companies[:int(params.get("limit", 1000))]
+
+
+def get_handler(fake_fmp, quiet=True):
+    class FakeFmpHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep connections alive like FMP
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, body = fake_fmp.respond(url.path, dict(parse_qsl(url.query)))
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            if not quiet:
+                super().log_message(format, *args)
+
+    return FakeFmpHandler
+
+
+def create_server(fake_fmp, host="127.0.0.1", port=8001, quiet=True):
+    # Port 0 picks any free port, see server.server_port
+    server = ThreadingHTTPServer((host, port), get_handler(fake_fmp, quiet))
+    server.daemon_threads = True
+    return server
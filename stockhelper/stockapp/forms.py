@@ -155,3 +155,37 @@ class ScreenerForm(forms.Form):
     exchange = forms.ChoiceField(label="Exchange", choices=EXCHANGES, widget=forms.Select(
         attrs={"class": "exchange-select col form-select"}
     ))
+    # Optional ranges (leave either end blank to not limit it)
+    market_cap_min = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(
+        attrs={"placeholder": "Min", "class": "col form-control me-3"}
+    ))
+    market_cap_max = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(
+        attrs={"placeholder": "Max", "class": "col form-control"}
+    ))
+    beta_min = forms.DecimalField(required=False, decimal_places=2, widget=forms.NumberInput(
+        attrs={"inputmode": "decimal", "placeholder": "Min", "class": "col form-control me-3"}
+    ))
+    beta_max = forms.DecimalField(required=False, decimal_places=2, widget=forms.NumberInput(
+        attrs={"inputmode": "decimal", "placeholder": "Max", "class": "col form-control"}
+    ))
+    volume_min = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(
+        attrs={"placeholder": "Min", "class": "col form-control me-3"}
+    ))
+    volume_max = forms.IntegerField(required=False, min_value=0, widget=forms.NumberInput(
+        attrs={"placeholder": "Max", "class": "col form-control"}
+    ))
+
+    # The names of the range fields, e.g. "beta" --> beta_min and beta_max
+    RANGES = ["market_cap", "beta", "volume"]
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        for name in self.RANGES:
+            low = cleaned_data.get(f"{name}_min")
+            high = cleaned_data.get(f"{name}_max")
+
+            if low is not None and high is not None and low > high:
+                self.add_error(f"{name}_max", "The max can't be less than the min.")
+
+        return cleaned_data
@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from .models import Card
+from threading import Lock
+import uuid
+
+# Cards only change when the fixtures are reloaded, so each process keeps every card in memory
+# The version in the shared cache tells the other workers when their copy is out of date
+VERSION_KEY = "glossary:version"
+# Pages are cached per version, so the old ones are left behind when a card changes. Let them
+# expire instead of keeping them forever, a day is still much longer than cards change.
+PAGE_TIMEOUT = 60 * 60 * 24
+_cards = {}
+_version = None
+_lock = Lock()
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        # The version was evicted (or never set), so start a new one that everyone will reload
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+
+    return version
+
+
+def get_cards(reload=False):
+    # Return all the cards indexed by their word, loading them from the database if needed
+    global _cards, _version
+    version = get_version()
+
+    if reload or version != _version:
+        with _lock:
+            if reload or version != _version:
+                _cards = {card.word: card for card in Card.objects.all()}
+                _version = version
+
+    return _cards
+
+
+def get_terms(words):
+    # Map each key to its card, e.g. {"beta": "Beta"} --> {"beta": <Card: Beta>}
+    cards = get_cards()
+
+    # A card could've been added without a signal (e.g. a rolled back delete), so check again
+    if any(word not in cards for word in words.values()):
+        cards = get_cards(reload=True)
+
+    terms = {}
+
+    for key, word in words.items():
+        if word not in cards:
+            raise Card.DoesNotExist(f"No card exists for {word}")
+
+        terms[key] = cards[word]
+
+    return terms
+
+
+def get_page(request, name, render_page):
+    # Pages that only show the glossary look the same to every anonymous user, so they're
+    # rendered once per version and served from the cache until a card changes
+    if request.user.is_authenticated:
+        return render_page()
+
+    key = f"glossary:page:{name}:{get_version()}"
+    content = cache.get(key)
+
+    if content is not None:
+        return HttpResponse(content)
+
+    response = render_page()
+
+    # Class-based views return a TemplateResponse that hasn't been rendered yet
+    if hasattr(response, "render"):
+        response.render()
+    if response.status_code == 200:
+        cache.set(key, response.content, timeout=PAGE_TIMEOUT)
+
+    return response
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def invalidate(**kwargs):
+    # Tell every worker to reload the cards on their next request
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
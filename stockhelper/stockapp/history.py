@@ -0,0 +1,109 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import api, async_api
+from .models import DailyBar
+from datetime import date, timedelta
+import asyncio
+
+# How far back a ticker is filled in the first time it's viewed (the longest history range)
+BACKFILL_LENGTH = timedelta(days=366 * 5)
+# Weekends and holidays don't have bars, so don't go back to FMP for a gap shorter than this
+MAX_GAP = timedelta(days=7)
+
+
+def get_fresh_key(ticker):
+    # Set once the latest bars are fetched, so reads don't go back to FMP until it expires
+    return f"history:fresh:{ticker}"
+
+
+def get_missing_ranges(ticker, start):
+    # Get the (from, to) date ranges that need to be fetched from FMP to cover start until today
+    today = timezone.localdate()
+    bars = DailyBar.objects.filter(ticker=ticker).order_by("date")
+    earliest = bars.values_list("date", flat=True).first()
+
+    if earliest is None:
+        return [(min(start, today - BACKFILL_LENGTH), today)]
+
+    latest = bars.values_list("date", flat=True).last()
+    ranges = []
+
+    # The first backfill already covered everything since BACKFILL_LENGTH ago, so anything missing
+    # there doesn't exist (e.g. the stock wasn't listed yet)
+    if start < min(earliest - MAX_GAP, today - BACKFILL_LENGTH):
+        ranges.append((start, earliest - timedelta(days=1)))
+    # Only the days since the last stored bar are requested, including that bar in case it was
+    # stored before the market closed or FMP has revised it since. They're only checked again
+    # once FMP's response would've expired from the cache anyway.
+    if cache.get(get_fresh_key(ticker)) is None:
+        ranges.append((latest, today))
+
+    return ranges
+
+
+def save_history(ticker, raw_histories):
+    # Store the bars of each FMP response and return the first error, if any
+    bars = []
+    error = None
+
+    for raw_history in raw_histories:
+        if not isinstance(raw_history, list):
+            error = error or raw_history
+            continue
+
+        bars += [DailyBar(
+            ticker=ticker,
+            date=date.fromisoformat(bar["date"]),
+            open=bar["open"],
+            high=bar["high"],
+            low=bar["low"],
+            close=bar["close"],
+            volume=bar.get("volume") or 0
+        ) for bar in raw_history]
+
+    # Replace the bars that were already stored (by an earlier fetch or another request), and
+    # don't send the same day twice since Postgres can't update a row twice in one statement
+    bars = {bar.date: bar for bar in bars}.values()
+    DailyBar.objects.bulk_create(bars, update_conflicts=True, unique_fields=["ticker", "date"],
+                                 update_fields=["open", "high", "low", "close", "volume"])
+    return error
+
+
+def get_bars(ticker, start, end):
+    # Get the stored bars in the same format as FMP (newest first)
+    bars = DailyBar.objects.filter(ticker=ticker, date__range=(start, end)).order_by("-date") \
+        .values("date", "open", "high", "low", "close", "volume")
+    return [{"symbol": ticker, **bar, "date": bar["date"].isoformat()} for bar in bars]
+
+
+def merge_history(ticker, start, end, raw_histories):
+    error = save_history(ticker, raw_histories)
+
+    if raw_histories and error is None:
+        cache.set(get_fresh_key(ticker), True,
+                  timeout=settings.FMP_CACHE_TTL.get("historical-price-eod/full", 0))
+
+    history = get_bars(ticker, start, end)
+    # Serve what's stored even if FMP can't be reached, the error only matters if there's nothing
+    return error if error is not None and not history else history
+
+
+def get_stock_history(ticker, start, end, max_wait=None):
+    # Get the daily prices of a ticker from the local store, fetching only the missing days
+    ticker = ticker.upper()
+    raw_histories = [api.get_stock_history(ticker, range_start, range_end, max_wait)
+                     for range_start, range_end in get_missing_ranges(ticker, start)]
+    return merge_history(ticker, start, end, raw_histories)
+
+
+async def aget_stock_history(ticker, start, end, max_wait=None):
+    ticker = ticker.upper()
+    ranges = await sync_to_async(get_missing_ranges)(ticker, start)
+    raw_histories = await asyncio.gather(*[
+        async_api.get_stock_history(ticker, range_start, range_end, max_wait)
+        for range_start, range_end in ranges
+    ])
+    return await sync_to_async(merge_history)(ticker, start, end, raw_histories)
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from stockapp import benchmark
+import json
+
+
+class Command(BaseCommand):
+    help = "Load test the app's views and report the throughput, latency, and queries per request"
+
+    def add_arguments(self, parser):
+        parser.add_argument("views", nargs="*",
+                            help=f"Views to test (default: {', '.join(benchmark.VIEWS)})")
+        parser.add_argument("--url", default="http://localhost:8000",
+                            help="Where the app is running (default: http://localhost:8000)")
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Requests to make to each view (default: 200)")
+        parser.add_argument("--concurrency", type=int, default=10,
+                            help="Requests to make at once (default: 10)")
+        parser.add_argument("--ticker", default="AAPL",
+                            help="Stock to view and buy (default: AAPL)")
+        parser.add_argument("--username", default="benchmark",
+                            help="Account to log in with, created if it doesn't exist")
+        parser.add_argument("--password", default="benchmark-password")
+        parser.add_argument("--json", action="store_true",
+                            help="Print the results as JSON, e.g. to compare them between runs")
+
+    def handle(self, *args, **options):
+        unknown = set(options["views"]) - set(benchmark.VIEWS)
+
+        if unknown:
+            raise CommandError(f"Unknown views: {', '.join(sorted(unknown))}")
+
+        # The app needs to use the same database as this command to log in with a new account
+        if not get_user_model().objects.filter(username=options["username"]).exists():
+            get_user_model().objects.create_user(username=options["username"],
+                                                 password=options["password"])
+
+        runner = benchmark.Benchmark(options["url"], options["username"], options["password"],
+                                     options["ticker"].upper())
+        runner.prepare()
+        results = {}
+
+        for view in options["views"] or benchmark.VIEWS:
+            results[view] = runner.run(view, options["requests"], options["concurrency"])
+
+            if not options["json"]:
+                self.stdout.write(
+                    f"{view:<10} {results[view]['requests']:>5} requests "
+                    f"{results[view]['errors']:>4} errors "
+                    f"{results[view]['throughput']:>8.1f} req/s "
+                    f"p50 {results[view]['p50']:>7.1f} ms "
+                    f"p95 {results[view]['p95']:>7.1f} ms "
+                    f"p99 {results[view]['p99']:>7.1f} ms "
+                    f"{results[view]['queries']:>5.1f} queries/req")
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from stockapp import fakefmp
+
+
+class Command(BaseCommand):
+    help = "Serve recorded FMP responses locally so the app can be tested without using the quota"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Host to listen on")
+        parser.add_argument("--port", type=int, default=8001, help="Port to listen on")
+        parser.add_argument("--latency", type=float, default=0,
+                            help="Milliseconds to wait before every response (default: 0)")
+        parser.add_argument("--jitter", type=float, default=0,
+                            help="Up to this many extra milliseconds, picked at random")
+        parser.add_argument("--rate-limit", type=int, default=0,
+                            help="Calls allowed per period before FMP's rate limit response "
+                                 "is sent (default: unlimited)")
+        parser.add_argument("--period", type=float, default=60,
+                            help="Length of the rate limit window in seconds (default: 60)")
+
+    def handle(self, *args, **options):
+        fake_fmp = fakefmp.FakeFmp(options["latency"], options["jitter"], options["rate_limit"],
+                                   options["period"])
+        server = fakefmp.create_server(fake_fmp, options["host"], options["port"],
+                                       quiet=options["verbosity"] < 2)
+        self.stdout.write(f"Serving fake FMP, start the app with "
+                          f"FMP_BASE_URL=http://{options['host']}:{server.server_port}/stable")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
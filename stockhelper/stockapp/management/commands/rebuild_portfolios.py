@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from stockapp import trades
+
+
+class Command(BaseCommand):
+    help = "Recreate every portfolio by replaying the trade ledger"
+
+    def handle(self, *args, **options):
+        portfolios, trade_count = trades.rebuild_portfolios()
+        self.stdout.write(f"Replayed {trade_count} {'trade' if trade_count == 1 else 'trades'} "
+                          f"into {portfolios} {'portfolio' if portfolios == 1 else 'portfolios'}")
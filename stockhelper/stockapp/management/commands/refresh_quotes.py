@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from stockapp import quotes
+from time import monotonic, sleep
+
+
+class Command(BaseCommand):
+    help = "Refresh the prices of every owned stock and FMP's free tier stocks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tickers", nargs="*",
+                            help="Only refresh these tickers (default: all the tracked ones)")
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Keep refreshing every INTERVAL seconds (default: run once)")
+
+    def handle(self, *args, **options):
+        tickers = [ticker.upper() for ticker in options["tickers"]] or None
+
+        while True:
+            start = monotonic()
+            updated, errors = quotes.refresh_quotes(tickers)
+
+            for error in errors:
+                self.stderr.write(f"Error from FMP: {error}")
+
+            self.stdout.write(f"Updated {updated} {'stock' if updated == 1 else 'stocks'}")
+
+            if options["interval"] <= 0:
+                break
+
+            # Start the next refresh INTERVAL seconds after the last one started
+            sleep(max(options["interval"] - (monotonic() - start), 0))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from stockapp import api, screener
+from time import monotonic, sleep
+
+
+class Command(BaseCommand):
+    help = "Download FMP's company screener into the database so searches can run locally"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10000,
+                            help="Max number of companies to download (default: 10000)")
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Keep taking snapshots every INTERVAL seconds (default: run once)")
+
+    def handle(self, *args, **options):
+        while True:
+            start = monotonic()
+            raw_companies = api.get_company_universe(options["limit"])
+
+            # Keep the last snapshot if FMP returns an error
+            if isinstance(raw_companies, list):
+                saved = screener.save_snapshot(raw_companies)
+                self.stdout.write(f"Saved {saved} {'company' if saved == 1 else 'companies'}")
+            else:
+                error = raw_companies.get("Error Message", raw_companies) if hasattr(
+                    raw_companies, "get") else raw_companies
+                self.stderr.write(f"Error from FMP: {error}")
+
+            if options["interval"] <= 0:
+                break
+
+            # Start the next snapshot INTERVAL seconds after the last one started
+            sleep(max(options["interval"] - (monotonic() - start), 0))
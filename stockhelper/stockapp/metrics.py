@@ -0,0 +1,128 @@
+from django.core.cache import cache
+
+# Counters for the FMP client, kept in Django's cache so every worker adds to the same numbers
+# (as long as the cache is shared between workers and increments atomically, like Redis in
+# production). They never expire, so Redis' volatile-lru policy never evicts them either.
+ENDPOINTS = ["profile", "historical-price-eod/full", "company-screener", "batch-quote"]
+STATUSES = ["2xx", "3xx", "4xx", "5xx", "error"]
+# Upper bounds (in seconds) of the latency histogram's buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Durations are stored in whole milliseconds since not every cache can increment floats
+PREFIX = "fmp:metrics"
+
+
+def increment(key, delta=1):
+    # cache.incr() raises a ValueError if the key doesn't exist yet, and only add() can start a
+    # count without overwriting one that another worker just started
+    while not cache.add(key, delta, timeout=None):
+        try:
+            cache.incr(key, delta)
+            return
+        except ValueError:
+            # The key was deleted (e.g. the cache was cleared) after add() saw it
+            pass
+
+
+def get_status(status_code):
+    # Group the status codes so there's a fixed number of series, e.g. 429 --> 4xx
+    return f"{status_code // 100}xx" if status_code is not None else "error"
+
+
+def observe_request(endpoint, status_code, duration):
+    # Count a call to FMP and add its latency (in seconds) to the histogram
+    bucket = next((bound for bound in LATENCY_BUCKETS if duration <= bound), "+Inf")
+    increment(f"{PREFIX}:{endpoint}:requests:{get_status(status_code)}")
+    increment(f"{PREFIX}:{endpoint}:latency:{bucket}")
+    increment(f"{PREFIX}:{endpoint}:latency:sum", round(duration * 1000))
+
+
+def record_json_error(endpoint):
+    increment(f"{PREFIX}:{endpoint}:json_errors")
+
+
+def record_retry(endpoint):
+    # FMP said the quota was exceeded, so the call will be tried again
+    increment(f"{PREFIX}:{endpoint}:retries")
+
+
+def record_rate_limited(endpoint):
+    # The call was given up on without asking FMP since the quota wouldn't free up in time
+    increment(f"{PREFIX}:{endpoint}:rate_limited")
+
+
+def record_sleep(endpoint, duration):
+    increment(f"{PREFIX}:{endpoint}:sleep", round(duration * 1000))
+
+
+def get_counts(endpoint):
+    keys = [f"{PREFIX}:{endpoint}:requests:{status}" for status in STATUSES] + \
+        [f"{PREFIX}:{endpoint}:latency:{bound}" for bound in LATENCY_BUCKETS + ["+Inf", "sum"]] + \
+        [f"{PREFIX}:{endpoint}:{name}" for name in
+         ["json_errors", "retries", "rate_limited", "sleep"]]
+    values = cache.get_many(keys)
+    return {key.removeprefix(f"{PREFIX}:{endpoint}:"): values.get(key, 0) for key in keys}
+
+
+def render(cache_stats):
+    # Format every metric in Prometheus' text format, cache_stats comes from api.get_cache_stats()
+    lines = []
+
+    def add_metric(name, metric_type, description, samples):
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+
+    counts = {endpoint: get_counts(endpoint) for endpoint in ENDPOINTS}
+    histogram = []
+
+    for endpoint, count in counts.items():
+        total = 0
+
+        # Prometheus buckets are cumulative
+        for bound in LATENCY_BUCKETS + ["+Inf"]:
+            total += count[f"latency:{bound}"]
+            histogram.append((f'endpoint="{endpoint}",le="{bound}"', total))
+
+    add_metric("fmp_requests_total", "counter", "Calls made to FMP by HTTP status", [
+        (f'endpoint="{endpoint}",status="{status}"', count[f"requests:{status}"])
+        for endpoint, count in counts.items() for status in STATUSES
+    ])
+    lines.append("# HELP fmp_request_duration_seconds How long FMP took to respond")
+    lines.append("# TYPE fmp_request_duration_seconds histogram")
+    lines.extend(f"fmp_request_duration_seconds_bucket{{{labels}}} {value}"
+                 for labels, value in histogram)
+    lines.extend(line for endpoint, count in counts.items() for line in [
+        f'fmp_request_duration_seconds_sum{{endpoint="{endpoint}"}} {count["latency:sum"] / 1000}',
+        f'fmp_request_duration_seconds_count{{endpoint="{endpoint}"}} '
+        f'{sum(count[f"requests:{status}"] for status in STATUSES)}'
+    ])
+    add_metric("fmp_json_decode_errors_total", "counter", "FMP responses that weren't JSON", [
+        (f'endpoint="{endpoint}"', count["json_errors"]) for endpoint, count in counts.items()
+    ])
+    add_metric("fmp_rate_limit_retries_total", "counter",
+               "Calls retried after FMP said the quota was exceeded", [
+                   (f'endpoint="{endpoint}"', count["retries"])
+                   for endpoint, count in counts.items()
+               ])
+    add_metric("fmp_rate_limited_total", "counter",
+               "Calls given up on because the quota wouldn't free up in time", [
+                   (f'endpoint="{endpoint}"', count["rate_limited"])
+                   for endpoint, count in counts.items()
+               ])
+    add_metric("fmp_rate_limit_sleep_seconds_total", "counter",
+               "Time spent waiting for the quota before calling FMP", [
+                   (f'endpoint="{endpoint}"', count["sleep"] / 1000)
+                   for endpoint, count in counts.items()
+               ])
+
+    for name, description in [("hits", "Calls answered by the cache"),
+                              ("misses", "Calls that had to go to FMP")]:
+        add_metric(f"fmp_cache_{name}_total", "counter", description, [
+            (f'endpoint="{endpoint}"', stats[name]) for endpoint, stats in cache_stats.items()
+        ])
+
+    add_metric("fmp_cache_hit_ratio", "gauge", "Share of calls answered by the cache", [
+        (f'endpoint="{endpoint}"', round(stats["hit_ratio"], 4))
+        for endpoint, stats in cache_stats.items()
+    ])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockapp', '0003_stock_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('symbol', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('company_name', models.CharField(default='', max_length=200)),
+                ('market_cap', models.BigIntegerField(blank=True, null=True)),
+                ('sector', models.CharField(default='', max_length=50)),
+                ('industry', models.CharField(default='', max_length=100)),
+                ('beta', models.FloatField(blank=True, null=True)),
+                ('price', models.FloatField(blank=True, null=True)),
+                ('last_annual_dividend', models.FloatField(blank=True, null=True)),
+                ('volume', models.BigIntegerField(blank=True, null=True)),
+                ('exchange', models.CharField(default='', max_length=100)),
+                ('exchange_short_name', models.CharField(default='', max_length=20)),
+                ('country', models.CharField(default='', max_length=2)),
+                ('is_etf', models.BooleanField(default=False)),
+                ('is_fund', models.BooleanField(default=False)),
+                ('is_actively_trading', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['country', 'sector', '-market_cap'], name='stockapp_co_country_f0c678_idx'), models.Index(fields=['country', 'exchange_short_name', '-market_cap'], name='stockapp_co_country_aa7063_idx'), models.Index(fields=['country', '-market_cap'], name='stockapp_co_country_72ca7b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    # A user could own the same stock in several portfolios before, so combine their shares into
+    # one portfolio for the unique constraint
+    Portfolio = apps.get_model("stockapp", "Portfolio")
+    kept = {}
+
+    for portfolio in Portfolio.objects.order_by("pk"):
+        key = (portfolio.user_id, portfolio.stock_id)
+
+        if key in kept:
+            kept[key].shares += portfolio.shares
+            portfolio.delete()
+        else:
+            kept[key] = portfolio
+
+    Portfolio.objects.bulk_update(kept.values(), ["shares"])
+
+
+def open_ledger(apps, schema_editor):
+    # Record the shares owned before the ledger existed as bought at the last known price
+    Portfolio = apps.get_model("stockapp", "Portfolio")
+    Trade = apps.get_model("stockapp", "Trade")
+    portfolios = list(Portfolio.objects.select_related("stock"))
+
+    for portfolio in portfolios:
+        portfolio.cost_basis = portfolio.shares * portfolio.stock.price
+
+    Portfolio.objects.bulk_update(portfolios, ["cost_basis"])
+    Trade.objects.bulk_create([
+        Trade(user_id=portfolio.user_id, stock_id=portfolio.stock_id, side="buy",
+              shares=portfolio.shares, price=portfolio.stock.price)
+        for portfolio in portfolios
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockapp', '0004_company'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('shares', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('realized_gain', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='portfolio',
+            name='cost_basis',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='portfolio',
+            constraint=models.UniqueConstraint(fields=('user', 'stock'), name='unique_user_stock'),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='stock',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='stockapp.stock'),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user', '-timestamp'], name='stockapp_tr_user_id_51aa25_idx'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:43
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_totals(apps, schema_editor):
+    # The exact totals of the older trades weren't kept, so the rounded price is the best guess
+    Trade = apps.get_model("stockapp", "Trade")
+    Trade.objects.update(total=F("price") * F("shares"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockapp', '0005_trade_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
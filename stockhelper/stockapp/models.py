@@ -1,14 +1,18 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 import uuid
 
 
+# Every user starts off with a balance of $10,000
+STARTING_BALANCE = 10000
+
+
 # The user (extends Django's existing User object)
 class User(AbstractUser):
-    # Start off with a default balance of $10,000
     balance = models.DecimalField(
-        max_digits=7, decimal_places=2, default=10000)
+        max_digits=7, decimal_places=2, default=STARTING_BALANCE)
 
 
 # Information about each stock
@@ -18,6 +22,8 @@ class Stock(models.Model):
     name = models.CharField(max_length=100, default="")
     price = models.DecimalField(max_digits=7, decimal_places=2, default=0)
     change = models.FloatField(default=0)
+    # When the price was last fetched from FMP, null if it never was
+    updated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.ticker} - {self.name}"
@@ -33,11 +39,96 @@ class Portfolio(models.Model):
     # Many portfolios from different users can contain the same stock
     stock = models.ForeignKey(Stock, on_delete=models.CASCADE)
     shares = models.PositiveIntegerField(default=0)
+    # How much the user paid for the shares they still own (the average cost of each share)
+    cost_basis = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        # Portfolios are a projection of the trades, one for each stock the user owns
+        constraints = [
+            models.UniqueConstraint(fields=["user", "stock"], name="unique_user_stock")
+        ]
 
     def __str__(self):
         return f"{self.user}: {self.shares} {'share' if self.shares == 1 else 'shares'} of {self.stock}"
 
 
+# Every buy and sell, never updated or deleted so the portfolio can always be rebuilt from it
+class Trade(models.Model):
+    class Side(models.TextChoices):
+        BUY = "buy"
+        SELL = "sell"
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    stock = models.ForeignKey(Stock, on_delete=models.PROTECT)
+    side = models.CharField(max_length=4, choices=Side.choices)
+    shares = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    # What all the shares cost (or sold for), which isn't always the shares times the rounded price
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # The profit (or loss) of a sale compared to the cost basis, 0 for buys
+    realized_gain = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-timestamp"])]
+
+    def __str__(self):
+        return f"{self.user} {self.side} {self.shares} of {self.stock_id} at {self.price}"
+
+
+# The end-of-day prices of a stock, stored locally so only new days need to be fetched from FMP
+class DailyBar(models.Model):
+    # Bars are kept for any ticker that's been viewed, not just the ones in a portfolio
+    ticker = models.CharField(max_length=10)
+    date = models.DateField()
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.BigIntegerField(default=0)
+
+    class Meta:
+        # Each ticker has one bar per day, which also indexes lookups by ticker and date range
+        constraints = [
+            models.UniqueConstraint(fields=["ticker", "date"], name="unique_ticker_date")
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} on {self.date}: {self.close}"
+
+
+# A snapshot of every company in FMP's screener, so searches can run locally
+class Company(models.Model):
+    symbol = models.CharField(primary_key=True, max_length=20)
+    company_name = models.CharField(max_length=200, default="")
+    market_cap = models.BigIntegerField(null=True, blank=True)
+    sector = models.CharField(max_length=50, default="")
+    industry = models.CharField(max_length=100, default="")
+    beta = models.FloatField(null=True, blank=True)
+    price = models.FloatField(null=True, blank=True)
+    last_annual_dividend = models.FloatField(null=True, blank=True)
+    volume = models.BigIntegerField(null=True, blank=True)
+    exchange = models.CharField(max_length=100, default="")
+    exchange_short_name = models.CharField(max_length=20, default="")
+    country = models.CharField(max_length=2, default="")
+    is_etf = models.BooleanField(default=False)
+    is_fund = models.BooleanField(default=False)
+    is_actively_trading = models.BooleanField(default=True)
+    # When the company was last seen in a snapshot
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        # Every search filters by country, and results are sorted by market cap
+        indexes = [
+            models.Index(fields=["country", "sector", "-market_cap"]),
+            models.Index(fields=["country", "exchange_short_name", "-market_cap"]),
+            models.Index(fields=["country", "-market_cap"])
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} - {self.company_name}"
+
+
 # Object representing the flashcards
 class Card(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,28 @@
+from django.db.models import DecimalField, F, Sum
+
+from .models import Portfolio, STARTING_BALANCE
+from decimal import Decimal
+
+
+def get_net_worth(user):
+    # Value all the user's stocks at their last saved prices in a single query
+    # SELECT SUM(Porfolio.shares * Stock.price), SUM(Portfolio.cost_basis)
+    # FROM Portfolio JOIN Stock ON Portfolio.stock = Stock.ticker WHERE Portfolio.user = <user>
+    totals = Portfolio.objects.filter(user=user).aggregate(
+        holdings=Sum(F("shares") * F("stock__price"),
+                     output_field=DecimalField(max_digits=14, decimal_places=2)),
+        cost_basis=Sum("cost_basis")
+    )
+    holdings = Decimal(totals["holdings"] or 0).quantize(Decimal("0.01"))
+    net_worth = user.balance + holdings
+    change = net_worth - STARTING_BALANCE
+
+    return {
+        "balance": user.balance,
+        "holdings": holdings,
+        "costBasis": totals["cost_basis"] or Decimal(0),
+        "netWorth": net_worth,
+        "change": change,
+        # Return on investment as a percentage of the starting balance
+        "roi": change / STARTING_BALANCE * 100
+    }
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.utils import timezone
+
+from . import api
+from .models import Portfolio, Stock
+from datetime import timedelta
+
+# Max number of symbols in each batch quote request
+BATCH_SIZE = 100
+
+
+def is_fresh(stock):
+    # Check if the stock's price is recent enough to skip asking FMP
+    return stock.updated_at is not None and \
+        timezone.now() - stock.updated_at < timedelta(seconds=settings.QUOTE_MAX_AGE)
+
+
+def update_stock(stock, quote):
+    # A company could change its name while owning their stock, such as Meta
+    stock.name = quote["name"]
+    stock.price = quote["price"]
+    stock.change = quote["change"]
+    stock.updated_at = timezone.now()
+
+
+def get_tracked_tickers():
+    # Every stock someone owns, plus the ones available on FMP's free tier
+    owned = Portfolio.objects.filter(shares__gt=0).values_list("stock", flat=True).distinct()
+    return sorted(set(owned) | api.FREE_TIER_SYMBOLS.keys())
+
+
+def refresh_quotes(tickers=None):
+    # Fetch the latest quotes in batches and save them all at once
+    # Returns the number of stocks updated and the errors from FMP
+    tickers = sorted(tickers) if tickers is not None else get_tracked_tickers()
+    stocks = []
+    errors = []
+
+    for i in range(0, len(tickers), BATCH_SIZE):
+        raw_quotes = api.get_quotes(tickers[i:i + BATCH_SIZE])
+
+        if not isinstance(raw_quotes, list):
+            errors.append(raw_quotes.get("Error Message", raw_quotes) if hasattr(
+                raw_quotes, "get") else raw_quotes)
+            continue
+
+        for quote in raw_quotes:
+            stock = Stock(ticker=quote["symbol"])
+            update_stock(stock, quote)
+            stocks.append(stock)
+
+    # Insert the stocks that don't exist yet and update the rest in one query
+    Stock.objects.bulk_create(stocks, update_conflicts=True, unique_fields=["ticker"],
+                              update_fields=["name", "price", "change", "updated_at"])
+    return len(stocks), errors
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from time import sleep, time
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every worker through Django's cache. The bucket is stored as the
+    theoretical arrival time (TAT) of the next call (the generic cell rate algorithm), so only
+    one value needs to be read and written per call. Workers take turns through a lock made with
+    cache.add(), so the cache must make add() atomic across processes like Redis does (see
+    checks.py). Local memory caches only share the bucket within a process.
+    """
+
+    def __init__(self, key, calls, period, burst=1):
+        self.key = key
+        self.interval = period / calls  # seconds between calls at a steady rate
+        self.tolerance = self.interval * burst  # how far ahead of schedule a burst can get
+
+    def _acquire_lock(self):
+        # cache.add() is atomic, so only one worker can hold the lock at a time
+        for _ in range(100):
+            if cache.add(f"{self.key}:lock", 1, timeout=1):
+                return True
+
+            sleep(0.005)
+
+        # Proceed anyway if the lock holder died, worst case a call goes slightly early
+        return False
+
+    def _release_lock(self):
+        cache.delete(f"{self.key}:lock")
+
+    def reserve(self, max_wait=0):
+        """
+        Reserve a call and return how many seconds to wait before making it, or None if the
+        wait would exceed max_wait (nothing is reserved in that case)
+        """
+        locked = self._acquire_lock()
+
+        try:
+            now = time()
+            tat = max(cache.get(self.key, now), now)
+            new_tat = tat + self.interval
+            wait = max(new_tat - self.tolerance - now, 0)
+
+            if wait > max_wait:
+                return None
+
+            # Don't let the bucket expire or be evicted, a TAT in the past just means it's full
+            cache.set(self.key, new_tat, timeout=None)
+            return wait
+        finally:
+            if locked:
+                self._release_lock()
+
+    def penalize(self, delay):
+        """
+        Push back every worker's next call after FMP reports that the quota was exceeded
+        """
+        locked = self._acquire_lock()
+
+        try:
+            now = time()
+            tat = max(cache.get(self.key, now), now + delay + self.tolerance)
+            cache.set(self.key, tat, timeout=None)
+        finally:
+            if locked:
+                self._release_lock()
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Company
+import hashlib
+import json
+
+RESULTS_PER_PAGE = 25
+# FMP's results only need to last until the redirect after a search is followed
+RESULTS_TIMEOUT = 60 * 5
+# Name the columns like FMP so the template works with both local and live results
+RESULT_FIELDS = {
+    "companyName": F("company_name"),
+    "marketCap": F("market_cap"),
+    "lastAnnualDividend": F("last_annual_dividend"),
+    "exchangeShortName": F("exchange_short_name")
+}
+SNAPSHOT_FIELDS = ["company_name", "market_cap", "sector", "industry", "beta", "price",
+                   "last_annual_dividend", "volume", "exchange", "exchange_short_name", "country",
+                   "is_etf", "is_fund", "is_actively_trading", "updated_at"]
+
+
+def is_available():
+    # The local screener can only be used once a snapshot has been taken
+    return Company.objects.exists()
+
+
+def get_snapshot_time():
+    # Every company is saved with the same time and older ones are deleted, so any row will do
+    return Company.objects.values_list("updated_at", flat=True).first()
+
+
+def search(form_data):
+    # Filter the companies like FMP's screener would, largest companies first
+    companies = Company.objects.filter(country=form_data["country"], is_actively_trading=True)
+
+    if form_data["price_relation"] == ">":
+        companies = companies.filter(price__gt=form_data["price_value"])
+    else:
+        companies = companies.filter(price__lt=form_data["price_value"])
+
+    if form_data["sector"] != "Any":
+        companies = companies.filter(sector=form_data["sector"])
+
+    if form_data["exchange"] == "etf":
+        companies = companies.filter(is_etf=True)
+    elif form_data["exchange"] == "mutual_fund":
+        companies = companies.filter(is_fund=True)
+    elif form_data["exchange"] != "Any":
+        companies = companies.filter(exchange_short_name=form_data["exchange"].upper())
+
+    for name in ["market_cap", "beta", "volume"]:
+        if form_data.get(f"{name}_min") is not None:
+            companies = companies.filter(**{f"{name}__gte": form_data[f"{name}_min"]})
+        if form_data.get(f"{name}_max") is not None:
+            companies = companies.filter(**{f"{name}__lte": form_data[f"{name}_max"]})
+
+    return companies.order_by(F("market_cap").desc(nulls_last=True), "symbol") \
+        .values("symbol", "sector", "beta", "price", "volume", **RESULT_FIELDS)
+
+
+def get_page(form_data, number):
+    # Get one page of results, any invalid page number goes to the first or last page
+    page = Paginator(search(form_data), RESULTS_PER_PAGE).get_page(number)
+    # Run the query now in case the page is rendered in an async view
+    page.object_list = list(page.object_list)
+    return page
+
+
+def save_results(results):
+    # Keep FMP's results in the shared cache so the session only has to hold the key
+    # Identical searches get the same key, so they share an entry
+    digest = hashlib.sha256(json.dumps(results, sort_keys=True, default=str).encode())
+    key = f"screener:results:{digest.hexdigest()}"
+    cache.set(key, results, timeout=RESULTS_TIMEOUT)
+    return key
+
+
+def get_results(key):
+    # None if there's no key or the results expired
+    return cache.get(key) if key is not None else None
+
+
+def save_snapshot(raw_companies):
+    # Replace the snapshot with the companies from FMP's screener
+    now = timezone.now()
+    companies = [Company(
+        symbol=company["symbol"],
+        company_name=company.get("companyName") or "",
+        market_cap=company.get("marketCap"),
+        sector=company.get("sector") or "",
+        industry=company.get("industry") or "",
+        beta=company.get("beta"),
+        price=company.get("price"),
+        last_annual_dividend=company.get("lastAnnualDividend"),
+        volume=company.get("volume"),
+        exchange=company.get("exchange") or "",
+        exchange_short_name=(company.get("exchangeShortName") or "").upper(),
+        country=company.get("country") or "",
+        is_etf=bool(company.get("isEtf")),
+        is_fund=bool(company.get("isFund")),
+        is_actively_trading=company.get("isActivelyTrading") is not False,
+        updated_at=now
+    ) for company in raw_companies if company.get("symbol")]
+
+    # Searches either see the old snapshot or the new one, never half of each
+    with transaction.atomic():
+        Company.objects.bulk_create(companies, batch_size=500, update_conflicts=True,
+                                    unique_fields=["symbol"], update_fields=SNAPSHOT_FIELDS)
+        # Remove the companies that are no longer listed
+        Company.objects.filter(updated_at__lt=now).delete()
+
+    return len(companies)
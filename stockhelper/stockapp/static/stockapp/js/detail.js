@@ -2,9 +2,10 @@
 const ticker = document.querySelector(".symbol").textContent;
 const name = document.querySelector(".company-name").textContent;
 const priceDom = document.querySelector(".current-price");
-const sharePrice = parseFloat(priceDom.textContent.split("$")[1]);
+// The price and change are kept up to date by the stream
+let sharePrice = parseFloat(priceDom.textContent.split("$")[1]);
 const changeDom = document.querySelector(".change");
-const change = parseFloat(changeDom.textContent);
+let change = parseFloat(changeDom.textContent);
 
 // Logistics container elements
 const beta = document.querySelector(".beta");
@@ -34,14 +35,26 @@ const round = (number, places) =>
         10 ** places
     ).toFixed(places);
 
-// Get the session balance from the front-end
-const getBalance = async () => {
-    const req = await fetch("/stockapp/session/balance");
-    const balance = await req.text();
-    return parseFloat(balance);
+// The balance and shares owned are rendered with the page, so typing doesn't call the server
+let balance = parseFloat(stockForm.dataset.balance);
+let heldShares = parseInt(stockForm.dataset.shares);
+
+// Update the balance and shares owned after a trade
+const refreshPreview = async () => {
+    try {
+        const req = await fetch(stockForm.dataset.previewUrl);
+        const resp = await req.json();
+
+        if (resp.error === undefined) {
+            balance = resp.balance;
+            heldShares = resp.maxSell;
+        }
+    } catch (error) {
+        console.error(`Error: ${error}`);
+    }
 };
 
-const checkShares = async () => {
+const checkShares = () => {
     // Show the user's new balance and how much they would be earning or losing
     const isBuying = transaction.value === "buy";
     const numShares = parseInt(shares.value);
@@ -52,12 +65,12 @@ const checkShares = async () => {
         balanceDiff.textContent = `-$${round(diff, 2)}`;
         balanceDiff.classList.remove("text-success");
         balanceDiff.classList.add("text-danger");
-        newBalance = (await getBalance()) - diff;
+        newBalance = balance - diff;
     } else {
         balanceDiff.textContent = `+$${round(diff, 2)}`;
         balanceDiff.classList.remove("text-danger");
         balanceDiff.classList.add("text-success");
-        newBalance = (await getBalance()) + diff;
+        newBalance = balance + diff;
     }
 
     balanceResult.textContent = `New Balance: $${round(newBalance, 2)}`;
@@ -66,6 +79,12 @@ const checkShares = async () => {
         shares.setCustomValidity(
             "You don't have enough money to buy that many shares."
         );
+    } else if (!isBuying && numShares > heldShares) {
+        shares.setCustomValidity(
+            heldShares === 0
+                ? `You don't own any shares from ${ticker}.`
+                : `You can only sell up to ${heldShares} shares.`
+        );
     } else {
         shares.setCustomValidity("");
     }
@@ -101,13 +120,46 @@ const showToastMessage = (isError, message) => {
 };
 
 // Make the change text green or red depending on its sign
-if (parseFloat(changeDom.textContent) < 0) {
-    changeDom.innerHTML = `▼ ${changeDom.innerHTML}`;
-    changeDom.classList.add("text-danger");
-} else {
-    changeDom.innerHTML = `▲ ${changeDom.innerHTML}`;
-    changeDom.classList.add("text-success");
-}
+const showChange = () => {
+    changeDom.classList.remove("text-success", "text-danger");
+
+    if (change < 0) {
+        changeDom.textContent = `▼ ${change}`;
+        changeDom.classList.add("text-danger");
+    } else {
+        changeDom.textContent = `▲ ${change}`;
+        changeDom.classList.add("text-success");
+    }
+};
+
+showChange();
+
+// Update the price while the page is open, along with the cost of the order being typed
+const streamPrice = () => {
+    const source = new EventSource(
+        document.querySelector(".main-info-container").dataset.streamUrl
+    );
+
+    source.addEventListener("price", (event) => {
+        const update = JSON.parse(event.data);
+
+        // Keep showing the last price if a check failed
+        if (update.error !== undefined) {
+            return;
+        }
+
+        sharePrice = update.price;
+        change = update.change;
+        priceDom.textContent = `$${round(sharePrice, 2)}`;
+        showChange();
+
+        if (shares.value !== "") {
+            checkShares();
+        }
+    });
+};
+
+streamPrice();
 
 // Show the validation messages as soon as the fields are edited
 transaction.onchange = checkShares;
@@ -119,7 +171,7 @@ stockForm.addEventListener("submit", async (event) => {
         "input[name='csrfmiddlewaretoken']"
     ).value;
     // Make sure the form input is valid
-    const [isBuying, numShares] = await checkShares();
+    const [isBuying, numShares] = checkShares();
 
     // The input is valid, so collect all the data to send to Django
     const stockData = {
@@ -148,12 +200,16 @@ stockForm.addEventListener("submit", async (event) => {
         const resp = await req.json();
 
         if (resp.status === "success") {
+            await refreshPreview();
+            checkShares();
             showToastMessage(
                 false,
                 `Successfully ${isBuying ? "bought" : "sold"} ${numShares} ${
                     numShares === 1 ? "share" : "shares"
                 } from ${ticker}!`
             );
+        } else if (resp.error !== undefined) {
+            showToastMessage(true, `Error: ${resp.error}.`);
         } else if (resp.maxShares === 0) {
             showToastMessage(
                 true,
@@ -182,21 +238,6 @@ const longCtx = document.getElementById("long-chart").getContext("2d");
 const longStatsDom = document.querySelector(".long-stats-container");
 const longPredictDom = document.querySelector("#long-predict");
 
-// Short and Long-Term stock history data
-const historyData = JSON.parse(
-    document.getElementById("history-data").textContent
-);
-
-const shortTermLength = ((52 / 12) * 5) >> 0; // average # of weekdays per month
-const shortTermData = historyData.slice(0, shortTermLength).reverse();
-const shortTermDates = shortTermData.map((data) => data.date);
-const shortTermPrices = shortTermData.map((data) => data.close);
-
-const longTermLength = 52 * 5; // average # of weekdays per year
-const longTermData = historyData.slice(0, longTermLength).reverse();
-const longTermDates = longTermData.map((data) => data.date);
-const longTermPrices = longTermData.map((data) => data.close);
-
 // Alert elements
 const investAlert = document.querySelector(".invest-alert");
 const trader = document.querySelector(".trader");
@@ -209,37 +250,7 @@ new bootstrap.Popover(trader);
 new bootstrap.Popover(broker);
 new bootstrap.Popover(marketOrder);
 
-// Analytical functions and calculations
-const sum = (arr) => arr.reduce((e1, e2) => e1 + e2, 0);
-
-const getStats = (prices) => {
-    // Get the statistical properties of the price array
-    const mean = sum(prices) / prices.length;
-    const variance =
-        sum(prices.map((price) => (price - mean) ** 2)) / (prices.length - 1);
-    const standardDeviation = Math.sqrt(variance);
-    const standardError = standardDeviation / Math.sqrt(prices.length);
-    // ...prices creates a copy of the array
-    const min = Math.min(...prices);
-    const max = Math.max(...prices);
-    // Sort the array and find the first and third quartiles
-    // (Need to specify the sorting algorithm for numeric sorts)
-    const sortedArr = [...prices].sort((p1, p2) => p1 - p2);
-    const q1 = sortedArr[Math.floor(sortedArr.length / 4)];
-    const q3 = sortedArr[Math.ceil((sortedArr.length * 3) / 4)];
-    const iqr = q3 - q1;
-
-    return {
-        mean,
-        variance,
-        standardDeviation,
-        standardError,
-        min,
-        max,
-        iqr,
-    };
-};
-
+// The stats are computed on the server, these functions only display them
 const displayStats = (stats, dom) => {
     // dom[0] is for predictions
     const [_, mean, variance, std, err, min, max, iqr] = dom.children;
@@ -261,27 +272,6 @@ const displayStats = (stats, dom) => {
     iqr.innerHTML = `<strong>IQR:</strong> ${round(stats.iqr, 2)}`;
 };
 
-// Calculate the x value of a normal curve given the mean and standard deviation
-const normalProb = (x, mu, sigma) =>
-    Math.exp(-((x - mu) ** 2) / (2 * sigma ** 2)) /
-    (sigma * Math.sqrt(2 * Math.PI));
-
-/* p(v|m) = prod(p(mi|v) * p(v), for i in m)
- * p(mi|v): mi is x, v is mu, and se is sigma
- * p(v): v is x, mu is mu, and sigma is sigma
- */
-const bayesProb = (predictedPrice, pastPrices, stats) => {
-    let total = 1;
-
-    for (const price of pastPrices) {
-        total *=
-            normalProb(price, predictedPrice, stats.standardError) *
-            normalProb(predictedPrice, stats.mean, stats.standardDeviation);
-    }
-
-    return total;
-};
-
 const displayProb = (prob, stats, dom) => {
     if (dom === shortPredictDom) {
         console.log(
@@ -300,25 +290,7 @@ const displayProb = (prob, stats, dom) => {
     }
 };
 
-const predictPrice = (y) => {
-    // Perform linear regression to find the best line of fit given the data points
-    const n = y.length;
-    const x = [...Array(n).keys()];
-    const xy = x.map((e, i) => e * y[i]);
-    const x2 = x.map((e) => e ** 2);
-    const y2 = y.map((e) => e ** 2);
-    /* Formulas from: https://www.statisticshowto.com/probability-and-statistics/regression-analysis
-     * /find-a-linear-regression-equation/#FindaLinear
-     */
-    const m = (n * sum(xy) - sum(x) * sum(y)) / (n * sum(x2) - sum(x) ** 2);
-    const b =
-        (sum(y) * sum(x2) - sum(x) * sum(xy)) / (n * sum(x2) - sum(x) ** 2);
-    const line = x.map((p) => m * p + b);
-    return [m, b, line];
-};
-
-const displayPred = (m, n, b, dom) => {
-    const pred = m * n + b;
+const displayPred = (m, pred, dom) => {
     dom.textContent = `Predicted Price: $${round(pred, 2)}`;
 
     // Show more info about how the price will change while hovering over the price
@@ -342,196 +314,219 @@ const displayPred = (m, n, b, dom) => {
     }
 };
 
-// Compute and display the stats for the short-term and long-term
-const shortTermStats = getStats(shortTermPrices);
-displayStats(shortTermStats, shortStatsDom);
-const longTermStats = getStats(longTermPrices);
-displayStats(longTermStats, longStatsDom);
-
-// Calculate the most likely price the next day
-const shortTermProb = bayesProb(
-    shortTermStats.mean,
-    shortTermPrices,
-    shortTermStats
-);
-displayProb(shortTermProb, shortTermStats, shortPredictDom);
-const longTermProb = bayesProb(
-    longTermStats.mean,
-    longTermPrices,
-    longTermStats
-);
-displayProb(longTermProb, longTermStats, longPredictDom);
-
-const [shortM, shortB, shortLine] = predictPrice(shortTermPrices);
-displayPred(shortM, shortTermData.length, shortB, shortPredictDom);
-const [longM, longB, longLine] = predictPrice(longTermPrices);
-// longTermData.length may be less than longTermLength
-displayPred(longM, longTermData.length, longB, longPredictDom);
-
-// Determine the risk based on the standard deviation in the short-term and long-term
-if (
-    shortTermStats.standardDeviation <= 10 &&
-    longTermStats.standardDeviation <= 10
-) {
-    investAdvice.innerHTML = investAdvice.innerHTML.replace("[level]", "low");
-} else if (
-    shortTermStats.standardDeviation > 10 &&
-    longTermStats.standardDeviation > 10
-) {
-    investAdvice.innerHTML = investAdvice.innerHTML.replace("[level]", "high");
-} else {
-    investAdvice.innerHTML = investAdvice.innerHTML.replace(
-        "[level]",
-        "moderate"
-    );
-}
-
-// Give a recommendation based on where the stock price is trending (buy low, sell high)
-if (shortM <= 0 && longM > 0) {
-    // If the latest stock price is low but the trend line is positive --> buy
-    investAdvice.innerHTML = investAdvice.innerHTML.replace(
-        "[advice]",
-        "The price is low now, " +
-            "but the general trend is positive, so I recommend buying these stocks."
-    );
-    investAlert.classList.add("alert-success");
-} else if (shortM <= 0 && longM <= 0) {
-    // If the stock price is low and the trend line is negative --> ignore/sell everything
-    investAdvice.innerHTML = investAdvice.innerHTML.replace(
-        "[advice]",
-        "This stock is going down in value, so I recommend ignoring this stock or selling " +
-            "everything if you still have shares."
-    );
-    investAlert.classList.add("alert-danger");
-} else if (shortM > 0 && longM <= 0) {
-    // If the stock price is high and the trend line is negative --> sell
-    investAdvice.innerHTML = investAdvice.innerHTML.replace(
-        "[advice]",
-        "The price is high now, " +
-            "but the general trend is negative, so I recommend selling these stocks."
-    );
-    investAlert.classList.add("alert-warning");
-} else {
-    // If the stock price is high and the trend line is positive --> buy/hold
-    investAdvice.innerHTML = investAdvice.innerHTML.replace(
-        "[advice]",
-        "This stock is rising in " +
-            "value, so I recommend buying this stock or holding if you already own shares."
-    );
-    investAlert.classList.add("alert-success");
-}
-
-// Access the volatility and risk now that the innerHTML has been updated
-const volatility = document.querySelector(".volatility");
-const risk = document.querySelector(".risk");
-new bootstrap.Popover(volatility);
-new bootstrap.Popover(risk);
-
-// Chart for the short-term data
-const shortChart = new Chart(shortCtx, {
-    type: "line",
-
-    data: {
-        labels: shortTermDates,
-        datasets: [
-            {
-                // Draw the trend line on top of the price graph
-                label: "Trend Line",
-                backgroundColor: "#000", // black
-                borderColor: "#333",
-                fill: false, // just show a line
-                data: shortLine,
-            },
-            {
-                label: "Stock Price",
-                backgroundColor: "#00bfff", // deepskyblue
-                borderColor: "#00f",
-                fill: true,
-                data: shortTermPrices,
-            },
-        ],
-    },
-
-    options: {
-        aspectRatio: window.innerWidth < 1200 ? 1.25 : 1.5, // width / height
-        plugins: {
-            title: {
-                display: true,
-                font: {
-                    size: 18,
+// Draw the charts and stats once they're loaded
+const showStats = (stats) => {
+    // Short and Long-Term stock history data
+    const shortTermStats = stats.shortTerm;
+    const shortTermDates = shortTermStats.dates;
+    const shortTermPrices = shortTermStats.prices;
+    const shortLine = shortTermStats.line;
+    const shortM = shortTermStats.slope;
+
+    const longTermStats = stats.longTerm;
+    const longTermDates = longTermStats.dates;
+    const longTermPrices = longTermStats.prices;
+    const longLine = longTermStats.line;
+    const longM = longTermStats.slope;
+
+    // Display the stats for the short-term and long-term
+    displayStats(shortTermStats, shortStatsDom);
+    displayStats(longTermStats, longStatsDom);
+
+    // Show the most likely price the next day
+    displayProb(shortTermStats.probability, shortTermStats, shortPredictDom);
+    displayProb(longTermStats.probability, longTermStats, longPredictDom);
+
+    displayPred(shortM, shortTermStats.prediction, shortPredictDom);
+    displayPred(longM, longTermStats.prediction, longPredictDom);
+
+    // Determine the risk based on the standard deviation in the short-term and long-term
+    if (
+        shortTermStats.standardDeviation <= 10 &&
+        longTermStats.standardDeviation <= 10
+    ) {
+        investAdvice.innerHTML = investAdvice.innerHTML.replace("[level]", "low");
+    } else if (
+        shortTermStats.standardDeviation > 10 &&
+        longTermStats.standardDeviation > 10
+    ) {
+        investAdvice.innerHTML = investAdvice.innerHTML.replace("[level]", "high");
+    } else {
+        investAdvice.innerHTML = investAdvice.innerHTML.replace(
+            "[level]",
+            "moderate"
+        );
+    }
+
+    // Give a recommendation based on where the stock price is trending (buy low, sell high)
+    if (shortM <= 0 && longM > 0) {
+        // If the latest stock price is low but the trend line is positive --> buy
+        investAdvice.innerHTML = investAdvice.innerHTML.replace(
+            "[advice]",
+            "The price is low now, " +
+                "but the general trend is positive, so I recommend buying these stocks."
+        );
+        investAlert.classList.add("alert-success");
+    } else if (shortM <= 0 && longM <= 0) {
+        // If the stock price is low and the trend line is negative --> ignore/sell everything
+        investAdvice.innerHTML = investAdvice.innerHTML.replace(
+            "[advice]",
+            "This stock is going down in value, so I recommend ignoring this stock or selling " +
+                "everything if you still have shares."
+        );
+        investAlert.classList.add("alert-danger");
+    } else if (shortM > 0 && longM <= 0) {
+        // If the stock price is high and the trend line is negative --> sell
+        investAdvice.innerHTML = investAdvice.innerHTML.replace(
+            "[advice]",
+            "The price is high now, " +
+                "but the general trend is negative, so I recommend selling these stocks."
+        );
+        investAlert.classList.add("alert-warning");
+    } else {
+        // If the stock price is high and the trend line is positive --> buy/hold
+        investAdvice.innerHTML = investAdvice.innerHTML.replace(
+            "[advice]",
+            "This stock is rising in " +
+                "value, so I recommend buying this stock or holding if you already own shares."
+        );
+        investAlert.classList.add("alert-success");
+    }
+
+    // Access the volatility and risk now that the innerHTML has been updated
+    const volatility = document.querySelector(".volatility");
+    const risk = document.querySelector(".risk");
+    new bootstrap.Popover(volatility);
+    new bootstrap.Popover(risk);
+
+    // Chart for the short-term data
+    const shortChart = new Chart(shortCtx, {
+        type: "line",
+
+        data: {
+            labels: shortTermDates,
+            datasets: [
+                {
+                    // Draw the trend line on top of the price graph
+                    label: "Trend Line",
+                    backgroundColor: "#000", // black
+                    borderColor: "#333",
+                    fill: false, // just show a line
+                    data: shortLine,
                 },
-                text: "Short-Term Historical Data",
-            },
+                {
+                    label: "Stock Price",
+                    backgroundColor: "#00bfff", // deepskyblue
+                    borderColor: "#00f",
+                    fill: true,
+                    data: shortTermPrices,
+                },
+            ],
         },
-        scales: {
-            x: {
+
+        options: {
+            aspectRatio: window.innerWidth < 1200 ? 1.25 : 1.5, // width / height
+            plugins: {
                 title: {
                     display: true,
-                    text: "Date",
+                    font: {
+                        size: 18,
+                    },
+                    text: "Short-Term Historical Data",
                 },
             },
-            y: {
-                title: {
-                    display: true,
-                    text: "Price ($)",
+            scales: {
+                x: {
+                    title: {
+                        display: true,
+                        text: "Date",
+                    },
+                },
+                y: {
+                    title: {
+                        display: true,
+                        text: "Price ($)",
+                    },
                 },
             },
         },
-    },
-});
+    });
 
-// Chart for the long-term data
-const longChart = new Chart(longCtx, {
-    type: "line",
-
-    data: {
-        labels: longTermDates, // x-axis labels
-        datasets: [
-            {
-                // Draw the trend line on top of the price graph
-                label: "Trend Line",
-                backgroundColor: "#000", // black
-                borderColor: "#333",
-                fill: false, // just show a line
-                data: longLine,
-            },
-            {
-                label: "Stock Price",
-                backgroundColor: "#00bfff", // deepskyblue
-                borderColor: "#00f",
-                fill: true,
-                data: longTermPrices,
-            },
-        ],
-    },
-
-    options: {
-        aspectRatio: window.innerWidth < 1200 ? 1.25 : 1.5, // width / height
-        plugins: {
-            title: {
-                display: true,
-                font: {
-                    size: 18,
+    // Chart for the long-term data
+    const longChart = new Chart(longCtx, {
+        type: "line",
+
+        data: {
+            labels: longTermDates, // x-axis labels
+            datasets: [
+                {
+                    // Draw the trend line on top of the price graph
+                    label: "Trend Line",
+                    backgroundColor: "#000", // black
+                    borderColor: "#333",
+                    fill: false, // just show a line
+                    data: longLine,
                 },
-                text: "Long-Term Historical Data",
-            },
+                {
+                    label: "Stock Price",
+                    backgroundColor: "#00bfff", // deepskyblue
+                    borderColor: "#00f",
+                    fill: true,
+                    data: longTermPrices,
+                },
+            ],
         },
-        scales: {
-            x: {
+
+        options: {
+            aspectRatio: window.innerWidth < 1200 ? 1.25 : 1.5, // width / height
+            plugins: {
                 title: {
                     display: true,
-                    text: "Date",
-                },
-                ticks: {
-                    autoSkipPadding: 5,
+                    font: {
+                        size: 18,
+                    },
+                    text: "Long-Term Historical Data",
                 },
             },
-            y: {
-                title: {
-                    display: true,
-                    text: "Price ($)",
+            scales: {
+                x: {
+                    title: {
+                        display: true,
+                        text: "Date",
+                    },
+                    ticks: {
+                        autoSkipPadding: 5,
+                    },
+                },
+                y: {
+                    title: {
+                        display: true,
+                        text: "Price ($)",
+                    },
                 },
             },
         },
-    },
-});
+    });
+};
+
+// Load the stats separately so the rest of the page shows up right away
+const loadStats = async () => {
+    const statsUrl = document.querySelector(".main-info-container").dataset
+        .statsUrl;
+
+    try {
+        const req = await fetch(statsUrl);
+        const resp = await req.json();
+
+        if (resp.error !== undefined) {
+            investAdvice.textContent = `Error: ${resp.error}`;
+            investAlert.classList.add("alert-danger");
+        } else {
+            showStats(resp);
+        }
+    } catch (error) {
+        console.error(`Error: ${error}`);
+    }
+};
+
+loadStats();
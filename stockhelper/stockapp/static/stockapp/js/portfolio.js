@@ -3,11 +3,11 @@ const roiAlert = document.querySelector(".roi-alert");
 const portfolio = document.querySelector(".portfolio");
 const roi = document.querySelector(".roi");
 const portfolioStatus = document.querySelector(".portfolio-status");
-const balance = document.querySelector(".balance");
+const netWorthContainer = document.querySelector(".net-worth-container");
 const netWorthDom = document.querySelector(".net-worth");
-const netWorthSpinner = document.querySelector(".net-worth-spinner");
 
 // Table elements
+const stockTable = document.querySelector(".stock-table");
 const sharePrice = document.querySelector(".share-price");
 const tableRows = document.querySelectorAll(".table-row");
 
@@ -18,88 +18,142 @@ const toMoney = (num) =>
         maximumFractionDigits: 2,
     })}`;
 
-// Parse a money string into a float
-const toNum = (str) => parseFloat(str.replace(/[$,]/g, ""));
-
-// Asychronously update the price and change of each stock, then update the net worth
-const getPriceAndChange = async () => {
-    // Add the current balance with the value of each stock to calculate the user's net worth
-    let netWorth = toNum(balance.textContent);
-
-    for (const row of tableRows) {
-        const stockTicker = row.querySelector(".stock-ticker");
-
-        try {
-            const req = await fetch(
-                `${window.location.origin}/stockapp/api/price/${stockTicker.textContent}`
-            );
-            const resp = await req.json();
-
-            // Remove the spinners
-            const stockPrice = row.querySelector(".stock-price");
-            const priceSpinner = row.querySelector(".price-spinner");
-            const stockChange = row.querySelector(".stock-change");
-            const changeSpinner = row.querySelector(".change-spinner");
-            priceSpinner.remove();
-            changeSpinner.remove();
-
-            // Show an error if the request failed
-            if (resp.error !== undefined) {
-                stockPrice.textContent = "Error";
-                stockPrice.classList.add("text-danger");
-                stockChange.textContent = resp.error;
-                stockChange.classList.add("text-danger");
-            } else {
-                const { price, change, shares } = resp;
-                netWorth += shares * price;
-
-                // Display the price and change for each row
-                stockPrice.textContent = `$${price}`;
-
-                // Make the change text green or red depending on its sign
-                if (change < 0) {
-                    stockChange.innerHTML = `▼ ${-change}`;
-                    stockChange.classList.add("text-danger");
-                } else {
-                    stockChange.innerHTML = `▲ ${change}`;
-                    stockChange.classList.add("text-success");
-                }
-            }
-        } catch (error) {
-            console.error(`Error: ${error}`);
-        }
-    }
-
-    // Replace the spinner with the actual value
-    netWorthSpinner.remove();
+// Show the net worth and how much it changed since the user started (calculated by the server)
+const showNetWorth = ({ netWorth, change, roi }) => {
+    roiAlert.classList.remove("alert-info", "alert-success", "alert-danger");
+    netWorthDom.classList.remove("text-success", "text-danger");
     netWorthDom.textContent = toMoney(netWorth);
 
-    const startingBalance = 10000;
-    const netWorthChange = netWorth - startingBalance;
-
-    if (netWorthChange > 0) {
+    if (change > 0) {
         // Give the user feedback on how well their investment is going
         portfolioStatus.textContent =
             "Right now, you're making a profit. Keep up the good work!";
-        roiAlert.classList.remove("alert-info");
         roiAlert.classList.add("alert-success");
 
         // Show how much the net worth has changed (25b2 for up arrow and 25bc for down arrow)
         netWorthDom.classList.add("text-success");
-        netWorthDom.innerHTML += ` ▲ ${toMoney(netWorthChange)}`;
-    } else if (netWorthChange < 0) {
+        netWorthDom.innerHTML += ` ▲ ${toMoney(change)} (${roi.toFixed(2)}%)`;
+    } else if (change < 0) {
         portfolioStatus.textContent =
             "Right now, you have a net loss. Consider selling stocks " +
             "that are falling or buying stocks that are on the rise.";
-        roiAlert.classList.remove("alert-info");
         roiAlert.classList.add("alert-danger");
 
         netWorthDom.classList.add("text-danger");
-        netWorthDom.innerHTML += ` ▼ ${toMoney(-netWorthChange)}`;
+        netWorthDom.innerHTML += ` ▼ ${toMoney(-change)} (${(-roi).toFixed(2)}%)`;
+    } else {
+        portfolioStatus.textContent = "";
+        roiAlert.classList.add("alert-info");
+    }
+};
+
+// Show the price and change of a row, or why they couldn't be found
+const showPrice = (row, resp) => {
+    const stockPrice = row.querySelector(".stock-price");
+    const stockChange = row.querySelector(".stock-change");
+    // Remove the spinners
+    row.querySelector(".price-spinner")?.remove();
+    row.querySelector(".change-spinner")?.remove();
+    stockPrice.classList.remove("text-danger");
+    stockChange.classList.remove("text-success", "text-danger");
+
+    // Show an error if the request failed
+    if (resp.error !== undefined) {
+        stockPrice.textContent = "Error";
+        stockPrice.classList.add("text-danger");
+        stockChange.textContent = resp.error;
+        stockChange.classList.add("text-danger");
+    } else {
+        const { price, change } = resp;
+
+        // Display the price and change for each row
+        stockPrice.textContent = `$${price}`;
+
+        // Make the change text green or red depending on its sign
+        if (change < 0) {
+            stockChange.innerHTML = `▼ ${-change}`;
+            stockChange.classList.add("text-danger");
+        } else {
+            stockChange.innerHTML = `▲ ${change}`;
+            stockChange.classList.add("text-success");
+        }
+    }
+};
+
+// The latest prices were saved, so get the updated net worth
+const getNetWorth = async () => {
+    try {
+        const req = await fetch(netWorthContainer.dataset.netWorthUrl);
+        showNetWorth(await req.json());
+    } catch (error) {
+        console.error(`Error: ${error}`);
+    }
+};
+
+// Asychronously update the price and change of each stock, then update the net worth
+const getPriceAndChange = async () => {
+    // Fetch the prices of every stock in the portfolio with a single request
+    let prices = {};
+
+    if (tableRows.length > 0) {
+        try {
+            const req = await fetch(`${window.location.origin}/stockapp/api/prices`);
+            prices = await req.json();
+        } catch (error) {
+            console.error(`Error: ${error}`);
+        }
+    }
+
+    for (const row of tableRows) {
+        const stockTicker = row.querySelector(".stock-ticker");
+        // If the whole request failed, show the same error on each row
+        const resp = prices.error !== undefined
+            ? prices
+            : prices[stockTicker.textContent] ?? {
+                  error: "Couldn't get the latest price",
+              };
+        showPrice(row, resp);
+    }
+
+    if (tableRows.length > 0) {
+        await getNetWorth();
+    }
+};
+
+// Keep the prices up to date while the page is open
+const streamPrices = () => {
+    const rows = {};
+
+    for (const row of tableRows) {
+        rows[row.querySelector(".stock-ticker").textContent] = row;
     }
+
+    const tickers = encodeURIComponent(Object.keys(rows).join(","));
+    const source = new EventSource(
+        `${stockTable.dataset.streamUrl}?tickers=${tickers}`
+    );
+    let netWorthTimeout;
+
+    source.addEventListener("price", (event) => {
+        const update = JSON.parse(event.data);
+
+        // Keep showing the last price if a check failed
+        if (update.error !== undefined || rows[update.ticker] === undefined) {
+            return;
+        }
+
+        showPrice(rows[update.ticker], update);
+        // Several prices can change at once, so wait for them before getting the net worth
+        clearTimeout(netWorthTimeout);
+        netWorthTimeout = setTimeout(getNetWorth, 1000);
+    });
 };
 
-getPriceAndChange();
+getPriceAndChange().then(() => {
+    if (tableRows.length > 0) {
+        streamPrices();
+    }
+});
 
 new bootstrap.Popover(portfolio);
 new bootstrap.Popover(roi);
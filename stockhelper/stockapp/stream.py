@@ -0,0 +1,150 @@
+from django.conf import settings
+
+from . import async_api, quotes
+from .models import Stock
+import asyncio
+import contextvars
+import json
+import logging
+from weakref import WeakKeyDictionary
+
+logger = logging.getLogger(__name__)
+
+# Max number of tickers a single stream can watch
+MAX_TICKERS = 50
+# Seconds between comments sent to keep idle connections from being closed by proxies
+KEEPALIVE = 15
+# Updates a slow stream can fall behind by before the oldest ones are dropped
+QUEUE_SIZE = 100
+# How long (in milliseconds) browsers wait before reconnecting
+RETRY = 5000
+
+_hubs = WeakKeyDictionary()  # event loop --> PriceHub
+
+
+async def get_quote(ticker):
+    # Use the saved price if the quote refresher kept it fresh, otherwise ask FMP (cached, so every
+    # worker watching the same ticker shares the call) and save the new price
+    stock = await Stock.objects.filter(ticker=ticker).afirst()
+
+    if stock is not None and quotes.is_fresh(stock):
+        return {"ticker": ticker, "price": float(stock.price), "change": stock.change}
+
+    raw_quotes = await async_api.get_quotes([ticker])
+
+    if not isinstance(raw_quotes, list):
+        error = raw_quotes.get("Error Message", raw_quotes) if hasattr(
+            raw_quotes, "get") else raw_quotes
+        return {"ticker": ticker, "error": error}
+
+    quote = next((quote for quote in raw_quotes if quote["symbol"] == ticker), None)
+
+    if quote is None:
+        return {"ticker": ticker, "error": f"No stock {ticker} found"}
+
+    if stock is not None:
+        quotes.update_stock(stock, quote)
+        await stock.asave()
+
+    return {"ticker": ticker, "price": float(quote["price"]), "change": quote["change"]}
+
+
+class PriceHub:
+    """
+    Polls the price of each ticker that's being watched in this process, then sends every
+    change to all the streams watching it. There's one poller per ticker no matter how many
+    streams are open, and it stops once the last stream watching it closes.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.subscribers = {}  # ticker --> set of queues
+        self.pollers = {}  # ticker --> task
+        self.latest = {}  # ticker --> last update, sent right away to new subscribers
+
+    def subscribe(self, tickers):
+        # Returns a queue that gets every update of the tickers
+        queue = asyncio.Queue(QUEUE_SIZE)
+
+        for ticker in tickers:
+            self.subscribers.setdefault(ticker, set()).add(queue)
+
+            if ticker in self.latest:
+                queue.put_nowait(self.latest[ticker])
+            if ticker not in self.pollers:
+                # Don't let the poller inherit the request's context (e.g. its timing metrics),
+                # since it outlives the request
+                self.pollers[ticker] = contextvars.Context().run(
+                    asyncio.get_running_loop().create_task, self.poll(ticker))
+
+        return queue
+
+    def unsubscribe(self, queue, tickers):
+        for ticker in tickers:
+            subscribers = self.subscribers.get(ticker, set())
+            subscribers.discard(queue)
+
+            if not subscribers:
+                # Nobody is watching anymore
+                self.subscribers.pop(ticker, None)
+                self.latest.pop(ticker, None)
+                poller = self.pollers.pop(ticker, None)
+
+                if poller is not None:
+                    poller.cancel()
+
+    def publish(self, update):
+        self.latest[update["ticker"]] = update
+
+        for queue in self.subscribers.get(update["ticker"], ()):
+            if queue.full():
+                queue.get_nowait()
+
+            queue.put_nowait(update)
+
+    async def poll(self, ticker):
+        while True:
+            try:
+                update = await get_quote(ticker)
+            except Exception:
+                # Keep polling, the next try might work
+                logger.exception("Couldn't get the price of %s", ticker)
+            else:
+                if update != self.latest.get(ticker):
+                    self.publish(update)
+
+            await asyncio.sleep(self.interval)
+
+
+def get_hub():
+    # Tasks can only run in the loop that made them, so each event loop gets its own hub
+    loop = asyncio.get_running_loop()
+
+    if loop not in _hubs:
+        _hubs[loop] = PriceHub(settings.STREAM_INTERVAL)
+
+    return _hubs[loop]
+
+
+def format_event(update):
+    # e.g. event: price\ndata: {"ticker": "AAPL", "price": 200.5, "change": 1.25}\n\n
+    # Errors are sent as prices too since browsers use "error" events for connection errors
+    return f"event: price\ndata: {json.dumps(update)}\n\n"
+
+
+async def get_events(hub, tickers):
+    # The body of a text/event-stream response, it runs until the client disconnects
+    queue = hub.subscribe(tickers)
+
+    try:
+        yield f"retry: {RETRY}\n\n"
+
+        while True:
+            try:
+                update = await asyncio.wait_for(queue.get(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(update)
+    finally:
+        hub.unsubscribe(queue, tickers)
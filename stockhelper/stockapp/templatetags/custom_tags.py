@@ -2,8 +2,10 @@ from django import template
 
 register = template.Library()
 # Add commas to long numbers to make them more readable
-register.filter("commas", lambda num: f"{num:,}")
+register.filter("commas", lambda num: f"{num:,}" if num is not None else "N/A")
 # Always show 2 decimal places for prices
-register.filter("money", lambda num: f"{num:.2f}")
+register.filter("money", lambda num: f"{num:.2f}" if num is not None else "N/A")
 # Combine both filters above
-register.filter("money_commas", lambda num: f"{num:,.2f}")
+register.filter("money_commas", lambda num: f"{num:,.2f}" if num is not None else "N/A")
+# Show the size of a change (the arrow shows its sign)
+register.filter("abs", lambda num: abs(num))
@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import timedelta
+from stockapp import analytics
+from stockapp.models import DailyBar
+import statistics
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+# 30 days of prices, newest first like FMP
+CLOSES = [100 + (i % 7) * 1.5 - i * 0.25 for i in range(30)]
+HISTORY = [{"symbol": "PRU", "date": f"2026-09-{30 - i:02d}", "open": close, "high": close,
+            "low": close, "close": close, "volume": 1000} for i, close in enumerate(CLOSES)]
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_match_scalar_formulas(self):
+        # Check that the vectorized stats match the formulas used by the old JS
+        result = analytics.analyze(HISTORY)
+        short_term = result["shortTerm"]
+        prices = CLOSES[:analytics.SHORT_TERM_LENGTH][::-1]
+
+        self.assertEqual(short_term["prices"], prices)
+        self.assertEqual(short_term["dates"][-1], HISTORY[0]["date"])
+        self.assertAlmostEqual(short_term["mean"], statistics.mean(prices))
+        self.assertAlmostEqual(short_term["variance"], statistics.variance(prices))
+        self.assertAlmostEqual(short_term["standardDeviation"], statistics.stdev(prices))
+        self.assertAlmostEqual(short_term["standardError"],
+                               statistics.stdev(prices) / len(prices) ** 0.5)
+        self.assertEqual(short_term["min"], min(prices))
+        self.assertEqual(short_term["max"], max(prices))
+
+        sorted_prices = sorted(prices)
+        self.assertAlmostEqual(short_term["iqr"], sorted_prices[16] - sorted_prices[5])
+        # The long-term window includes all 30 days since there are fewer than 260
+        self.assertEqual(len(result["longTerm"]["prices"]), len(CLOSES))
+
+    def test_linear_regression(self):
+        # Check that a perfectly linear series is predicted exactly
+        history = [{"date": str(i), "close": 50 - 2 * i} for i in range(10)]
+        long_term = analytics.analyze(history)["longTerm"]
+
+        # Oldest to newest, the price goes up by $2 a day
+        self.assertAlmostEqual(long_term["slope"], 2)
+        self.assertAlmostEqual(long_term["intercept"], 32)
+        self.assertAlmostEqual(long_term["prediction"], 52)
+        self.assertAlmostEqual(long_term["line"][-1], 50)
+
+    def test_not_enough_history(self):
+        # Check that a single price can't be analyzed
+        with self.assertRaises(ValueError):
+            analytics.analyze(HISTORY[:1])
+
+    @patch("stockapp.analytics.analyze", wraps=analytics.analyze)
+    def test_cached_per_trading_day(self, mock_analyze):
+        # Check that the stats are only computed once until a new bar comes in
+        analytics.get_analysis("PRU", HISTORY)
+        analytics.get_analysis("pru", HISTORY)
+        self.assertEqual(mock_analyze.call_count, 1)
+
+        new_bar = {"date": "2026-10-01", "close": 101}
+        analytics.get_analysis("PRU", [new_bar] + HISTORY)
+        self.assertEqual(mock_analyze.call_count, 2)
+
+
+class StatsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+
+    def test_redirect_without_login(self):
+        # Check that the view redirects to the login screen if the user isn't logged in
+        url = reverse("stockapp:stats", args=("PRU",))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertRedirects(response, f"{reverse('login')}?next={url}")
+
+    @patch("stockapp.api.get_stock_history", return_value=HISTORY)
+    def test_view_renders(self, mock_history):
+        # Check that the short-term and long-term stats are returned
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:stats", args=("PRU",)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), analytics.analyze(HISTORY))
+
+    @patch("stockapp.api.get_stock_history", return_value=[])
+    def test_full_long_term_window(self, mock_history):
+        # Check that a year with market holidays still fills the long-term window
+        today = timezone.localdate()
+        weekdays = [day for day in (today - timedelta(days=i) for i in range(400))
+                    if day.weekday() < 5]
+        # Skip every 25th weekday as a holiday, about as many as the market has in a year
+        DailyBar.objects.bulk_create([
+            DailyBar(ticker="PRU", date=day, open=100, high=100, low=100, close=100 + i % 5,
+                     volume=1000) for i, day in enumerate(weekdays) if i % 25 != 24
+        ])
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:stats", args=("PRU",)))
+
+        self.assertEqual(len(response.json()["longTerm"]["prices"]), analytics.LONG_TERM_LENGTH)
+
+    @patch("stockapp.api.get_stock_history", return_value=[])
+    def test_invalid_stock(self, mock_history):
+        # Check that a stock without any history returns an error
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:stats", args=("qjxz",)))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
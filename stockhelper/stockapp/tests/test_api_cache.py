@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from decimal import Decimal
+from stockapp import api
+from types import SimpleNamespace
+from unittest.mock import patch
+from utils_test import mock_response
+
+PROFILE = [{"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "price": 25.0,
+            "change": -1.12}]
+SCREENER_FORM = {"country": "US", "price_relation": ">", "price_value": Decimal("100"),
+                 "sector": "Technology", "exchange": "nasdaq"}
+
+
+def run_now(target, daemon):
+    # Run background refreshes right away instead of in a thread
+    return SimpleNamespace(start=target)
+
+
+class ApiCacheTests(TestCase):
+    def setUp(self):
+        # The cache isn't reset between tests
+        cache.clear()
+
+    @patch("stockapp.api.get_session")
+    def test_profile_is_cached(self, mock_session):
+        # Check that the same profile is only fetched from FMP once
+        mock_session.return_value.get.return_value = mock_response(PROFILE)
+
+        self.assertEqual(api.get_company_profile("PRU"), PROFILE)
+        self.assertEqual(api.get_company_profile("PRU"), PROFILE)
+        self.assertEqual(mock_session.return_value.get.call_count, 1)
+        self.assertEqual(api.get_cache_stats()["profile"], {
+            "hits": 1,
+            "misses": 1,
+            "hit_ratio": 0.5
+        })
+
+    @patch("stockapp.api.get_session")
+    def test_key_ignores_api_key(self, mock_session):
+        # Check that URLs differing only by the API key or parameter order share an entry
+        self.assertEqual(
+            api.get_cache_key(f"{api.FMP}/profile?apikey=abc&symbol=PRU&limit=1"),
+            api.get_cache_key(f"{api.FMP}/profile?limit=1&symbol=PRU&apikey=xyz")
+        )
+        mock_session.assert_not_called()
+
+    @patch("stockapp.api.get_session")
+    def test_errors_not_cached(self, mock_session):
+        # Check that error messages from FMP are always fetched again
+        mock_session.return_value.get.return_value = mock_response(
+            {"Error Message": "Invalid API KEY."})
+
+        api.get_stock_history("PRU")
+        api.get_stock_history("PRU")
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+
+    @patch("stockapp.api.get_session")
+    def test_invalidate_ticker(self, mock_session):
+        # Check that invalidating a ticker forces the next request to go to FMP
+        mock_session.return_value.get.return_value = mock_response(PROFILE)
+
+        api.get_company_profile("PRU")
+        api.invalidate_ticker("pru")
+        api.get_company_profile("PRU")
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+
+    @override_settings(FMP_CACHE_TTL={"profile": 0})
+    @patch("stockapp.api.get_session")
+    def test_zero_ttl_disables_cache(self, mock_session):
+        # Check that a TTL of 0 skips the cache entirely
+        mock_session.return_value.get.return_value = mock_response(PROFILE)
+
+        api.get_company_profile("PRU")
+        api.get_company_profile("PRU")
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+
+    @patch("stockapp.api.get_session")
+    def test_screener_normalized(self, mock_session):
+        # Check that searches differing only by how the price was entered share an entry
+        mock_session.return_value.get.return_value = mock_response([])
+
+        for price_value in [Decimal("100"), Decimal("100.00"), 100.0]:
+            api.get_stocks({**SCREENER_FORM, "price_value": price_value})
+
+        self.assertEqual(mock_session.return_value.get.call_count, 1)
+        self.assertIn("priceMoreThan=100&", mock_session.return_value.get.call_args.args[0])
+
+    @override_settings(FMP_CACHE_TTL={"company-screener": 60},
+                       FMP_CACHE_STALE={"company-screener": 600})
+    @patch("stockapp.api.Thread", side_effect=run_now)
+    @patch("stockapp.api.get_session")
+    def test_stale_while_revalidate(self, mock_session, mock_thread):
+        # Check that a stale entry is served right away and refreshed in the background
+        mock_session.return_value.get.side_effect = [mock_response([{"symbol": "OLD"}]),
+                                                     mock_response([{"symbol": "NEW"}])]
+        api.get_stocks(SCREENER_FORM)
+        mock_thread.assert_not_called()
+
+        # Expire the TTL, but not the stale window
+        key = api.get_cache_key(mock_session.return_value.get.call_args.args[0])
+        cache.delete(f"{key}:fresh")
+
+        self.assertEqual(api.get_stocks(SCREENER_FORM), [{"symbol": "OLD"}])
+        mock_thread.assert_called_once()
+        self.assertEqual(api.get_stocks(SCREENER_FORM), [{"symbol": "NEW"}])
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+
+    @override_settings(FMP_CACHE_TTL={"company-screener": 60},
+                       FMP_CACHE_STALE={"company-screener": 600})
+    @patch("stockapp.api.Thread")
+    @patch("stockapp.api.get_session")
+    def test_single_revalidation(self, mock_session, mock_thread):
+        # Check that only one refresh runs at a time for the same entry
+        mock_session.return_value.get.return_value = mock_response([])
+        api.get_stocks(SCREENER_FORM)
+        key = api.get_cache_key(mock_session.return_value.get.call_args.args[0])
+        cache.delete(f"{key}:fresh")
+
+        api.get_stocks(SCREENER_FORM)
+        api.get_stocks(SCREENER_FORM)
+        mock_thread.assert_called_once()
+
+
+class ApiSessionTests(TestCase):
+    # The pool is only used when calling FMP
+    @override_settings(FMP_TRANSPORT="passthrough")
+    def test_session_is_shared(self):
+        # Check that every call reuses the same pooled session
+        session = api.get_session()
+        self.assertIs(api.get_session(), session)
+        self.assertIn("gzip", session.headers["Accept-Encoding"])
+        self.assertEqual(session.get_adapter(api.FMP)._pool_maxsize, 10)
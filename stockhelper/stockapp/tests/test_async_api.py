@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from stockapp import api
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+PROFILE = [{"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "price": 110.5,
+            "change": 1.25, "image": "", "beta": 1.1, "averageVolume": 1000, "marketCap": 1000,
+            "lastDividend": 5.2, "range": "90-120", "exchange": "NYSE", "industry": "Insurance",
+            "sector": "Financial Services", "website": "", "description": ""}]
+HISTORY = [{"symbol": "PRU", "date": "2026-10-16", "close": 110.5},
+           {"symbol": "PRU", "date": "2026-10-15", "close": 109.25}]
+
+
+class AsyncApiTests(TestCase):
+    fixtures = ["cards.json"]
+
+    @patch("stockapp.api.get_stock_history", return_value=HISTORY)
+    @patch("stockapp.api.get_company_profile", return_value=PROFILE)
+    def test_detail_view_renders(self, mock_profile, mock_history):
+        # Check that the async detail view renders with the fetched data
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:detail", args=("PRU",)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Details - Prudential Financial, Inc.")
+        self.assertContains(response, USERNAME)
+        self.assertEqual(response.context["profile"], PROFILE[0])
+        # The history is loaded separately through the stats API
+        self.assertContains(response, reverse("stockapp:stats", args=("PRU",)))
+        mock_history.assert_not_called()
+
+    @patch("stockapp.api.get_company_profile", return_value=api.RATE_LIMITED)
+    def test_detail_view_rate_limited(self, mock_profile):
+        # Check that the detail view reports when FMP's quota is used up
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:detail", args=("PRU",)))
+
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from stockapp import benchmark
+from types import SimpleNamespace
+from utils_test import USERNAME, PASSWORD
+
+
+class SummaryTests(SimpleTestCase):
+    def test_percentiles(self):
+        # Check that the percentiles use the nearest rank
+        samples = [(duration / 1000, 2, duration != 100) for duration in range(1, 101)]
+        summary = benchmark.summarize(samples, elapsed=2)
+
+        self.assertEqual(summary["requests"], 100)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["throughput"], 50)
+        self.assertAlmostEqual(summary["p50"], 50)
+        self.assertAlmostEqual(summary["p95"], 95)
+        self.assertAlmostEqual(summary["p99"], 99)
+        self.assertEqual(summary["queries"], 2)
+
+    def test_query_count(self):
+        # Check that the number of queries is read from the Server-Timing header
+        response = SimpleNamespace(headers={
+            "Server-Timing": 'total;dur=5.1, db;desc="3 queries";dur=1.2'})
+        self.assertEqual(benchmark.get_query_count(response), 3)
+        self.assertEqual(benchmark.get_query_count(SimpleNamespace(headers={})), 0)
+
+
+class BenchmarkTests(LiveServerTestCase):
+    fixtures = ["cards.json"]
+
+    def test_run(self):
+        # Check that the views can be driven by several logged in threads
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        runner = benchmark.Benchmark(self.live_server_url, USERNAME, PASSWORD)
+
+        for view in ["home", "portfolio"]:
+            summary = runner.run(view, count=6, concurrency=3)
+            self.assertEqual(summary["requests"], 6)
+            self.assertEqual(summary["errors"], 0)
+            self.assertGreater(summary["queries"], 0)
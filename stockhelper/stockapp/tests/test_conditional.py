@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import timedelta
+from stockapp import screener
+from stockapp.models import Card, Portfolio, Stock
+from unittest.mock import MagicMock, patch
+from utils_test import USERNAME, PASSWORD
+
+PROFILE = [{"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "price": 110.5,
+            "change": 1.25, "averageVolume": 1800000, "marketCap": 39000000000}]
+COMPANY = {"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "marketCap": 40000000000,
+           "sector": "Financial Services", "beta": 1.3, "price": 110.5, "volume": 1500000,
+           "exchangeShortName": "NYSE", "country": "US"}
+SEARCH = {"country": "US", "price_relation": ">", "price_value": 50, "sector": "Any",
+          "exchange": "Any"}
+
+
+class ConditionalGetTests(TestCase):
+    fixtures = ["cards.json"]
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+
+    def assert_not_modified(self, url, etag):
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_flashcards(self):
+        # Check that anonymous users can share the page until the cards change
+        response = self.client.get(reverse("stockapp:flashcards"))
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+        self.assert_not_modified(reverse("stockapp:flashcards"), response["ETag"])
+
+        Card.objects.create(word="Bull Market", definition="When prices are rising")
+        response_after = self.client.get(reverse("stockapp:flashcards"),
+                                         headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response_after.status_code, 200)
+        self.assertNotEqual(response_after["ETag"], response["ETag"])
+
+    def test_flashcards_logged_in(self):
+        # Check that a logged in user's page isn't shared or reused with someone else
+        anonymous_etag = self.client.get(reverse("stockapp:flashcards"))["ETag"]
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:flashcards"),
+                                   headers={"If-None-Match": anonymous_etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_price(self):
+        # Check that the price is revalidated with the quote's timestamp
+        stock = Stock.objects.create(ticker="PRU", name="Prudential Financial, Inc.",
+                                     price=110.5, change=1.25, updated_at=timezone.now())
+        portfolio = Portfolio.objects.create(user=self.user, stock=stock, shares=10)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        url = reverse("stockapp:price", args=("PRU",))
+
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        self.assert_not_modified(url, response["ETag"])
+
+        # Buying more shares changes the response
+        portfolio.shares = 11
+        portfolio.save()
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": response["ETag"]})
+                         .status_code, 200)
+
+    def test_screener_snapshot(self):
+        # Check that search results are revalidated until a new snapshot is taken
+        screener.save_snapshot([COMPANY])
+        url = reverse("stockapp:screener")
+        # The first visit sets the CSRF cookie, which is part of the ETag
+        self.client.get(url, SEARCH)
+        response = self.client.get(url, SEARCH)
+        self.assertContains(response, "Prudential")
+
+        etag = response["ETag"]
+        response = self.client.get(url, SEARCH, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        with patch("stockapp.screener.timezone.now",
+                   return_value=timezone.now() + timedelta(minutes=1)):
+            screener.save_snapshot([COMPANY])
+
+        self.assertEqual(self.client.get(url, SEARCH, headers={"If-None-Match": etag})
+                         .status_code, 200)
+
+    def test_screener_fmp_results(self):
+        # Check that results from FMP, which are only shown once, are never reused
+        session = self.client.session
+        session["results_key"] = screener.save_results([COMPANY])
+        session.save()
+        response = self.client.get(reverse("stockapp:screener"))
+
+        self.assertNotIn("ETag", response)
+        self.assertIn("no-store", response["Cache-Control"])
+
+    @patch("stockapp.api.get_session")
+    def test_detail(self, mock_session):
+        # Check that the details are revalidated until the profile or balance changes
+        mock_session.return_value.get.return_value = MagicMock(
+            status_code=200, json=MagicMock(return_value=PROFILE))
+        self.client.login(username=USERNAME, password=PASSWORD)
+        url = reverse("stockapp:detail", args=("PRU",))
+
+        self.client.get(url)
+        etag = self.client.get(url)["ETag"]
+        self.assert_not_modified(url, etag)
+
+        self.user.balance = 5000
+        self.user.save()
+        self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 200)
@@ -61,7 +61,7 @@ class DetailViewTests(TestCase):
         self.assertContains(response, " | How to Stock")
         self.assertContains(response, USERNAME)
         # Check that the relevant content on the details page is present
-        self.assertContains(response, "history-data")
+        self.assertContains(response, reverse("stockapp:stats", args=("JPM",)))
         self.assertContains(response, "JPM")
         self.assertContains(response, "short-chart")
         self.assertContains(response, "short-predict")
@@ -78,7 +78,6 @@ class DetailViewTests(TestCase):
         self.assertContains(response, "description")
         # Check that the correct context data is passed
         self.assertIsNotNone(response.context["profile"])
-        self.assertIsNotNone(response.context["history"])
         self.assertEqual(response.context["balance"], self.user.balance)
         self.assertEqual({
             "beta", "broker", "dividendYield", "marketCap", "marketExchange", "marketOrder", "risk",
@@ -97,7 +96,7 @@ class DetailViewTests(TestCase):
         self.assertContains(
             response, f"Error: Unknown stock ticker: {bad_ticker}", status_code=400)
         self.assertIsNone(response.context["profile"])
-        self.assertEqual(response.context["history"], bad_ticker)
+        self.assertEqual(response.context["ticker"], bad_ticker)
 
     def test_buy_new_stock(self):
         # Check that buying a stock with 0 shares creates a new Stock object
@@ -192,3 +191,29 @@ class DetailViewTests(TestCase):
         new_portfolio = Portfolio.objects.get(
             user=self.user, stock=self.test_stock)
         self.assertEqual(new_portfolio.shares, old_portfolio.shares)
+
+    def test_invalid_trade(self):
+        # Check that trades with missing or invalid shares or prices are rejected
+        self.client.login(username=USERNAME, password=PASSWORD)
+        self.create_portfolio()
+
+        for key, value, error in [("shares", None, "shares must be a positive integer"),
+                                  ("shares", "5", "shares must be a positive integer"),
+                                  ("shares", -5, "shares must be a positive integer"),
+                                  ("price", 0, "price must be a positive number"),
+                                  ("price", float("nan"), "price must be a positive number")]:
+            self.stock_purchase[key] = value
+            response = self.send_post_request()
+            self.stock_purchase = {**self.stock_purchase, "shares": 10, "price": 25.00}
+
+            self.assertEqual(response.status_code, 400)
+            self.assertJSONEqual(response.content, {"status": "failure", "error": error})
+
+        self.assertEqual(User.objects.get(username=USERNAME).balance, self.user.balance)
+        self.assertEqual(Portfolio.objects.get(user=self.user).shares, 10)
+
+    def test_invalid_body(self):
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.post(reverse("stockapp:detail", args=("PRU",)), "not json",
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from datetime import timedelta
+from http import HTTPStatus
+import json
+from pathlib import Path
+from stockapp import api
+from stockapp.fakefmp import FakeFmp, create_server
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest.mock import patch
+
+
+class FakeFmpTests(TestCase):
+    def test_profile(self):
+        # Check that recorded profiles are found case insensitively and unknown ones are empty
+        status, profile = FakeFmp().respond("/stable/profile", {"symbol": "aapl"})
+
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(profile[0]["companyName"], "Apple Inc.")
+        self.assertEqual(FakeFmp().respond("/stable/profile", {"symbol": "ZZZZ"})[1], [])
+
+    def test_history_is_recent(self):
+        # Check that the recorded history is moved forward and filtered by date
+        start = timezone.localdate() - timedelta(days=31)
+        _, history = FakeFmp().respond("/stable/historical-price-eod/full",
+                                       {"symbol": "AAPL", "from": start.isoformat()})
+
+        self.assertGreater(len(history), 15)
+        self.assertGreater(history[0]["date"], (timezone.localdate() - timedelta(days=7))
+                           .isoformat())
+        self.assertGreaterEqual(history[-1]["date"], start.isoformat())
+
+    def test_screener_filters(self):
+        # Check that the screener filters like FMP's
+        _, companies = FakeFmp().respond("/stable/company-screener", {
+            "priceMoreThan": "100", "sector": "Technology", "exchange": "nasdaq", "limit": "2"})
+
+        self.assertEqual(len(companies), 2)
+        self.assertTrue(all(company["price"] > 100 and company["sector"] == "Technology"
+                            for company in companies))
+
+    def test_recordings_dir(self):
+        # Check that the recordings are served, but not the errors FMP recorded
+        with TemporaryDirectory() as directory:
+            recordings = [
+                {"url": "company-screener?limit=1", "status": 402, "json": {"Error Message": "..."}},
+                {"url": "company-screener?limit=2", "status": 200, "json": [{"symbol": "PRU"}]}
+            ]
+            (Path(directory) / "company-screener.jsonl").write_text(
+                "\n".join(json.dumps(recording) for recording in recordings))
+            fake_fmp = FakeFmp(recordings_dir=directory)
+
+        self.assertEqual(fake_fmp.respond("/stable/company-screener", {})[1], [{"symbol": "PRU"}])
+        self.assertEqual(fake_fmp.respond("/stable/profile", {"symbol": "AAPL"})[1], [])
+
+    def test_rate_limit(self):
+        # Check that calls over the limit get FMP's rate limit response
+        fake_fmp = FakeFmp(rate_limit=1, period=60)
+        fake_fmp.respond("/stable/profile", {"symbol": "AAPL"})
+        status, body = fake_fmp.respond("/stable/profile", {"symbol": "AAPL"})
+
+        self.assertEqual(status, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertGreater(body["X-Rate-Limit-Retry-After-Seconds"], 50)
+
+
+class FakeFmpServerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.server = create_server(FakeFmp(rate_limit=1, period=0.5), port=0)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    @override_settings(FMP_CACHE_TTL={})
+    def test_api_client(self):
+        # Check that the API client works against the fake server, including its rate limit
+        with patch("stockapp.api.FMP", f"http://127.0.0.1:{self.server.server_port}/stable"):
+            self.assertEqual(api.get_company_profile("PRU")[0]["symbol"], "PRU")
+            # The 2nd call is rate limited, so it should be retried once the window is over
+            self.assertEqual(api.get_company_profile("KO", max_wait=5)[0]["symbol"], "KO")
@@ -1,10 +1,15 @@
 from django.test import TestCase
 from django.urls import reverse
 
+from stockapp import glossary
 from stockapp.models import Card
 
 
 class FlashcardsViewTests(TestCase):
+    def setUp(self):
+        # Render the page instead of serving a copy cached by another test
+        glossary.invalidate()
+
     def test_view_renders(self):
         # Check that the view renders properly
         response = self.client.get(reverse("stockapp:flashcards"))
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+
+from stockapp import glossary
+from stockapp.models import Card
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+
+class GlossaryTests(TestCase):
+    # Load all the card data
+    fixtures = ["cards.json"]
+
+    def setUp(self):
+        # Rolling back the previous test doesn't send any signals, so start with a fresh copy
+        glossary.invalidate()
+
+    def test_terms_cached(self):
+        # Check that the cards are only queried once per process
+        glossary.get_terms({"beta": "Beta"})
+
+        with self.assertNumQueries(0):
+            terms = glossary.get_terms({"beta": "Beta", "etf": "ETF"})
+
+        self.assertEqual(terms["beta"], Card.objects.get(word="Beta"))
+        self.assertEqual(terms["etf"], Card.objects.get(word="ETF"))
+
+    def test_invalidated_on_save(self):
+        # Check that editing a card is reflected in the glossary
+        glossary.get_terms({"beta": "Beta"})
+        card = Card.objects.get(word="Beta")
+        card.definition = "A new definition"
+        card.save()
+
+        self.assertEqual(glossary.get_terms({"beta": "Beta"})["beta"].definition,
+                         "A new definition")
+
+    def test_invalidated_on_delete(self):
+        # Check that a deleted card can't be looked up anymore
+        glossary.get_terms({"beta": "Beta"})
+        Card.objects.filter(word="Beta").delete()
+
+        with self.assertRaises(Card.DoesNotExist):
+            glossary.get_terms({"beta": "Beta"})
+
+    def test_reload_on_new_version(self):
+        # Check that a version change from another worker triggers a reload
+        glossary.get_terms({"beta": "Beta"})
+        cache.delete(glossary.VERSION_KEY)
+
+        with self.assertNumQueries(1):
+            glossary.get_terms({"beta": "Beta"})
+
+    def test_pages_expire(self):
+        # Check that the cached pages and fragments expire, since an old version is never read
+        backend = caches["default"]
+
+        with patch.object(backend, "set", wraps=backend.set) as mock_set:
+            self.client.get(reverse("stockapp:index"))
+            self.client.get(reverse("stockapp:flashcards"))
+
+        timeouts = [call.kwargs["timeout"] if "timeout" in call.kwargs else call.args[2]
+                    for call in mock_set.call_args_list]
+        self.assertGreaterEqual(len(timeouts), 3)
+        self.assertEqual(set(timeouts), {glossary.PAGE_TIMEOUT})
+
+    def test_home_view_no_queries(self):
+        # Check that rendering the home page doesn't query the cards
+        self.client.get(reverse("stockapp:index"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("stockapp:index"))
+
+        self.assertEqual(response.status_code, 200)
+
+
+class GlossaryPageTests(TestCase):
+    fixtures = ["cards.json"]
+
+    def setUp(self):
+        glossary.invalidate()
+
+    def test_anonymous_page_cached(self):
+        # Check that anonymous users are served the rendered page without any work
+        self.client.get(reverse("stockapp:flashcards"))
+
+        with self.assertNumQueries(0), \
+                self.assertTemplateNotUsed(template_name="stockapp/flashcards.html"):
+            response = self.client.get(reverse("stockapp:flashcards"))
+
+        self.assertContains(response, "Beta")
+
+    def test_page_invalidated_on_save(self):
+        # Check that editing a card shows up on the cached pages
+        self.client.get(reverse("stockapp:flashcards"))
+        card = Card.objects.get(word="Beta")
+        card.definition = "A new definition"
+        card.save()
+
+        response = self.client.get(reverse("stockapp:flashcards"))
+        self.assertContains(response, "A new definition")
+
+    def test_logged_in_fragments_cached(self):
+        # Check that logged in users get their own page, but the cards aren't queried again
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        self.client.get(reverse("stockapp:flashcards"))
+
+        with self.assertNumQueries(2):  # session and user
+            response = self.client.get(reverse("stockapp:flashcards"))
+
+        self.assertContains(response, USERNAME)
+        self.assertContains(response, "Beta")
@@ -0,0 +1,163 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import date, timedelta
+from stockapp import api, history
+from stockapp.models import DailyBar
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+
+def make_bar(day, close):
+    return {"symbol": "PRU", "date": day.isoformat(), "open": close - 1, "high": close + 1,
+            "low": close - 2, "close": close, "volume": 1000}
+
+
+# The last 2 days of prices, newest first like FMP
+TODAY = timezone.localdate()
+HISTORY = [make_bar(TODAY - timedelta(days=1), 110.5), make_bar(TODAY - timedelta(days=2), 109.25)]
+
+
+class HistoryViewTests(TestCase):
+    def setUp(self):
+        # Whether a ticker's bars are current is kept in the cache
+        cache.clear()
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+
+    def test_redirect_without_login(self):
+        # Check that the view redirects to the login screen if the user isn't logged in
+        url = reverse("stockapp:history", args=("PRU",))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertRedirects(response, f"{reverse('login')}?next={url}")
+
+    @patch("stockapp.api.get_stock_history", return_value=HISTORY)
+    def test_preset_range(self, mock_history):
+        # Check that a new ticker is backfilled and stored, then the range is read locally
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:history", args=("pru",)), {"range": "1m"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, HISTORY)
+        today = timezone.localdate()
+        ticker, start, end = mock_history.call_args.args[:3]
+        self.assertEqual(ticker, "PRU")
+        self.assertEqual(start, today - history.BACKFILL_LENGTH)
+        self.assertEqual(end, today)
+        self.assertEqual(DailyBar.objects.filter(ticker="PRU").count(), 2)
+
+    @patch("stockapp.api.get_stock_history", return_value=HISTORY)
+    def test_custom_range(self, mock_history):
+        # Check that only the bars between from and to are returned
+        self.client.login(username=USERNAME, password=PASSWORD)
+        day = HISTORY[1]["date"]
+        response = self.client.get(reverse("stockapp:history", args=("PRU",)),
+                                   {"from": day, "to": day})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, HISTORY[1:])
+
+    def test_incremental_fetch(self):
+        # Check that only the days since the last stored bar are requested from FMP
+        self.client.login(username=USERNAME, password=PASSWORD)
+        url = reverse("stockapp:history", args=("PRU",))
+
+        with patch("stockapp.api.get_stock_history", return_value=HISTORY[1:]):
+            self.client.get(url)
+
+        # As if FMP's response expired
+        cache.delete(history.get_fresh_key("PRU"))
+
+        with patch("stockapp.api.get_stock_history", return_value=HISTORY[:1]) as mock_history:
+            response = self.client.get(url)
+
+        self.assertJSONEqual(response.content, HISTORY)
+        mock_history.assert_called_once()
+        self.assertEqual(mock_history.call_args.args[1:3],
+                         (TODAY - timedelta(days=2), TODAY))
+
+    @patch("stockapp.api.get_stock_history", return_value=HISTORY)
+    def test_current_bars(self, mock_history):
+        # Check that reading bars that were just fetched doesn't call FMP or write anything
+        self.client.login(username=USERNAME, password=PASSWORD)
+        url = reverse("stockapp:history", args=("PRU",))
+        self.client.get(url)
+        mock_history.reset_mock()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertJSONEqual(response.content, HISTORY)
+        mock_history.assert_not_called()
+        self.assertFalse(any("INSERT" in query["sql"] for query in queries))
+
+    def test_revised_bar(self):
+        # Check that the last stored bar is replaced if it changed after it was stored
+        DailyBar.objects.create(ticker="PRU", date=TODAY - timedelta(days=1), open=109, high=111,
+                                low=108, close=109.75, volume=500)
+        self.client.login(username=USERNAME, password=PASSWORD)
+
+        with patch("stockapp.api.get_stock_history", return_value=HISTORY[:1]):
+            response = self.client.get(reverse("stockapp:history", args=("PRU",)),
+                                       {"range": "1m"})
+
+        self.assertJSONEqual(response.content, HISTORY[:1])
+        self.assertEqual(DailyBar.objects.get(ticker="PRU").volume, 1000)
+
+    @patch("stockapp.api.get_stock_history", return_value=[])
+    def test_older_range(self, mock_history):
+        # Check that a range starting before the backfill fetches the missing days
+        DailyBar.objects.create(ticker="PRU", date=TODAY, open=1, high=1, low=1, close=1)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        self.client.get(reverse("stockapp:history", args=("PRU",)),
+                        {"from": "2001-01-02", "to": TODAY.isoformat()})
+
+        self.assertEqual([call.args[1:3] for call in mock_history.call_args_list],
+                         [(date(2001, 1, 2), TODAY - timedelta(days=1)), (TODAY, TODAY)])
+
+    @patch("stockapp.api.get_stock_history", return_value=api.RATE_LIMITED)
+    def test_rate_limited_with_stored_bars(self, mock_history):
+        # Check that the stored bars are still served if FMP can't be reached
+        DailyBar.objects.create(ticker="PRU", date=TODAY - timedelta(days=3), open=1, high=1,
+                                low=1, close=1, volume=5)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:history", args=("PRU",)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    @patch("stockapp.api.get_stock_history", return_value=HISTORY)
+    def test_invalid_range(self, mock_history):
+        # Check that invalid ranges are rejected without calling FMP
+        self.client.login(username=USERNAME, password=PASSWORD)
+        url = reverse("stockapp:history", args=("PRU",))
+
+        for params in [{"range": "2w"}, {"from": "yesterday"},
+                       {"from": "2026-10-16", "to": "2026-10-15"}]:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.json())
+
+        mock_history.assert_not_called()
+
+    @patch("stockapp.api.get_stock_history", return_value=api.RATE_LIMITED)
+    def test_rate_limited(self, mock_history):
+        # Check that the view reports when FMP's quota is used up
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:history", args=("PRU",)))
+
+        self.assertEqual(response.status_code, 429)
+
+    @patch("stockapp.api.get_stock_history", return_value={})
+    def test_invalid_stock(self, mock_history):
+        # Check that an unknown ticker returns an error
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:history", args=("qjxz",)))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"error": "No stock QJXZ found"})
@@ -1,12 +1,18 @@
 from django.test import TestCase
 from django.urls import reverse
 
+from stockapp import glossary
+
 
 # Create tests for each view
 class HomeViewTests(TestCase):
     # Load all the card data
     fixtures = ["cards.json"]
 
+    def setUp(self):
+        # Render the page instead of serving a copy cached by another test
+        glossary.invalidate()
+
     # All test functions must start with test*
     def test_view_renders(self):
         # Check that the view renders properly
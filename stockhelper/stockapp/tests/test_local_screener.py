@@ -0,0 +1,98 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from io import StringIO
+from stockapp import api, screener
+from stockapp.models import Company
+from unittest.mock import patch
+
+UNIVERSE = [
+    {"symbol": "AAPL", "companyName": "Apple Inc.", "marketCap": 3000000000000,
+     "sector": "Technology", "beta": 1.2, "price": 230.1, "lastAnnualDividend": 1.0,
+     "volume": 50000000, "exchangeShortName": "NASDAQ", "country": "US", "isEtf": False},
+    {"symbol": "MSFT", "companyName": "Microsoft Corporation", "marketCap": 3100000000000,
+     "sector": "Technology", "beta": 0.9, "price": 420.5, "lastAnnualDividend": 3.0,
+     "volume": 20000000, "exchangeShortName": "NASDAQ", "country": "US", "isEtf": False},
+    {"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "marketCap": 40000000000,
+     "sector": "Financial Services", "beta": 1.3, "price": 110.5, "lastAnnualDividend": 5.2,
+     "volume": 1500000, "exchangeShortName": "NYSE", "country": "US", "isEtf": False},
+    {"symbol": "SPYG", "companyName": "SPDR Portfolio S&P 500 Growth ETF", "marketCap": None,
+     "sector": "Financial Services", "beta": 1.0, "price": 80.2, "lastAnnualDividend": 0.5,
+     "volume": 2000000, "exchangeShortName": "AMEX", "country": "US", "isEtf": True},
+    {"symbol": "SONY", "companyName": "Sony Group Corporation", "marketCap": 100000000000,
+     "sector": "Technology", "beta": 0.8, "price": 90.1, "lastAnnualDividend": 0.6,
+     "volume": 1000000, "exchangeShortName": "NYSE", "country": "JP", "isEtf": False}
+]
+FORM = {"country": "US", "price_relation": ">", "price_value": 50, "sector": "Any",
+        "exchange": "Any"}
+
+
+def get_symbols(form_data):
+    return [result["symbol"] for result in screener.search({**FORM, **form_data})]
+
+
+class LocalScreenerTests(TestCase):
+    fixtures = ["cards.json"]
+
+    def setUp(self):
+        screener.save_snapshot(UNIVERSE)
+
+    def test_search(self):
+        # Check that each filter is applied, with the largest companies first
+        self.assertEqual(get_symbols({}), ["MSFT", "AAPL", "PRU", "SPYG"])
+        self.assertEqual(get_symbols({"price_relation": "<", "price_value": 100}), ["SPYG"])
+        self.assertEqual(get_symbols({"sector": "Technology"}), ["MSFT", "AAPL"])
+        self.assertEqual(get_symbols({"exchange": "nyse"}), ["PRU"])
+        self.assertEqual(get_symbols({"exchange": "etf"}), ["SPYG"])
+        self.assertEqual(get_symbols({"market_cap_min": 10 ** 11}), ["MSFT", "AAPL"])
+        self.assertEqual(get_symbols({"beta_min": 1, "beta_max": 1.25}), ["AAPL", "SPYG"])
+        self.assertEqual(get_symbols({"volume_max": 2000000}), ["PRU", "SPYG"])
+        self.assertEqual(get_symbols({"country": "JP"}), ["SONY"])
+
+    def test_snapshot_replaces_companies(self):
+        # Check that a new snapshot updates the listed companies and removes the rest
+        screener.save_snapshot([{**UNIVERSE[0], "price": 250}])
+
+        self.assertEqual(list(Company.objects.values_list("symbol", flat=True)), ["AAPL"])
+        self.assertEqual(Company.objects.get(symbol="AAPL").price, 250)
+
+    @patch("stockapp.api.get_company_universe", return_value=api.RATE_LIMITED)
+    def test_command_keeps_snapshot_on_error(self, mock_universe):
+        # Check that an FMP error doesn't wipe out the last snapshot
+        err = StringIO()
+        call_command("snapshot_companies", stdout=StringIO(), stderr=err)
+
+        self.assertIn(api.RATE_LIMITED["Error Message"], err.getvalue())
+        self.assertEqual(Company.objects.count(), len(UNIVERSE))
+
+    @patch("stockapp.api.get_stocks")
+    def test_post_redirects_to_local_search(self, mock_stocks):
+        # Check that searches don't call FMP once there's a snapshot
+        response = self.client.post(reverse("stockapp:screener"), FORM)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(f"{reverse('stockapp:screener')}?"))
+        mock_stocks.assert_not_called()
+
+        response = self.client.get(response.url)
+        self.assertEqual([result["symbol"] for result in response.context["results"]],
+                         ["MSFT", "AAPL", "PRU", "SPYG"])
+        self.assertEqual(response.context["form"].cleaned_data["price_value"], 50)
+
+    @patch("stockapp.screener.RESULTS_PER_PAGE", 3)
+    def test_paging(self):
+        # Check that the results are split into pages
+        response = self.client.get(reverse("stockapp:screener"), {**FORM, "page": 2})
+
+        self.assertEqual([result["symbol"] for result in response.context["results"]], ["SPYG"])
+        self.assertContains(response, "Page 2 of 2")
+        self.assertContains(response, "page=1")
+
+    def test_invalid_range(self):
+        # Check that a min greater than the max is rejected
+        response = self.client.get(reverse("stockapp:screener"),
+                                   {**FORM, "beta_min": 2, "beta_max": 1})
+
+        self.assertIsNone(response.context["results"])
+        self.assertIn("beta_max", response.context["form"].errors)
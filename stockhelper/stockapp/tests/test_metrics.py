@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from concurrent.futures import ThreadPoolExecutor
+from stockapp import api, metrics
+import requests
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD, mock_response
+
+
+@override_settings(FMP_RATE_LIMIT={"calls": 60, "period": 60, "burst": 1})
+class FmpMetricsTests(TestCase):
+    def setUp(self):
+        # The metrics are stored in the cache
+        cache.clear()
+
+    def test_concurrent_increments(self):
+        # Check that no count is lost when workers increment the same counter at once
+        def increment(_):
+            for _ in range(100):
+                metrics.increment("test:metrics")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(increment, range(8)))
+
+        self.assertEqual(cache.get("test:metrics"), 800)
+
+    @patch("stockapp.api.get_session")
+    def test_requests_counted(self, mock_session):
+        # Check that each call is counted by status and its latency goes in the histogram
+        mock_session.return_value.get.return_value = mock_response([])
+        api.get_request(f"{api.FMP}/profile?symbol=PRU")
+        mock_session.return_value.get.return_value = mock_response(
+            {"Error Message": "Invalid API KEY."}, status_code=401)
+        api.get_request(f"{api.FMP}/profile?symbol=PRU")
+
+        counts = metrics.get_counts("profile")
+        self.assertEqual(counts["requests:2xx"], 1)
+        self.assertEqual(counts["requests:4xx"], 1)
+        # The mocked calls are instant, so they land in the smallest bucket
+        self.assertEqual(counts[f"latency:{metrics.LATENCY_BUCKETS[0]}"], 2)
+
+    @patch("stockapp.api.get_session")
+    def test_errors_counted(self, mock_session):
+        # Check that failed connections and responses that aren't JSON are counted
+        response = mock_response(None, status_code=500)
+        response.json.side_effect = requests.exceptions.JSONDecodeError("Expecting value", "", 0)
+        response.text = "Internal Server Error"
+        mock_session.return_value.get.side_effect = [requests.exceptions.ConnectionError,
+                                                     response]
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=5)
+        with patch("stockapp.api.sleep"):
+            api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=5)
+
+        counts = metrics.get_counts("profile")
+        self.assertEqual(counts["requests:error"], 1)
+        self.assertEqual(counts["requests:5xx"], 1)
+        self.assertEqual(counts["json_errors"], 1)
+
+    @patch("stockapp.api.sleep")
+    @patch("stockapp.api.get_session")
+    def test_retries_counted(self, mock_session, mock_sleep):
+        # Check that retries after FMP's rate limit and the time spent waiting are counted
+        mock_session.return_value.get.side_effect = [
+            mock_response({"X-Rate-Limit-Retry-After-Seconds": 0,
+                           "X-Rate-Limit-Retry-After-Milliseconds": 500}, status_code=429),
+            mock_response([])
+        ]
+
+        api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=5)
+        # The quota is used up, so this call doesn't go to FMP
+        api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=0)
+
+        counts = metrics.get_counts("profile")
+        self.assertEqual(counts["retries"], 1)
+        self.assertEqual(counts["rate_limited"], 1)
+        self.assertGreaterEqual(counts["sleep"], 500)
+
+    def test_render(self):
+        # Check that the histogram buckets are cumulative and every endpoint is listed
+        metrics.observe_request("profile", 200, 0.3)
+        metrics.observe_request("profile", 200, 20)
+        text = metrics.render(api.get_cache_stats())
+
+        self.assertIn('fmp_request_duration_seconds_bucket{endpoint="profile",le="0.25"} 0', text)
+        self.assertIn('fmp_request_duration_seconds_bucket{endpoint="profile",le="0.5"} 1', text)
+        self.assertIn('fmp_request_duration_seconds_bucket{endpoint="profile",le="+Inf"} 2', text)
+        self.assertIn('fmp_request_duration_seconds_sum{endpoint="profile"} 20.3', text)
+        self.assertIn('fmp_request_duration_seconds_count{endpoint="profile"} 2', text)
+        self.assertIn('fmp_cache_hit_ratio{endpoint="company-screener"} 0', text)
+
+
+class MetricsViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        self.client.login(username=USERNAME, password=PASSWORD)
+
+    def test_staff_only(self):
+        # Check that users who aren't staff are sent to the admin login
+        response = self.client.get(reverse("stockapp:metrics"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_view_renders(self):
+        # Check that staff can see the metrics as Prometheus text
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("stockapp:metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertContains(response, "# TYPE fmp_requests_total counter")
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from decimal import Decimal
+from stockapp import trades
+from stockapp.models import Portfolio, Stock, Trade
+import json
+from utils_test import USERNAME, PASSWORD
+
+
+class OrdersTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+
+        # Own 10 shares of PRU and AAPL
+        for ticker, price in [("PRU", 100), ("AAPL", 200)]:
+            stock = Stock.objects.create(ticker=ticker, name=ticker, price=price)
+            Portfolio.objects.create(user=self.user, stock=stock, shares=10,
+                                     cost_basis=price * 10)
+
+        self.client.login(username=USERNAME, password=PASSWORD)
+
+    def send_orders(self, orders):
+        return self.client.post(reverse("stockapp:orders"), json.dumps({"orders": orders}),
+                                content_type="application/json")
+
+    def test_rebalance(self):
+        # Check that buys and sells of several stocks are all executed
+        response = self.send_orders([
+            {"ticker": "PRU", "isBuying": False, "shares": 10, "price": 110},
+            {"ticker": "aapl", "isBuying": False, "shares": 5, "price": 210},
+            {"ticker": "MSFT", "isBuying": True, "shares": 4, "price": 400, "name": "Microsoft",
+             "change": 1.5}
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {"status": "success", "results": [
+            {"status": "success"}, {"status": "success"}, {"status": "success"}
+        ]})
+        self.assertEqual(dict(Portfolio.objects.values_list("stock", "shares")),
+                         {"AAPL": 5, "MSFT": 4})
+        self.assertEqual(Portfolio.objects.get(stock="AAPL").cost_basis, 1000)
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).balance,
+                         Decimal(10000 + 1100 + 1050 - 1600))
+        self.assertEqual(Stock.objects.get(ticker="MSFT").name, "Microsoft")
+        self.assertEqual(Trade.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Trade.objects.get(stock="PRU").realized_gain, 100)
+
+    def test_constant_queries(self):
+        # Check that the number of queries doesn't grow with the number of orders
+        orders = [{"ticker": ticker, "isBuying": True, "shares": 1, "price": 10}
+                  for ticker in ["PRU", "AAPL"]]
+
+        with self.assertNumQueries(9):
+            trades.execute_orders(self.user.pk, orders)
+        with self.assertNumQueries(9):
+            trades.execute_orders(self.user.pk, orders * 10)
+
+    def test_all_or_nothing(self):
+        # Check that nothing is executed if any order fails, and each failure is explained
+        response = self.send_orders([
+            {"ticker": "PRU", "isBuying": False, "shares": 10, "price": 110},
+            {"ticker": "PRU", "isBuying": False, "shares": 1, "price": 110},
+            {"ticker": "MSFT", "isBuying": True, "shares": 100, "price": 400},
+            {"ticker": "AAPL", "isBuying": True, "shares": -1, "price": 200}
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"status": "failure", "results": [
+            {"status": "success"},
+            {"status": "failure", "error": "Not enough shares", "maxShares": 0},
+            {"status": "failure", "error": "Not enough balance", "maxShares": 27},
+            {"status": "failure", "error": "shares must be a positive integer"}
+        ]})
+        self.assertEqual(Portfolio.objects.get(stock="PRU").shares, 10)
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).balance, 10000)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_invalid_price(self):
+        # Check that prices that aren't finite numbers fail like any other invalid order
+        response = self.send_orders([
+            {"ticker": "PRU", "isBuying": True, "shares": 1, "price": float("nan")},
+            {"ticker": "PRU", "isBuying": False, "shares": 1, "price": float("inf")},
+            {"ticker": "PRU", "isBuying": True, "shares": 1, "price": True}
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"status": "failure", "results": [
+            {"status": "failure", "error": "price must be a positive number"}
+        ] * 3})
+        self.assertFalse(Trade.objects.exists())
+
+    def test_invalid_body(self):
+        # Check that a request without any orders is rejected
+        response = self.send_orders([])
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse("stockapp:orders"), "not json",
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_only(self):
+        # Check that orders can't be placed with a GET request
+        response = self.client.get(reverse("stockapp:orders"))
+        self.assertEqual(response.status_code, 405)
@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
 
+from decimal import Decimal
+from stockapp import networth
 from stockapp.models import Portfolio, Stock
 from utils_test import USERNAME, PASSWORD
 
@@ -35,7 +37,7 @@ class PortfolioViewTests(TestCase):
         self.assertContains(response, "alert-info")
         self.assertContains(response, "Balance")
         self.assertContains(response, "Net Worth")
-        self.assertContains(response, "net-worth-spinner")
+        self.assertContains(response, "$10,000.00", count=2)  # balance and net worth
         self.assertContains(response, "Nothing yet...start investing!")
         # Check that the correct context data is passed
         self.assertEqual(response.context["balance"], self.user.balance)
@@ -77,6 +79,11 @@ class PortfolioViewTests(TestCase):
         self.assertContains(response, "</table>")
 
         self.assertEqual(response.context["balance"], self.user.balance)
+        # The net worth should be calculated from the saved prices
+        self.assertEqual(response.context["netWorth"]["holdings"], 8500)
+        self.assertEqual(response.context["netWorth"]["netWorth"], self.user.balance + 8500)
+        self.assertContains(response, "$18,500.00")
+        self.assertContains(response, "alert-success")
 
         portfolio_list = [
             str({
@@ -98,3 +105,43 @@ class PortfolioViewTests(TestCase):
         # Ignore the order of each list
         self.assertQuerySetEqual(
             response.context["portfolios"], portfolio_list, transform=repr, ordered=False)
+
+
+class NetWorthTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username=USERNAME, password=PASSWORD, balance=9000)
+        stock = Stock.objects.create(ticker="PRU", name="Prudential Financial, Inc.",
+                                     price=110.5, change=1.25)
+        Portfolio.objects.create(user=self.user, stock=stock, shares=10, cost_basis=1000)
+
+    def test_single_query(self):
+        # Check that all the stocks are valued in one query
+        with self.assertNumQueries(1):
+            net_worth = networth.get_net_worth(self.user)
+
+        self.assertEqual(net_worth, {
+            "balance": 9000,
+            "holdings": Decimal("1105.00"),
+            "costBasis": 1000,
+            "netWorth": Decimal("10105.00"),
+            "change": Decimal("105.00"),
+            "roi": Decimal("1.05")
+        })
+
+    def test_view(self):
+        # Check that the net worth is returned as JSON
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:networth"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {
+            "balance": 9000, "holdings": 1105, "costBasis": 1000, "netWorth": 10105,
+            "change": 105, "roi": 1.05
+        })
+
+    def test_redirect_without_login(self):
+        # Check that the view redirects to the login screen if the user isn't logged in
+        response = self.client.get(reverse("stockapp:networth"))
+        self.assertRedirects(
+            response, f"{reverse('login')}?next={reverse('stockapp:networth')}")
@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from stockapp.models import Portfolio, Stock
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+PROFILE = [{"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "price": 30.00,
+            "change": 1.5, "averageVolume": 1800000, "marketCap": 39000000000}]
+
+
+@patch("stockapp.api.get_company_profile", return_value=PROFILE)
+class TradePreviewViewTests(TestCase):
+    # Load all the card data for the detail page
+    fixtures = ["cards.json"]
+
+    def setUp(self):
+        cache.clear()
+        # Initialize the balance to $10,000 before each test
+        self.user = get_user_model().objects.create_user(
+            username=USERNAME, password=PASSWORD)
+        stock = Stock.objects.create(ticker="PRU", name="Prudential Financial, Inc.",
+                                     price=25.00, change=-1.12)
+        Portfolio.objects.create(user=self.user, stock=stock, shares=10)
+
+    def test_redirect_without_login(self, mock_profile):
+        # Check that the view redirects to the login screen if the user isn't logged in
+        url = reverse("stockapp:preview", args=("PRU",))
+        response = self.client.get(url)
+        self.assertRedirects(response, f"{reverse('login')}?next={url}")
+
+    def test_view_renders(self, mock_profile):
+        # Check that the balance, max shares, and cost come from the user and latest price
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:preview", args=("pru",)), {"shares": 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {
+            "balance": 10000,
+            "price": 30,
+            "maxBuy": 333,
+            "maxSell": 10,
+            "cost": 90
+        })
+        mock_profile.assert_called_once_with("PRU", None)
+
+    def test_not_owned(self, mock_profile):
+        # Check that stocks that aren't in the portfolio can't be sold
+        mock_profile.return_value = [{**PROFILE[0], "symbol": "JPM"}]
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:preview", args=("JPM",)))
+
+        self.assertEqual(response.json()["maxSell"], 0)
+        self.assertNotIn("cost", response.json())
+
+    def test_invalid_shares(self, mock_profile):
+        # Check that the number of shares has to be a positive integer
+        self.client.login(username=USERNAME, password=PASSWORD)
+
+        for shares in ["abc", "0", "-1"]:
+            response = self.client.get(reverse("stockapp:preview", args=("PRU",)),
+                                       {"shares": shares})
+            self.assertEqual(response.status_code, 400)
+
+    def test_unknown_stock(self, mock_profile):
+        # Check that an error is returned if FMP doesn't know the stock
+        mock_profile.return_value = []
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:preview", args=("ZZZZ",)))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+    def test_not_modified(self, mock_profile):
+        # Check that the preview is revalidated until the balance changes
+        self.client.login(username=USERNAME, password=PASSWORD)
+        url = reverse("stockapp:preview", args=("PRU",))
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 304)
+
+        self.user.balance = 5000
+        self.user.save()
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_detail_renders_balance(self, mock_profile):
+        # Check that the order form has what it needs without asking the server
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:detail", args=("PRU",)))
+
+        self.assertContains(response, 'data-balance="10000.00"')
+        self.assertContains(response, 'data-shares="10"')
+        self.assertContains(response, reverse("stockapp:preview", args=("PRU",)))
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from stockapp import api
+from stockapp.models import Portfolio, Stock
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+QUOTES = [
+    {"symbol": "PRU", "name": "Prudential Financial, Inc.", "price": 110.5, "change": 1.25},
+    {"symbol": "AAPL", "name": "Apple Inc.", "price": 230.1, "change": -2.4}
+]
+
+
+class PricesViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username=USERNAME, password=PASSWORD)
+
+        # Create a portfolio with 2 stocks
+        for ticker, shares in [("PRU", 10), ("AAPL", 2)]:
+            stock = Stock.objects.create(ticker=ticker, name=ticker, price=1.00, change=0)
+            Portfolio.objects.create(user=self.user, stock=stock, shares=shares)
+
+    def test_redirect_without_login(self):
+        # Check that the view redirects to the login screen if the user isn't logged in
+        response = self.client.get(reverse("stockapp:prices"))
+        self.assertEqual(response.status_code, 302)
+        self.assertRedirects(
+            response, f"{reverse('login')}?next={reverse('stockapp:prices')}")
+
+    @patch("stockapp.views.api.get_quotes", return_value=QUOTES)
+    def test_view_renders(self, mock_quotes):
+        # Check that every stock is priced with a single upstream call
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:prices"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {
+            "PRU": {"price": 110.5, "change": 1.25, "shares": 10},
+            "AAPL": {"price": 230.1, "change": -2.4, "shares": 2}
+        })
+        mock_quotes.assert_called_once()
+        self.assertEqual(set(mock_quotes.call_args.args[0]), {"PRU", "AAPL"})
+        # The stocks should be updated in the database
+        self.assertEqual(Stock.objects.get(ticker="AAPL").name, "Apple Inc.")
+        self.assertEqual(float(Stock.objects.get(ticker="PRU").price), 110.5)
+
+    @patch("stockapp.views.api.get_quotes", return_value=QUOTES[:1])
+    def test_filter_tickers(self, mock_quotes):
+        # Check that only the requested tickers are returned (case insensitive)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:prices"), {"tickers": "pru,MSFT"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {
+            "PRU": {"price": 110.5, "change": 1.25, "shares": 10},
+            "MSFT": {"error": "MSFT doesn't exist in the user's porfolio"}
+        })
+        mock_quotes.assert_called_once()
+        self.assertEqual(mock_quotes.call_args.args[0], ["PRU"])
+
+    @patch("stockapp.views.api.get_quotes", return_value=QUOTES[1:])
+    def test_missing_quote(self, mock_quotes):
+        # Check that a stock FMP doesn't know about gets an error
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:prices"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {
+            "PRU": {"error": "No stock PRU found"},
+            "AAPL": {"price": 230.1, "change": -2.4, "shares": 2}
+        })
+
+    @patch("stockapp.views.api.get_quotes", return_value=api.RATE_LIMITED)
+    def test_rate_limited(self, mock_quotes):
+        # Check that the view reports when FMP's quota is used up
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:prices"))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertJSONEqual(response.content, {"error": api.RATE_LIMITED["Error Message"]})
+
+    @patch("stockapp.views.api.get_quotes")
+    def test_empty_portfolio(self, mock_quotes):
+        # Check that FMP isn't called if the user doesn't own any stocks
+        Portfolio.objects.all().delete()
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:prices"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {})
+        mock_quotes.assert_not_called()
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import timedelta
+from io import StringIO
+from stockapp import api, quotes
+from stockapp.models import Portfolio, Stock
+from unittest.mock import patch
+from utils_test import USERNAME, PASSWORD
+
+
+def get_quotes(tickers, max_wait=None):
+    # Quote every ticker at $100
+    return [{"symbol": ticker, "name": f"{ticker} Inc.", "price": 100, "change": 1.5}
+            for ticker in tickers]
+
+
+class RefreshQuotesTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username=USERNAME, password=PASSWORD)
+        stock = Stock.objects.create(ticker="PRU", name="PRU", price=1, change=0)
+        Portfolio.objects.create(user=self.user, stock=stock, shares=10)
+
+    @patch("stockapp.api.get_quotes", side_effect=get_quotes)
+    def test_refresh_tracked_tickers(self, mock_quotes):
+        # Check that owned and free tier stocks are updated and created in batches
+        updated, errors = quotes.refresh_quotes()
+
+        self.assertEqual(updated, len(api.FREE_TIER_SYMBOLS) + 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(mock_quotes.call_count, -(-updated // quotes.BATCH_SIZE))
+        stock = Stock.objects.get(ticker="PRU")
+        self.assertEqual(stock.name, "PRU Inc.")
+        self.assertEqual(stock.price, 100)
+        self.assertTrue(quotes.is_fresh(stock))
+        self.assertTrue(Stock.objects.filter(ticker="AAPL").exists())
+
+    @patch("stockapp.api.get_quotes", return_value=api.RATE_LIMITED)
+    def test_refresh_errors(self, mock_quotes):
+        # Check that the FMP errors are returned and nothing is updated
+        updated, errors = quotes.refresh_quotes(["PRU"])
+
+        self.assertEqual(updated, 0)
+        self.assertEqual(errors, [api.RATE_LIMITED["Error Message"]])
+        self.assertIsNone(Stock.objects.get(ticker="PRU").updated_at)
+
+    @patch("stockapp.api.get_quotes", side_effect=get_quotes)
+    def test_command(self, mock_quotes):
+        # Check that the command refreshes the given tickers once
+        out = StringIO()
+        call_command("refresh_quotes", "pru", "msft", stdout=out)
+
+        self.assertEqual(mock_quotes.call_args.args[0], ["MSFT", "PRU"])
+        self.assertIn("Updated 2 stocks", out.getvalue())
+
+    @override_settings(QUOTE_MAX_AGE=60)
+    def test_is_fresh(self):
+        # Check that only prices updated within the max age are fresh
+        stock = Stock(ticker="PRU")
+        self.assertFalse(quotes.is_fresh(stock))
+        stock.updated_at = timezone.now() - timedelta(seconds=30)
+        self.assertTrue(quotes.is_fresh(stock))
+        stock.updated_at = timezone.now() - timedelta(seconds=90)
+        self.assertFalse(quotes.is_fresh(stock))
+
+
+class FreshPriceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username=USERNAME, password=PASSWORD)
+        # PRU was just refreshed, but AAPL wasn't
+        for ticker, updated_at in [("PRU", timezone.now()), ("AAPL", None)]:
+            stock = Stock.objects.create(ticker=ticker, name=ticker, price=50, change=0,
+                                         updated_at=updated_at)
+            Portfolio.objects.create(user=self.user, stock=stock, shares=2)
+
+        self.client.login(username=USERNAME, password=PASSWORD)
+
+    @patch("stockapp.api.get_company_profile")
+    def test_price_from_database(self, mock_profile):
+        # Check that a fresh price is served without calling FMP
+        response = self.client.get(reverse("stockapp:price", args=("pru",)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {"price": 50, "change": 0, "shares": 2})
+        mock_profile.assert_not_called()
+
+    @patch("stockapp.api.get_quotes", side_effect=get_quotes)
+    def test_prices_only_fetch_stale(self, mock_quotes):
+        # Check that only the stale stocks are sent to FMP
+        response = self.client.get(reverse("stockapp:prices"))
+
+        self.assertJSONEqual(response.content, {
+            "PRU": {"price": 50, "change": 0, "shares": 2},
+            "AAPL": {"price": 100, "change": 1.5, "shares": 2}
+        })
+        self.assertEqual(mock_quotes.call_args.args[0], ["AAPL"])
+        self.assertTrue(quotes.is_fresh(Stock.objects.get(ticker="AAPL")))
@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from concurrent.futures import ThreadPoolExecutor
+from stockapp import api, checks
+from stockapp.ratelimit import RateLimiter
+from unittest.mock import patch
+from utils_test import mock_response
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        # The bucket is stored in the cache, so start each test with a full bucket
+        cache.clear()
+
+    def test_burst_then_wait(self):
+        # Check that calls within the burst go through immediately and the rest are spaced out
+        limiter = RateLimiter("test:ratelimit", calls=60, period=60, burst=2)
+
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.reserve(), 0)
+        # The 3rd call would need to wait about a second, which is more than max_wait
+        self.assertIsNone(limiter.reserve(max_wait=0))
+        self.assertAlmostEqual(limiter.reserve(max_wait=2), 1, places=1)
+
+    def test_shared_between_instances(self):
+        # Check that limiters with the same key (like in different workers) share a bucket
+        RateLimiter("test:ratelimit", calls=1, period=60).reserve()
+        self.assertIsNone(RateLimiter("test:ratelimit", calls=1, period=60).reserve())
+
+    def test_penalize(self):
+        # Check that FMP's retry delay holds back the next call
+        limiter = RateLimiter("test:ratelimit", calls=60, period=60, burst=5)
+        limiter.penalize(10)
+
+        self.assertIsNone(limiter.reserve(max_wait=5))
+        self.assertGreater(limiter.reserve(max_wait=15), 10)
+
+    def test_no_shared_slots(self):
+        # Check that callers racing for the bucket each get their own slot
+        def reserve(_):
+            return RateLimiter("test:ratelimit", calls=60, period=60).reserve(max_wait=60)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            waits = sorted(executor.map(reserve, range(8)))
+
+        for i, wait in enumerate(waits):
+            self.assertAlmostEqual(wait, i, delta=0.5)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_atomic_cache(self):
+        self.assertEqual(checks.check_shared_cache(None), [])
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": "/tmp/stockhelper_cache",
+    }})
+    def test_file_cache(self):
+        # Check that a cache whose add() races between workers is flagged
+        self.assertEqual([error.id for error in checks.check_shared_cache(None)],
+                         ["stockapp.W001"])
+
+
+@override_settings(FMP_RATE_LIMIT={"calls": 60, "period": 60, "burst": 1})
+class ApiRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch("stockapp.api.get_session")
+    def test_fail_fast(self, mock_session):
+        # Check that a rate limited result is returned without calling FMP when the quota is used up
+        mock_session.return_value.get.return_value = mock_response([])
+
+        self.assertEqual(api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=0), [])
+        result = api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=0)
+        self.assertTrue(api.is_rate_limited(result))
+        self.assertEqual(mock_session.return_value.get.call_count, 1)
+
+    @patch("stockapp.api.sleep")
+    @patch("stockapp.api.get_session")
+    def test_retry_after_fmp_limit(self, mock_session, mock_sleep):
+        # Check that FMP's rate limit response is retried once the quota frees up
+        mock_session.return_value.get.side_effect = [
+            mock_response({"X-Rate-Limit-Retry-After-Seconds": 0,
+                           "X-Rate-Limit-Retry-After-Milliseconds": 500}),
+            mock_response([])
+        ]
+
+        self.assertEqual(api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=5), [])
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+        # The retry should have waited at least as long as FMP asked for
+        self.assertGreaterEqual(mock_sleep.call_args.args[0], 0.5)
+
+    @patch("stockapp.api.get_session")
+    def test_fmp_limit_past_deadline(self, mock_session):
+        # Check that the request gives up if FMP asks to wait longer than the deadline
+        mock_session.return_value.get.return_value = mock_response({
+            "X-Rate-Limit-Retry-After-Seconds": 60,
+            "X-Rate-Limit-Retry-After-Milliseconds": 0
+        })
+
+        result = api.get_request(f"{api.FMP}/profile?symbol=PRU", max_wait=1)
+        self.assertTrue(api.is_rate_limited(result))
+        self.assertEqual(mock_session.return_value.get.call_count, 1)
@@ -1,7 +1,13 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
 from stockapp.forms import ScreenerForm
+from unittest.mock import patch
+
+RESULTS = [{"symbol": "AAPL", "companyName": "Apple Inc.", "sector": "Technology", "beta": 1.2,
+            "price": 200, "volume": 50000000, "marketCap": 3000000000000,
+            "lastAnnualDividend": 1, "exchangeShortName": "NASDAQ"}]
 
 
 class ScreenerViewTests(TestCase):
@@ -43,3 +49,27 @@ class ScreenerViewTests(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertNotIn("results", self.client.session)  # no longer free tier :( (or is it?)
         self.assertRedirects(response, reverse("stockapp:screener"))
+
+    @patch("stockapp.api.get_stocks", return_value=RESULTS)
+    def test_results_cached(self, mock_stocks):
+        # Check that FMP's results are kept in the cache and only their key is in the session
+        cache.clear()
+        response = self.client.post(reverse("stockapp:screener"), {
+            "country": "US", "price_relation": ">", "price_value": 100, "sector": "Any",
+            "exchange": "Any"
+        })
+        key = self.client.session["results_key"]
+
+        self.assertRedirects(response, reverse("stockapp:screener"),
+                             fetch_redirect_response=False)
+        self.assertNotIn("results", self.client.session)
+        self.assertEqual(cache.get(key), RESULTS)
+
+        response = self.client.get(reverse("stockapp:screener"))
+        self.assertEqual(response.context["results"], RESULTS)
+        self.assertContains(response, "Apple Inc.")
+        self.assertNotIn("results_key", self.client.session)
+
+        # The results are only shown once
+        response = self.client.get(reverse("stockapp:screener"))
+        self.assertIsNone(response.context["results"])
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import timedelta
+import asyncio
+import json
+from stockapp import stream
+from stockapp.models import Portfolio, Stock
+from unittest.mock import AsyncMock, patch
+from utils_test import USERNAME, PASSWORD
+
+UPDATE = {"ticker": "AAPL", "price": 200.5, "change": 1.25}
+
+
+class PriceHubTests(TestCase):
+    @patch("stockapp.stream.get_quote", new_callable=AsyncMock, return_value=UPDATE)
+    async def test_fan_out(self, mock_quote):
+        # Check that every stream gets the update from a single poller
+        hub = stream.PriceHub(interval=60)
+        first = hub.subscribe(["AAPL"])
+        second = hub.subscribe(["AAPL"])
+
+        self.assertEqual(await asyncio.wait_for(first.get(), 1), UPDATE)
+        self.assertEqual(await asyncio.wait_for(second.get(), 1), UPDATE)
+        mock_quote.assert_awaited_once_with("AAPL")
+
+        # A late subscriber gets the last price right away
+        third = hub.subscribe(["AAPL"])
+        self.assertEqual(third.get_nowait(), UPDATE)
+        self.assertEqual(mock_quote.await_count, 1)
+
+        for queue in [first, second, third]:
+            hub.unsubscribe(queue, ["AAPL"])
+
+        self.assertEqual(hub.pollers, {})
+        self.assertEqual(hub.subscribers, {})
+
+    @patch("stockapp.stream.get_quote", new_callable=AsyncMock)
+    async def test_only_changes_sent(self, mock_quote):
+        # Check that a price that didn't change isn't sent again
+        updates = iter([UPDATE, UPDATE])
+        mock_quote.side_effect = lambda ticker: next(updates, {**UPDATE, "price": 201})
+        hub = stream.PriceHub(interval=0)
+        queue = hub.subscribe(["AAPL"])
+
+        self.assertEqual(await asyncio.wait_for(queue.get(), 1), UPDATE)
+        self.assertEqual((await asyncio.wait_for(queue.get(), 1))["price"], 201)
+        hub.unsubscribe(queue, ["AAPL"])
+
+
+class GetQuoteTests(TestCase):
+    @patch("stockapp.api.get_quotes")
+    async def test_fresh_price(self, mock_quotes):
+        # Check that a price kept fresh by the quote refresher doesn't call FMP
+        await Stock.objects.acreate(ticker="AAPL", name="Apple Inc.", price=200.5, change=1.25,
+                                    updated_at=timezone.now())
+
+        self.assertEqual(await stream.get_quote("AAPL"), UPDATE)
+        mock_quotes.assert_not_called()
+
+    @patch("stockapp.api.get_quotes", return_value=[{"symbol": "AAPL", "name": "Apple Inc.",
+                                                     "price": 210, "change": 2}])
+    async def test_stale_price(self, mock_quotes):
+        # Check that an old price is replaced by the latest quote
+        await Stock.objects.acreate(ticker="AAPL", name="Apple Inc.", price=200.5, change=1.25,
+                                    updated_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(await stream.get_quote("AAPL"),
+                         {"ticker": "AAPL", "price": 210, "change": 2})
+        self.assertEqual((await Stock.objects.aget(ticker="AAPL")).price, 210)
+
+    @patch("stockapp.api.get_quotes", return_value=[])
+    async def test_unknown_ticker(self, mock_quotes):
+        self.assertIn("error", await stream.get_quote("ZZZZ"))
+
+
+class PriceStreamViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username=USERNAME, password=PASSWORD)
+
+    def test_redirect_without_login(self):
+        # Check that the view redirects to the login screen if the user isn't logged in
+        response = self.client.get(reverse("stockapp:stream"), {"tickers": "AAPL"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_tickers_required(self):
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:stream"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_too_many_tickers(self):
+        self.client.login(username=USERNAME, password=PASSWORD)
+        tickers = [f"T{i}" for i in range(stream.MAX_TICKERS + 1)]
+        response = self.client.get(reverse("stockapp:stream"), {"tickers": ",".join(tickers)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_whole_portfolio(self):
+        # Check that a portfolio with more stocks than the limit can still be watched
+        tickers = [f"T{i}" for i in range(stream.MAX_TICKERS + 1)]
+        stocks = Stock.objects.bulk_create([
+            Stock(ticker=ticker, name=ticker, price=1, change=0) for ticker in tickers
+        ])
+        Portfolio.objects.bulk_create([
+            Portfolio(user=self.user, stock=stock, shares=1) for stock in stocks
+        ])
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:stream"), {"tickers": ",".join(tickers)})
+        self.assertEqual(response.status_code, 204)
+
+    def test_no_stream_under_wsgi(self):
+        # Check that browsers are told not to reconnect if the server can't stream
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:stream"), {"tickers": "AAPL"})
+        self.assertEqual(response.status_code, 204)
+
+    @patch("stockapp.stream.get_quote", new_callable=AsyncMock, return_value=UPDATE)
+    async def test_stream(self, mock_quote):
+        # Check that the prices are sent as events until the client disconnects
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("stockapp:stream"), {"tickers": "aapl"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        events = []
+
+        async def read():
+            async for event in response.streaming_content:
+                events.append(event)
+
+        reader = asyncio.create_task(read())
+
+        for _ in range(100):
+            if len(events) >= 2:
+                break
+
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(events, [f"retry: {stream.RETRY}\n\n".encode(),
+                                  f"event: price\ndata: {json.dumps(UPDATE)}\n\n".encode()])
+
+        # The server cancels the response when the client disconnects, which stops the poller
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        self.assertEqual(stream.get_hub().pollers, {})
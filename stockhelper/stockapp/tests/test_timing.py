@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from stockapp import timing
+import json
+import logging
+import re
+from unittest.mock import MagicMock, patch
+from utils_test import USERNAME, PASSWORD
+
+PROFILE = [{"symbol": "PRU", "companyName": "Prudential Financial, Inc.", "price": 110.5,
+            "change": 1.25, "averageVolume": 1800000, "marketCap": 39000000000}]
+
+
+def parse_server_timing(header):
+    # e.g. 'db;desc="3 queries";dur=1.2' --> {"db": {"desc": "3 queries", "dur": "1.2"}}
+    metrics = {}
+
+    for entry in re.split(r", (?=\w+;|\w+$)", header):
+        name, *params = entry.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+
+    return metrics
+
+
+class ServerTimingTests(TestCase):
+    fixtures = ["cards.json"]
+
+    def test_sync_view(self):
+        # Check that the database and template time of a sync view are recorded
+        with self.assertLogs("stockapp.timing", "DEBUG") as logs:
+            response = self.client.get(reverse("stockapp:flashcards"))
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        self.assertEqual(set(metrics), {"total", "db", "fmp", "cache", "template"})
+        self.assertNotEqual(metrics["db"]["desc"], '"0 queries"')
+        self.assertGreater(float(metrics["template"]["dur"]), 0)
+
+        summary = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(summary["path"], reverse("stockapp:flashcards"))
+        self.assertEqual(summary["status"], 200)
+        self.assertGreater(summary["db_queries"], 0)
+        self.assertFalse(summary["slow"])
+
+    @patch("stockapp.api.get_session")
+    def test_async_view_fmp_calls(self, mock_session):
+        # Check that FMP calls and cache lookups made from other threads are counted
+        cache.clear()
+        mock_session.return_value.get.return_value = MagicMock(
+            status_code=200, json=MagicMock(return_value=PROFILE))
+        get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        self.client.login(username=USERNAME, password=PASSWORD)
+
+        with self.assertLogs("stockapp.timing", "DEBUG") as logs:
+            self.client.get(reverse("stockapp:detail", args=("PRU",)))
+            self.client.get(reverse("stockapp:detail", args=("PRU",)))
+
+        first, second = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual((first["fmp_calls"], first["cache_misses"]), (1, 1))
+        self.assertEqual((second["fmp_calls"], second["cache_hits"]), (0, 1))
+        self.assertGreater(first["db_queries"], 0)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request(self):
+        # Check that requests over the threshold are logged as warnings
+        with self.assertLogs("stockapp.timing", "WARNING") as logs:
+            self.client.get(reverse("stockapp:index"))
+
+        self.assertTrue(json.loads(logs.records[-1].getMessage())["slow"])
+
+    def test_outside_request(self):
+        # Check that recording outside of a request doesn't fail
+        timing.record("fmp", 1)
+
+    def test_summary_logged(self):
+        # Check that the app's logger follows LOG_LEVEL, which only logs every request at DEBUG
+        level = settings.LOGGING["loggers"]["stockapp"]["level"]
+        self.assertEqual(logging.getLogger("stockapp.timing").getEffectiveLevel(),
+                         logging.getLevelName(level))
+
+    def test_summary_not_logged_by_default(self):
+        # Check that ordinary requests don't show up in the logs unless asked for
+        with self.assertNoLogs("stockapp.timing", "INFO"):
+            self.client.get(reverse("stockapp:index"))
@@ -0,0 +1,178 @@
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from decimal import Decimal
+from stockapp import trades
+from io import StringIO
+from stockapp.models import Portfolio, Stock, Trade
+from threading import Thread
+from time import sleep
+from utils_test import USERNAME, PASSWORD
+
+
+class TradeTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        Stock.objects.create(ticker="PRU", name="Prudential Financial, Inc.", price=25,
+                             change=-1.12)
+
+    def test_buy_queries(self):
+        # Check that buying more shares of an owned stock only takes a few queries
+        Portfolio.objects.create(user=self.user, stock_id="PRU", shares=10)
+
+        # balance, stock, portfolio, and trade (plus the savepoint)
+        with self.assertNumQueries(6):
+            trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 5, 25.1, -1.12)
+
+        self.assertEqual(Portfolio.objects.get(user=self.user).shares, 15)
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).balance,
+                         Decimal("9874.50"))
+
+    def test_sell_too_many(self):
+        # Check that a failed sale doesn't change the balance or shares
+        Portfolio.objects.create(user=self.user, stock_id="PRU", shares=10)
+
+        with self.assertRaises(trades.TradeError) as context:
+            trades.sell_stock(self.user.pk, "PRU", 11, 25)
+
+        self.assertEqual(context.exception.max_shares, 10)
+        self.assertEqual(Portfolio.objects.get(user=self.user).shares, 10)
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).balance, 10000)
+
+    def test_ledger_and_cost_basis(self):
+        # Check that every trade is recorded and the cost basis follows the average cost
+        trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 10, 20, 0)
+        trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 10, 30, 0)
+        sale = trades.sell_stock(self.user.pk, "PRU", 5, 40)
+
+        self.assertEqual(sale.realized_gain, Decimal("75.00"))  # 5 * (40 - 25)
+        portfolio = Portfolio.objects.get(user=self.user)
+        self.assertEqual(portfolio.shares, 15)
+        self.assertEqual(portfolio.cost_basis, Decimal("375.00"))
+        self.assertEqual(list(Trade.objects.order_by("pk").values_list("side", "shares")),
+                         [("buy", 10), ("buy", 10), ("sell", 5)])
+
+    def test_failed_trade_not_recorded(self):
+        # Check that a failed sale doesn't add to the ledger
+        with self.assertRaises(trades.TradeError):
+            trades.sell_stock(self.user.pk, "PRU", 1, 25)
+
+        self.assertFalse(Trade.objects.exists())
+
+    def test_rebuild(self):
+        # Check that replaying the ledger recreates the same portfolios
+        trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 10, 20, 0)
+        trades.buy_stock(self.user.pk, "AAPL", "Apple Inc.", 4, 200, 0)
+        trades.sell_stock(self.user.pk, "AAPL", 4, 210)
+        trades.sell_stock(self.user.pk, "PRU", 3, 25)
+        expected = list(Portfolio.objects.values_list("stock", "shares", "cost_basis"))
+
+        # Mess up the projection, then rebuild it
+        Portfolio.objects.update(shares=1, cost_basis=0)
+        out = StringIO()
+        call_command("rebuild_portfolios", stdout=out)
+
+        self.assertEqual(list(Portfolio.objects.values_list("stock", "shares", "cost_basis")),
+                         expected)
+        self.assertEqual(out.getvalue().strip(), "Replayed 4 trades into 1 portfolio")
+        self.assertEqual(Trade.objects.get(stock="AAPL", side="sell").realized_gain, 40)
+
+    def test_rebuild_fractional_price(self):
+        # Check that the rebuilt portfolio and gains match the live ones when the price has
+        # more digits than the ledger keeps
+        trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 97, 24.4303, 0)
+        trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 3, 1.2349, 0)
+        sale = trades.sell_stock(self.user.pk, "PRU", 7, 11.1149)
+        expected = list(Portfolio.objects.values_list("stock", "shares", "cost_basis"))
+
+        trades.rebuild_portfolios()
+
+        self.assertEqual(list(Portfolio.objects.values_list("stock", "shares", "cost_basis")),
+                         expected)
+        self.assertEqual(Trade.objects.get(pk=sale.pk).realized_gain, sale.realized_gain)
+
+    def test_trades_view(self):
+        # Check that the user's trades are listed newest first
+        trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 10, 20, 0)
+        trades.sell_stock(self.user.pk, "PRU", 4, 25.5)
+        self.client.login(username=USERNAME, password=PASSWORD)
+        response = self.client.get(reverse("stockapp:trades"), {"limit": 1})
+
+        self.assertEqual(response.status_code, 200)
+        ledger = response.json()
+        self.assertEqual(len(ledger), 1)
+        self.assertEqual({key: ledger[0][key] for key in ["ticker", "side", "shares", "price",
+                                                          "realizedGain"]},
+                         {"ticker": "PRU", "side": "sell", "shares": 4, "price": 25.5,
+                          "realizedGain": 22.0})
+
+
+class ConcurrentTradeTests(TransactionTestCase):
+    THREADS = 8
+    TRADES_PER_THREAD = 10
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username=USERNAME, password=PASSWORD)
+        stock = Stock.objects.create(ticker="PRU", name="Prudential Financial, Inc.", price=25)
+        Portfolio.objects.create(user=self.user, stock=stock, shares=1000)
+
+    def run_trades(self, *trades_to_run):
+        # Run each trade TRADES_PER_THREAD times in every thread at the same time
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.TRADES_PER_THREAD):
+                    for trade in trades_to_run:
+                        # SQLite fails right away if another thread is writing, so try again
+                        # (the failed trade was rolled back)
+                        while True:
+                            try:
+                                trade()
+                                break
+                            except OperationalError:
+                                sleep(0.001)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=worker) for _ in range(self.THREADS)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_no_lost_updates(self):
+        # Check that every parallel buy and sell is counted
+        self.run_trades(
+            lambda: trades.buy_stock(self.user.pk, "PRU", "Prudential Financial, Inc.", 2, 25, 0),
+            lambda: trades.sell_stock(self.user.pk, "PRU", 1, 25)
+        )
+        total_trades = self.THREADS * self.TRADES_PER_THREAD
+
+        self.assertEqual(Portfolio.objects.get(user=self.user).shares, 1000 + total_trades)
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).balance,
+                         10000 - total_trades * 25)
+
+    def test_no_overselling(self):
+        # Check that parallel sales can't sell more shares than the user owns
+        Portfolio.objects.update(shares=self.THREADS * self.TRADES_PER_THREAD // 2)
+
+        def trade():
+            try:
+                trades.sell_stock(self.user.pk, "PRU", 1, 25)
+            except trades.TradeError:
+                pass
+
+        self.run_trades(trade)
+
+        self.assertFalse(Portfolio.objects.exists())
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).balance,
+                         10000 + self.THREADS * self.TRADES_PER_THREAD // 2 * 25)
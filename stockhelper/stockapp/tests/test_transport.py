@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+import os
+from pathlib import Path
+import requests
+from stockapp import api, transport
+from stockapp.fakefmp import FakeFmp, create_server
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest.mock import patch
+
+
+class TransportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        # Record from a fake FMP so the tests don't use the network
+        self.server = create_server(FakeFmp(), port=0)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/stable"
+
+    def get_session(self, mode):
+        session = requests.Session()
+        session.mount("http://", transport.get_adapter(mode, self.directory, self.base_url))
+        return session
+
+    def test_record_then_replay(self):
+        # Check that recorded responses are replayed without the server or API key
+        recorded = self.get_session("record").get(
+            f"{self.base_url}/profile?apikey=secret&symbol=AAPL").json()
+        self.server.shutdown()
+
+        replayed = self.get_session("replay").get(f"{self.base_url}/profile?symbol=AAPL")
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.json(), recorded)
+        self.assertNotIn("secret", (self.directory / "profile.jsonl").read_text())
+
+    def test_replay_other_dates(self):
+        # Check that a history recorded on another day is replayed for different dates
+        self.get_session("record").get(
+            f"{self.base_url}/historical-price-eod/full?symbol=AAPL&from=2020-01-01&to=2020-12-31")
+        replayed = self.get_session("replay").get(
+            f"{self.base_url}/historical-price-eod/full?to=2026-12-31&symbol=AAPL&from=2026-01-01")
+
+        self.assertEqual(replayed.status_code, 200)
+        self.assertIsInstance(replayed.json(), list)
+
+    def test_missing_recording(self):
+        # Check that a request that wasn't recorded gets an error like FMP's
+        with self.assertLogs("stockapp.transport", "WARNING"):
+            response = self.get_session("replay").get(f"{self.base_url}/profile?symbol=AAPL")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("Error Message", response.json())
+
+    def test_passthrough(self):
+        # Check that nothing is recorded when passing requests through
+        self.get_session("passthrough").get(f"{self.base_url}/profile?symbol=AAPL")
+        self.assertFalse(any(self.directory.iterdir()))
+
+    def test_api_client(self):
+        # Check that the API client uses the transport set in the settings
+        with override_settings(FMP_TRANSPORT="record", FMP_RECORDINGS=self.directory,
+                               FMP_CACHE_TTL={}):
+            recorded = api.get_request(f"{self.base_url}/profile?symbol=PRU")
+
+        self.server.shutdown()
+
+        with override_settings(FMP_TRANSPORT="replay", FMP_RECORDINGS=self.directory,
+                               FMP_CACHE_TTL={}):
+            self.assertEqual(api.get_request(f"{self.base_url}/profile?symbol=PRU"), recorded)
+
+    @patch.dict(os.environ, {"FMP_API_KEY": ""})
+    def test_api_key_required(self):
+        # Check that a missing API key fails fast unless the responses are replayed
+        with override_settings(FMP_TRANSPORT="passthrough"), \
+                self.assertRaises(ImproperlyConfigured):
+            api.get_api_key()
+
+        with override_settings(FMP_TRANSPORT="replay"):
+            self.assertEqual(api.get_api_key(), "")
@@ -0,0 +1,152 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+from collections import defaultdict
+from contextvars import ContextVar
+import json
+import logging
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# The metrics of the current request, shared with any threads the request runs code in
+_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = perf_counter()
+        self.counts = defaultdict(int)
+        self.durations = defaultdict(float)
+
+    def get_total(self):
+        return (perf_counter() - self.start) * 1000
+
+
+def record(name, duration=0.0):
+    # Count something that happened during the current request and how long it took (in seconds)
+    # Does nothing outside of a request, e.g. in management commands
+    metrics = _metrics.get()
+
+    if metrics is not None:
+        metrics.counts[name] += 1
+        metrics.durations[name] += duration * 1000
+
+
+def time_query(execute, sql, params, many, context):
+    start = perf_counter()
+
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record("db", perf_counter() - start)
+
+
+@receiver(connection_created)
+def instrument_connection(connection, **kwargs):
+    # Async views query the database from other threads, so time the queries of every connection
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedTemplate:
+    # Wraps a template from the backend to time how long rendering it takes
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        start = perf_counter()
+
+        try:
+            return self.template.render(context, request)
+        finally:
+            record("template", perf_counter() - start)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def get_summary(request, response, metrics):
+    total = metrics.get_total()
+
+    return {
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "total_ms": round(total, 1),
+        "db_queries": metrics.counts["db"],
+        "db_ms": round(metrics.durations["db"], 1),
+        "fmp_calls": metrics.counts["fmp"],
+        "fmp_ms": round(metrics.durations["fmp"], 1),
+        "cache_hits": metrics.counts["cache_hit"],
+        "cache_misses": metrics.counts["cache_miss"],
+        "template_ms": round(metrics.durations["template"], 1),
+        "slow": total >= settings.SLOW_REQUEST_MS
+    }
+
+
+def get_server_timing(summary):
+    # e.g. total;dur=52.1, db;desc="3 queries";dur=1.2, fmp;desc="1 calls";dur=48.3, ...
+    return ", ".join([
+        f"total;dur={summary['total_ms']}",
+        f'db;desc="{summary["db_queries"]} queries";dur={summary["db_ms"]}',
+        f'fmp;desc="{summary["fmp_calls"]} calls";dur={summary["fmp_ms"]}',
+        f'cache;desc="{summary["cache_hits"]} hits, {summary["cache_misses"]} misses"',
+        f"template;dur={summary['template_ms']}"
+    ])
+
+
+class ServerTimingMiddleware:
+    # Time where each request spends its time, show it in the browser's dev tools through the
+    # Server-Timing header, and log it (as a warning if it's slower than SLOW_REQUEST_MS)
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+
+        return self.process_metrics(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metrics.reset(token)
+
+        return self.process_metrics(request, response, metrics)
+
+    def process_metrics(self, request, response, metrics):
+        summary = get_summary(request, response, metrics)
+        response["Server-Timing"] = get_server_timing(summary)
+        # Every request is only logged with LOG_LEVEL=DEBUG so the logs aren't flooded
+        logger.log(logging.WARNING if summary["slow"] else logging.DEBUG, json.dumps(summary))
+        return response
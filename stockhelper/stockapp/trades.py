@@ -0,0 +1,248 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from .models import Portfolio, Stock, Trade
+from decimal import Decimal
+import math
+
+
+class TradeError(Exception):
+    # The user tried to sell more shares than they own
+    def __init__(self, max_shares):
+        super().__init__(f"Can only sell up to {max_shares} shares")
+        self.max_shares = max_shares
+
+
+def get_total(shares, price):
+    # Convert the price through a string so floats like 25.1 don't pick up extra digits
+    return (Decimal(str(price)) * shares).quantize(Decimal("0.01"))
+
+
+def get_sold_cost(cost_basis, held_shares, shares):
+    # Each share sold takes away the average cost of a share from the cost basis
+    if held_shares <= 0:
+        return Decimal(0)
+
+    return (cost_basis * shares / held_shares).quantize(Decimal("0.01"))
+
+
+def get_preview(balance, held_shares, price, shares=None):
+    # Everything the order form needs to check a trade, so it doesn't have to ask on every
+    # keystroke, along with the cost of buying or selling the given number of shares
+    share_price = get_total(1, price)
+    preview = {
+        "balance": float(balance),
+        "price": float(share_price),
+        "maxBuy": max(int(balance // share_price), 0) if share_price > 0 else 0,
+        "maxSell": held_shares
+    }
+
+    if shares is not None:
+        preview["cost"] = float(get_total(shares, price))
+
+    return preview
+
+
+def buy_stock(user_id, ticker, name, shares, price, change):
+    total = get_total(shares, price)
+
+    with transaction.atomic():
+        # Update the balance first, which locks the user's row until the trade is done
+        # (on SQLite, it locks the whole database), so trades from the same account run one at
+        # a time without anyone reading a stale balance or share count
+        get_user_model().objects.filter(pk=user_id).update(balance=F("balance") - total)
+        # Create: a new stock is bought --> create the Stock object
+        Stock.objects.get_or_create(
+            ticker=ticker, defaults={"name": name, "price": price, "change": change})
+        # Update: buy an existing stock --> update the number of shares
+        updated = Portfolio.objects.filter(user_id=user_id, stock_id=ticker).update(
+            shares=F("shares") + shares, cost_basis=F("cost_basis") + total)
+
+        if updated == 0:
+            # Create: the user doesn't own any shares yet --> create the Portfolio object
+            Portfolio.objects.create(user_id=user_id, stock_id=ticker, shares=shares,
+                                     cost_basis=total)
+
+        return Trade.objects.create(user_id=user_id, stock_id=ticker, side=Trade.Side.BUY,
+                                    shares=shares, price=get_total(1, price), total=total)
+
+
+def sell_stock(user_id, ticker, shares, price):
+    # Raises a TradeError if the user doesn't own enough shares, nothing is changed in that case
+    total = get_total(shares, price)
+
+    with transaction.atomic():
+        get_user_model().objects.filter(pk=user_id).update(balance=F("balance") + total)
+        # The user's row is locked, so the shares can't change before the trade is done
+        portfolio = Portfolio.objects.select_for_update() \
+            .filter(user_id=user_id, stock_id=ticker).first()
+
+        if portfolio is None or shares > portfolio.shares:
+            # Error: the user sold too many shares, so roll back the balance
+            raise TradeError(portfolio.shares if portfolio is not None else 0)
+
+        cost = get_sold_cost(portfolio.cost_basis, portfolio.shares, shares)
+
+        if shares == portfolio.shares:
+            # Delete: sell all the shares of a stock --> delete it from the portfolio
+            portfolio.delete()
+        else:
+            Portfolio.objects.filter(pk=portfolio.pk).update(
+                shares=F("shares") - shares, cost_basis=F("cost_basis") - cost)
+
+        return Trade.objects.create(user_id=user_id, stock_id=ticker, side=Trade.Side.SELL,
+                                    shares=shares, price=get_total(1, price), total=total,
+                                    realized_gain=total - cost)
+
+
+def rebuild_portfolios():
+    # Replay the whole ledger to recreate every portfolio and the gains of each sale
+    # Returns the number of portfolios and trades
+    holdings = {}
+    sales = []
+    count = 0
+
+    for trade in Trade.objects.order_by("user", "stock", "timestamp", "pk").iterator():
+        holding = holdings.setdefault((trade.user_id, trade.stock_id), [0, Decimal(0)])
+        # Use the same total as the trade did, not the rounded price times the shares
+        total = trade.total
+        count += 1
+
+        if trade.side == Trade.Side.BUY:
+            holding[0] += trade.shares
+            holding[1] += total
+            continue
+
+        cost = get_sold_cost(holding[1], holding[0], trade.shares)
+        holding[0] -= trade.shares
+        holding[1] -= cost
+        trade.realized_gain = total - cost
+        sales.append(trade)
+
+    portfolios = [Portfolio(user_id=user_id, stock_id=ticker, shares=shares, cost_basis=cost_basis)
+                  for (user_id, ticker), (shares, cost_basis) in holdings.items() if shares > 0]
+
+    with transaction.atomic():
+        Portfolio.objects.all().delete()
+        Portfolio.objects.bulk_create(portfolios, batch_size=500)
+        Trade.objects.bulk_update(sales, ["realized_gain"], batch_size=500)
+
+    return len(portfolios), count
+
+
+def get_order_error(order):
+    # Check that an order has everything needed to trade, returns None if it's valid
+    if not isinstance(order, dict):
+        return "Each order must be an object"
+    if not isinstance(order.get("ticker"), str) or not order["ticker"].strip():
+        return "ticker is required"
+    if not isinstance(order.get("shares"), int) or isinstance(order["shares"], bool) or \
+            order["shares"] <= 0:
+        return "shares must be a positive integer"
+    # json.loads() accepts NaN and Infinity, which can't be turned into a total
+    if not isinstance(order.get("price"), (int, float)) or isinstance(order["price"], bool) or \
+            not math.isfinite(order["price"]) or order["price"] <= 0:
+        return "price must be a positive number"
+
+    return None
+
+
+def execute_orders(user_id, orders):
+    # Validate every order against the user's balance and holdings, then execute all of them
+    # or none of them in one transaction, using the same number of queries for any # of orders
+    # Returns whether the orders went through and the result of each order
+    tickers = {order["ticker"].strip().upper() for order in orders
+               if get_order_error(order) is None}
+
+    with transaction.atomic():
+        # Lock the user's row (see buy_stock) before reading the balance and holdings
+        users = get_user_model().objects.filter(pk=user_id)
+        users.update(balance=F("balance"))
+        balance = users.values_list("balance", flat=True).get()
+        portfolios = {portfolio.stock_id: portfolio for portfolio in
+                      Portfolio.objects.filter(user_id=user_id, stock__in=tickers)}
+        existing_stocks = set(Stock.objects.filter(ticker__in=tickers)
+                              .values_list("ticker", flat=True))
+
+        # Go through the orders in order, as if they were executed one by one
+        holdings = {ticker: [portfolio.shares, portfolio.cost_basis]
+                    for ticker, portfolio in portfolios.items()}
+        new_stocks = {}
+        ledger = []
+        results = []
+
+        for order in orders:
+            error = get_order_error(order)
+
+            if error is not None:
+                results.append({"status": "failure", "error": error})
+                continue
+
+            ticker = order["ticker"].strip().upper()
+            shares = order["shares"]
+            total = get_total(shares, order["price"])
+            holding = holdings.setdefault(ticker, [0, Decimal(0)])
+
+            if order.get("isBuying"):
+                if total > balance:
+                    results.append({"status": "failure", "error": "Not enough balance",
+                                    "maxShares": int(balance // get_total(1, order["price"]))})
+                    continue
+
+                balance -= total
+                holding[0] += shares
+                holding[1] += total
+                gain = Decimal(0)
+
+                if ticker not in existing_stocks:
+                    new_stocks.setdefault(ticker, Stock(
+                        ticker=ticker, name=order.get("name") or "", price=order["price"],
+                        change=order.get("change") or 0))
+            else:
+                if shares > holding[0]:
+                    results.append({"status": "failure", "error": "Not enough shares",
+                                    "maxShares": holding[0]})
+                    continue
+
+                cost = get_sold_cost(holding[1], holding[0], shares)
+                balance += total
+                holding[0] -= shares
+                holding[1] -= cost
+                gain = total - cost
+
+            ledger.append(Trade(user_id=user_id, stock_id=ticker,
+                                side=Trade.Side.BUY if order.get("isBuying") else Trade.Side.SELL,
+                                shares=shares, price=get_total(1, order["price"]),
+                                total=total, realized_gain=gain))
+            results.append({"status": "success"})
+
+        if any(result["status"] == "failure" for result in results):
+            return False, results
+
+        # Write everything at once
+        users.update(balance=balance)
+        Stock.objects.bulk_create(new_stocks.values(), ignore_conflicts=True)
+        updated = []
+        created = []
+
+        for ticker, (shares, cost_basis) in holdings.items():
+            portfolio = portfolios.get(ticker)
+
+            if portfolio is None:
+                if shares > 0:
+                    created.append(Portfolio(user_id=user_id, stock_id=ticker, shares=shares,
+                                             cost_basis=cost_basis))
+            elif shares > 0:
+                portfolio.shares = shares
+                portfolio.cost_basis = cost_basis
+                updated.append(portfolio)
+
+        # Delete: the user sold all the shares of a stock
+        Portfolio.objects.filter(user_id=user_id, stock__in=[
+            ticker for ticker, (shares, _) in holdings.items() if shares == 0]).delete()
+        Portfolio.objects.bulk_update(updated, ["shares", "cost_basis"])
+        Portfolio.objects.bulk_create(created)
+        Trade.objects.bulk_create(ledger)
+
+    return True, results
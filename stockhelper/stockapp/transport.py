@@ -0,0 +1,167 @@
+import json
+import logging
+from pathlib import Path
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from threading import Lock
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# How the API client talks to FMP:
+# passthrough: call FMP like normal
+# record: call FMP and save every response to the store
+# replay: answer from the store without touching the network
+MODES = ["passthrough", "record", "replay"]
+# Dates that depend on the day a request is made, a recording without them is used if the
+# exact dates weren't recorded
+VOLATILE_PARAMS = {"from", "to"}
+
+
+def get_params(url):
+    # Sort the parameters and strip the API key so equivalent URLs match
+    return sorted((key, value) for key, value in parse_qsl(urlsplit(url).query)
+                  if key != "apikey")
+
+
+class RecordingStore:
+    """
+    Responses saved on disk as one JSON line per response, with a file for each endpoint.
+    Recordings are keyed by the URL without its host or API key, e.g. profile?symbol=AAPL, so
+    they can be replayed against any FMP_BASE_URL. Later lines replace earlier ones.
+    """
+
+    def __init__(self, directory, base_url):
+        self.directory = Path(directory)
+        self.base_path = urlsplit(base_url).path
+        self.recordings = {}  # endpoint --> {key: recording}
+        self.lock = Lock()
+
+    def get_endpoint(self, url):
+        return urlsplit(url).path.removeprefix(self.base_path).strip("/")
+
+    def get_key(self, url, ignore=()):
+        params = [(key, value) for key, value in get_params(url) if key not in ignore]
+        return f"{self.get_endpoint(url)}?{urlencode(params)}"
+
+    def get_path(self, endpoint):
+        # e.g. historical-price-eod/full --> historical-price-eod_full.jsonl
+        return self.directory / f"{endpoint.replace('/', '_')}.jsonl"
+
+    def load(self, endpoint):
+        # Read each endpoint's file once, the lock must be held
+        if endpoint not in self.recordings:
+            path = self.get_path(endpoint)
+            lines = path.read_text().splitlines() if path.is_file() else []
+            recordings = {}
+
+            for line in lines:
+                recording = json.loads(line)
+                recordings[recording["url"]] = recording
+                # Also match the same request made on another day
+                recordings[self.get_key(recording["url"], VOLATILE_PARAMS)] = recording
+
+            self.recordings[endpoint] = recordings
+
+        return self.recordings[endpoint]
+
+    def get(self, url):
+        endpoint = self.get_endpoint(url)
+
+        with self.lock:
+            recordings = self.load(endpoint)
+            return recordings.get(self.get_key(url)) or \
+                recordings.get(self.get_key(url, VOLATILE_PARAMS))
+
+    def get_all(self, endpoint):
+        # Every recording of an endpoint once, e.g. for the fake FMP server to search through
+        with self.lock:
+            return [recording for key, recording in self.load(endpoint).items()
+                    if key == recording["url"]]
+
+    def save(self, url, status, content):
+        # Keep JSON as is so the files stay small and readable
+        try:
+            recording = {"url": self.get_key(url), "status": status, "json": json.loads(content)}
+        except ValueError:
+            recording = {"url": self.get_key(url), "status": status,
+                         "text": content.decode(errors="replace")}
+
+        endpoint = self.get_endpoint(url)
+
+        with self.lock:
+            recordings = self.load(endpoint)
+
+            if recordings.get(recording["url"]) == recording:
+                return
+
+            recordings[recording["url"]] = recording
+            recordings[self.get_key(url, VOLATILE_PARAMS)] = recording
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            with self.get_path(endpoint).open("a") as file:
+                file.write(json.dumps(recording, separators=(",", ":")) + "\n")
+
+
+def build_response(request, status, content):
+    response = Response()
+    response.status_code = status
+    response._content = content
+    response.encoding = "utf-8"
+    response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    # Calls FMP and saves the responses
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+
+        # Don't record FMP's rate limit responses, they would be replayed forever
+        if response.status_code != 429 and b"X-Rate-Limit-Retry-After" not in response.content:
+            self.store.save(request.url, response.status_code, response.content)
+
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    # Answers from the saved responses without touching the network
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def send(self, request, **kwargs):
+        recording = self.store.get(request.url)
+
+        if recording is None:
+            key = self.store.get_key(request.url)
+            logger.warning("No recording for %s", key)
+            return build_response(request, 404, json.dumps(
+                {"Error Message": f"No recording for {key}"}).encode())
+
+        content = json.dumps(recording["json"]).encode() if "json" in recording \
+            else recording["text"].encode()
+        return build_response(request, recording["status"], content)
+
+    def close(self):
+        pass
+
+
+def get_adapter(mode, directory, base_url, **kwargs):
+    # Get the adapter for the mode, kwargs go to the HTTPAdapter that calls FMP
+    if mode not in MODES:
+        raise ValueError(f"FMP_TRANSPORT must be one of {', '.join(MODES)}, not {mode}")
+
+    if mode == "replay":
+        return ReplayAdapter(RecordingStore(directory, base_url))
+    if mode == "record":
+        return RecordingAdapter(RecordingStore(directory, base_url), **kwargs)
+
+    return HTTPAdapter(**kwargs)
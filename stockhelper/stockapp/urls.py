@@ -1,3 +1,4 @@
+from django.contrib.auth.decorators import login_required
 from django.urls import path
 
 from . import views
@@ -10,5 +11,16 @@ urlpatterns = [
     path("flashcards", views.FlashCardsView.as_view(), name="flashcards"),
     path("portfolio", views.get_portfolio, name="portfolio"),
     path("session/balance", views.SessionBalanceView.as_view(), name="balance"),
-    path("api/price/<ticker>", views.PriceView.as_view(), name="price")
+    path("api/orders", views.place_orders, name="orders"),
+    # login_required supports async views, unlike LoginRequiredMixin
+    path("api/price/<ticker>", login_required(views.PriceView.as_view()), name="price"),
+    path("api/prices", login_required(views.PricesView.as_view()), name="prices"),
+    path("api/stream", login_required(views.PriceStreamView.as_view()), name="stream"),
+    path("api/networth", login_required(views.NetWorthView.as_view()), name="networth"),
+    path("api/history/<ticker>", login_required(views.HistoryView.as_view()), name="history"),
+    path("api/stats/<ticker>", login_required(views.StatsView.as_view()), name="stats"),
+    path("api/trades", login_required(views.TradesView.as_view()), name="trades"),
+    path("api/trades/preview/<ticker>", login_required(views.TradePreviewView.as_view()),
+         name="preview"),
+    path("metrics", views.get_metrics, name="metrics")
 ]
@@ -1,169 +1,177 @@
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.utils import timezone
 from django.views import generic
+from django.views.decorators.http import require_POST
 
-from . import api
+from . import analytics, api, async_api, conditional, glossary, history, metrics, networth, \
+    quotes, screener, stream, trades
 from .forms import ScreenerForm
-from .models import Card, Portfolio, Stock
-from decimal import Decimal
+from .models import Card, Portfolio, Stock, Trade
+from datetime import date, timedelta
+from functools import partial
 from http import HTTPStatus
 import json
+import logging
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+# How far back each history range goes
+HISTORY_RANGES = {
+    "1m": timedelta(days=31),
+    "1y": timedelta(days=366),
+    "5y": timedelta(days=366 * 5)
+}
 
 
 # Home view
 def get_index(request):
     # Aggregate all the terms needed for each page
-    terms = {
-        "equity": Card.objects.get(word="Equity")
-    }
+    # The terms are only looked up if the popovers aren't cached
+    terms = SimpleLazyObject(lambda: glossary.get_terms({
+        "equity": "Equity"
+    }))
 
-    return render(request, "stockapp/index.html", {
+    return glossary.get_page(request, "index", lambda: render(request, "stockapp/index.html", {
         "terms": terms,
-        "user": request.user
-    })
+        "user": request.user,
+        "glossary_version": glossary.get_version(),
+        "glossary_timeout": glossary.PAGE_TIMEOUT
+    }))
 
 
 # Screener view
-def get_stocks(request):
+async def get_stocks(request):
     if request.method == "POST":
         # Keep the form as is after submitting
         form = ScreenerForm(request.POST)
 
         # Check if the form is bound to data and doesn't have any errors
         if form.is_valid():
-            # Query the dataset
-            stock_data = api.get_stocks(form.cleaned_data)
-            print(f"{stock_data=}")
+            # Search the local snapshot through a GET so the results can be paged
+            if await sync_to_async(screener.is_available)():
+                query = urlencode({name: form.data[name] for name in form.fields
+                                   if form.data.get(name)})
+                return HttpResponseRedirect(f"{reverse('stockapp:screener')}?{query}")
+
+            # Otherwise, query the dataset
+            stock_data = await async_api.get_stocks(form.cleaned_data)
+            logger.debug("stock_data=%s", stock_data)
 
             # If stock_data isn't a list (due to an API error), treat it like there are no results
+            # Only the key goes in the session so the session row stays small
             if isinstance(stock_data, list):
-                request.session["results"] = stock_data
+                key = await sync_to_async(screener.save_results)(stock_data)
+                await request.session.aset("results_key", key)
 
             # Return an HttpResponseRedirect to prevent the data from being posted twice
             return HttpResponseRedirect(reverse("stockapp:screener"))
 
-    # Show an empty form when entering the screener page
-    form = ScreenerForm()
-    # Display the results after a POST request
-    # results will be None if there aren't any results
-    results = request.session.get("results")
-    # don't throw an error if the key isn't present
-    request.session.pop("results", None)
-
-    terms = {
-        "beta": Card.objects.get(word="Beta"),
-        "dividendYield": Card.objects.get(word="Dividend Yield"),
-        "etf": Card.objects.get(word="ETF"),
-        "index": Card.objects.get(word="Index"),
-        "indexFund": Card.objects.get(word="Index Fund"),
-        "marketCap": Card.objects.get(word="Market Cap"),
-        "marketExchange": Card.objects.get(word="Market Exchange"),
-        "mutualFund": Card.objects.get(word="Mutual Fund"),
-        "sharePrice": Card.objects.get(word="Share Price"),
-        "volume": Card.objects.get(word="Volume")
-    }
+    page = None
+    query = ""
+    user = await request.auser()
+    etag = None
+    last_modified = None
+
+    if "country" in request.GET:
+        # Search the local snapshot, keeping the filters in the form
+        form = ScreenerForm(request.GET)
+        # The results only change when a new snapshot is taken
+        last_modified = await sync_to_async(screener.get_snapshot_time)()
+        etag = conditional.get_etag(request, user, sorted(request.GET.lists()), last_modified,
+                                    glossary.get_version())
+        not_modified = conditional.get_not_modified(request, etag, last_modified)
+
+        if not_modified is not None:
+            return not_modified
+
+        if form.is_valid():
+            page = await sync_to_async(screener.get_page)(form.cleaned_data,
+                                                          request.GET.get("page"))
+            query = urlencode({name: value for name, value in request.GET.items()
+                               if name != "page"})
+
+        results = page.object_list if page is not None else None
+    else:
+        # Show an empty form when entering the screener page
+        form = ScreenerForm()
+        # Display the results after a POST request
+        # results will be None if there aren't any results
+        # don't throw an error if the key isn't present
+        results = await sync_to_async(screener.get_results)(
+            await request.session.apop("results_key", None))
+
+        # Results from FMP are only shown once, so only the empty form can be revalidated
+        if results is None:
+            etag = conditional.get_etag(request, user, glossary.get_version())
+            not_modified = conditional.get_not_modified(request, etag)
+
+            if not_modified is not None:
+                return not_modified
+
+    terms = await sync_to_async(get_screener_terms)()
     sorted_symbols = list(sorted(api.FREE_TIER_SYMBOLS.items(), key=lambda symbol: symbol[0]))
 
-    return render(request, "stockapp/screener.html", {
+    # Rendering may need to load the user from the database, so it can't run in the event loop
+    response = await sync_to_async(render)(request, "stockapp/screener.html", {
         "form": form,
         "results": results,
+        "page": page,
+        "query": query,
         "terms": terms,
         "freeTierSymbols": sorted_symbols
     })
 
+    if etag is None:
+        # Don't let the browser reuse a page of FMP results
+        patch_cache_control(response, private=True, no_store=True)
+        return response
+
+    return conditional.set_validators(response, etag, last_modified)
+
+
+def get_screener_terms():
+    return glossary.get_terms({
+        "beta": "Beta",
+        "dividendYield": "Dividend Yield",
+        "etf": "ETF",
+        "index": "Index",
+        "indexFund": "Index Fund",
+        "marketCap": "Market Cap",
+        "marketExchange": "Market Exchange",
+        "mutualFund": "Mutual Fund",
+        "sharePrice": "Share Price",
+        "volume": "Volume"
+    })
+
 
 # Details view
 # Users are required to log in if the view requires access to their balance (cookie lasts 2 weeks)
 @login_required
-def get_stock_details(request, ticker):
+async def get_stock_details(request, ticker):
     if request.method == "POST":
-        # Make changes to the user's shares
-        # Since this isn't form data, the request body needs to be decoded
-        stock_info = json.loads(request.body)
-        symbol = stock_info.get("ticker")
-        name = stock_info.get("name")
-        is_buying = stock_info.get("isBuying")
-        shares = stock_info.get("shares")
-        price = stock_info.get("price")
-        change = stock_info.get("change")
-
-        # Read: show all the stocks the user bought (done in the portfolio view)
-        try:
-            # Check if the user already owns this stock
-            existing_stock = Stock.objects.get(ticker=symbol)
-            existing_portfolio = Portfolio.objects.get(
-                user=request.user, stock=existing_stock)
-
-            # Update: buy or sell an existing stock --> update the number of shares
-            if is_buying:
-                existing_portfolio.shares += shares
-                existing_portfolio.save()
-            elif shares == existing_portfolio.shares:
-                # Delete: sell all the shares of a stock --> delete it from the portfolio
-                existing_portfolio.delete()
-            elif shares > existing_portfolio.shares:
-                # Error: the user sold too many shares
-                return JsonResponse(
-                    {"status": "failure", "maxShares": existing_portfolio.shares},
-                    status=HTTPStatus.BAD_REQUEST  # status code 400 = client-side error
-                )
-            else:
-                existing_portfolio.shares -= shares
-                existing_portfolio.save()
-        except Stock.DoesNotExist:
-            # If Stock.get() throws an error
-            if is_buying:
-                # Create: a new stock is bought --> create the Stock and Portfolio objects
-                new_stock = Stock.objects.create(
-                    ticker=symbol, name=name, price=price, change=change)
-                Portfolio.objects.create(
-                    user=request.user, stock=new_stock, shares=shares)
-            else:
-                # Error: the user can't sell any shares
-                return JsonResponse({"status": "failure", "maxShares": 0},
-                                    status=HTTPStatus.BAD_REQUEST)
-        except Portfolio.DoesNotExist:
-            # If Portfolio.get() throws an error
-            if is_buying:
-                # Create: a new stock is bought --> create the portfolio and add the existing stock
-                Portfolio.objects.create(
-                    user=request.user, stock=existing_stock, shares=shares)
-            else:
-                # Error: the user can't sell any shares
-                return JsonResponse({"status": "failure", "maxShares": 0},
-                                    status=HTTPStatus.BAD_REQUEST)
-
-        # Update the user's balance
-        if is_buying:
-            request.user.balance -= Decimal(shares * price)
-        else:
-            request.user.balance += Decimal(shares * price)
-
-        request.user.save()
-        return JsonResponse({"status": "success"})
+        # Trades only touch the database, so run them synchronously
+        return await sync_to_async(trade_stock)(request)
 
     # Fetch details about a company and display it to the user
-    raw_profile = api.get_company_profile(ticker)  # returns a list of dicts
-    # returns a dict with symbol and historical list
-    raw_history = api.get_stock_history(ticker)
-    print(f"{raw_profile=}")
-    print(f"{raw_history=}")
-
-    terms = {
-        "beta": Card.objects.get(word="Beta"),
-        "broker": Card.objects.get(word="Broker"),
-        "dividendYield": Card.objects.get(word="Dividend Yield"),
-        "marketCap": Card.objects.get(word="Market Cap"),
-        "marketExchange": Card.objects.get(word="Market Exchange"),
-        "marketOrder": Card.objects.get(word="Market Order"),
-        "risk": Card.objects.get(word="Risk"),
-        "trader": Card.objects.get(word="Trader"),
-        "volatility": Card.objects.get(word="Volatility"),
-        "volume": Card.objects.get(word="Volume")
-    }
+    # The history is loaded separately by the page through the history API
+    raw_profile = await async_api.get_company_profile(ticker)  # returns a list of dicts
+    logger.debug("raw_profile=%s", raw_profile)
+
+    terms = await sync_to_async(get_detail_terms)()
+    user = await request.auser()
+    # Render what the order form needs so typing in it doesn't have to ask the server
+    held_shares = await Portfolio.objects.filter(user=user, stock=ticker.upper()) \
+        .values_list("shares", flat=True).afirst() or 0
     status = 200
 
     # profile should be an array with one element, display an error if that's not the case
@@ -172,26 +180,109 @@ def get_stock_details(request, ticker):
         status = 400
     elif isinstance(raw_profile, list) and len(raw_profile) >= 1:
         profile = raw_profile[0]
+    elif api.is_rate_limited(raw_profile):
+        # Let the user know to try again later if FMP's quota is used up
+        profile = raw_profile
+        status = HTTPStatus.TOO_MANY_REQUESTS
     else:
         profile = raw_profile
         status = 400
 
-    # history should be an array of dicts, display an error if that's not the case
-    if isinstance(raw_history, list):
-        history = raw_history
-    elif isinstance(raw_history, dict) and "Error Message" in raw_history:
-        history = raw_history
-        status = 400
-    else:
-        history = ticker
-        status = 400
+    # The page only changes with the profile (cached from FMP), the balance, shares, or terms
+    etag = conditional.get_etag(request, user, raw_profile, user.balance, held_shares,
+                                glossary.get_version())
+
+    if status == 200:
+        not_modified = conditional.get_not_modified(request, etag)
 
-    return render(request, "stockapp/detail.html", {
+        if not_modified is not None:
+            return not_modified
+
+    response = await sync_to_async(render)(request, "stockapp/detail.html", {
+        "ticker": ticker,
         "profile": profile,
-        "history": history,
-        "balance": request.user.balance,
+        "balance": user.balance,
+        "held_shares": held_shares,
         "terms": terms
     }, status=status)
+    return conditional.set_validators(response, etag) if status == 200 else response
+
+
+def get_detail_terms():
+    return glossary.get_terms({
+        "beta": "Beta",
+        "broker": "Broker",
+        "dividendYield": "Dividend Yield",
+        "marketCap": "Market Cap",
+        "marketExchange": "Market Exchange",
+        "marketOrder": "Market Order",
+        "risk": "Risk",
+        "trader": "Trader",
+        "volatility": "Volatility",
+        "volume": "Volume"
+    })
+
+
+def trade_stock(request):
+    # Make changes to the user's shares
+    # Since this isn't form data, the request body needs to be decoded
+    try:
+        stock_info = json.loads(request.body)
+    except json.JSONDecodeError:
+        stock_info = None
+
+    # Check the trade the same way as each of the orders placed at once, e.g. so a negative number
+    # of shares isn't traded the other way
+    error = trades.get_order_error(stock_info)
+
+    if error is not None:
+        return JsonResponse({"status": "failure", "error": error}, status=HTTPStatus.BAD_REQUEST)
+
+    symbol = stock_info.get("ticker")
+    name = stock_info.get("name")
+    is_buying = stock_info.get("isBuying")
+    shares = stock_info.get("shares")
+    price = stock_info.get("price")
+    change = stock_info.get("change")
+
+    # Read: show all the stocks the user bought (done in the portfolio view)
+    try:
+        if is_buying:
+            trades.buy_stock(request.user.pk, symbol, name, shares, price, change)
+        else:
+            trades.sell_stock(request.user.pk, symbol, shares, price)
+    except trades.TradeError as error:
+        # Error: the user sold too many shares
+        return JsonResponse(
+            {"status": "failure", "maxShares": error.max_shares},
+            status=HTTPStatus.BAD_REQUEST  # status code 400 = client-side error
+        )
+
+    return JsonResponse({"status": "success"})
+
+
+# Execute multiple buys and sells at once, e.g. to rebalance a portfolio
+@login_required
+@require_POST
+def place_orders(request):
+    # The body should look like {"orders": [{"ticker", "isBuying", "shares", "price"}, ...]}
+    # (name and change are also needed to buy a stock that hasn't been bought before)
+    try:
+        orders = json.loads(request.body).get("orders")
+    except (json.JSONDecodeError, AttributeError):
+        orders = None
+
+    if not isinstance(orders, list) or len(orders) == 0:
+        return JsonResponse({"status": "failure", "error": "orders must be a non-empty list"},
+                            status=HTTPStatus.BAD_REQUEST)
+
+    succeeded, results = trades.execute_orders(request.user.pk, orders)
+
+    # Nothing is executed if any of the orders fail
+    return JsonResponse({
+        "status": "success" if succeeded else "failure",
+        "results": results
+    }, status=HTTPStatus.OK if succeeded else HTTPStatus.BAD_REQUEST)
 
 
 # Flashcards view
@@ -206,15 +297,31 @@ class FlashCardsView(generic.ListView):
         """
         return Card.objects.order_by("word")
 
+    def get_context_data(self, **kwargs):
+        # The list of cards is cached in the template until the glossary's version changes
+        return super().get_context_data(**kwargs, glossary_version=glossary.get_version(),
+                                        glossary_timeout=glossary.PAGE_TIMEOUT)
+
+    def get(self, request, *args, **kwargs):
+        # The cards only change when the glossary's version does
+        etag = conditional.get_etag(request, request.user, glossary.get_version())
+        # Anonymous users all see the same page, so shared caches can keep it
+        public = not request.user.is_authenticated
+        render_page = partial(super().get, request, *args, **kwargs)
+
+        return conditional.get_not_modified(request, etag, public=public) or \
+            conditional.set_validators(glossary.get_page(request, "flashcards", render_page), etag,
+                                       public=public)
+
 
 # Portfolio view
 @login_required
 def get_portfolio(request):
-    terms = {
-        "portfolio": Card.objects.get(word="Portfolio"),
-        "roi": Card.objects.get(word="ROI"),
-        "sharePrice": Card.objects.get(word="Share Price")
-    }
+    terms = glossary.get_terms({
+        "portfolio": "Portfolio",
+        "roi": "ROI",
+        "sharePrice": "Share Price"
+    })
 
     # Join the ticker, name, and shares into one QuerySet
     # stock__ticker = stock.ticker
@@ -224,6 +331,9 @@ def get_portfolio(request):
     return render(request, "stockapp/portfolio.html", {
         "balance": request.user.balance,
         "portfolios": portfolios,
+        # Show the net worth from the last saved prices right away, the page updates it once
+        # the latest prices are loaded
+        "netWorth": networth.get_net_worth(request.user),
         "terms": terms
     })
 
@@ -235,22 +345,35 @@ class SessionBalanceView(LoginRequiredMixin, generic.base.TemplateView):
         return HttpResponse(request.user.balance)
 
 
-class PriceView(LoginRequiredMixin, generic.base.TemplateView):
-    def get(self, request, ticker):
+# Login is checked in urls.py since LoginRequiredMixin can't load the user in an async view
+class PriceView(generic.View):
+    async def get(self, request, ticker):
         # Get the price, change, and shares of the given ticker
         # Tickers are stored in all caps, but the request should be case insensitive
         upper_ticker = ticker.upper()
+        user = await request.auser()
 
         try:
             # SELECT Stock.price, Stock.change, Porfolio.shares
             # FROM Stock JOIN Portfolio ON Stock.ticker = Porfolio.stock
             # WHERE Stock.ticker = <ticker> AND Porfolio.user =
             # (SELECT username FROM User WHERE username = <request.user>)
-            portfolio = Portfolio.objects.get(
-                user=request.user, stock=upper_ticker)
+            portfolio = await Portfolio.objects.select_related("stock").aget(
+                user=user, stock=upper_ticker)
             stock = portfolio.stock
-            raw_profile = api.get_company_profile(upper_ticker)
-            print(f"{raw_profile=}")
+
+            # The quote refresher keeps the prices up to date, so only ask FMP if it's behind
+            if quotes.is_fresh(stock):
+                etag = get_price_etag(request, user, portfolio)
+                return conditional.get_not_modified(request, etag, stock.updated_at) or \
+                    conditional.set_validators(JsonResponse({
+                        "price": float(stock.price),
+                        "change": stock.change,
+                        "shares": portfolio.shares
+                    }), etag, stock.updated_at)
+
+            raw_profile = await async_api.get_company_profile(upper_ticker)
+            logger.debug("raw_profile=%s", raw_profile)
 
             # profile should be an array with one element, display an error if that's not the case
             if not raw_profile:
@@ -259,6 +382,10 @@ class PriceView(LoginRequiredMixin, generic.base.TemplateView):
                 }, status=HTTPStatus.BAD_REQUEST)
             elif isinstance(raw_profile, list) and len(raw_profile) >= 1:
                 profile = raw_profile[0]
+            elif api.is_rate_limited(raw_profile):
+                return JsonResponse({
+                    "error": raw_profile["Error Message"]
+                }, status=HTTPStatus.TOO_MANY_REQUESTS)
             else:
                 error = raw_profile.get("Error Message", raw_profile) if hasattr(
                     raw_profile, "get") else raw_profile
@@ -270,14 +397,294 @@ class PriceView(LoginRequiredMixin, generic.base.TemplateView):
             stock.name = profile["companyName"]
             stock.price = profile["price"]
             stock.change = profile["change"]
-            stock.save()
+            stock.updated_at = timezone.now()
+            await stock.asave()
 
-            return JsonResponse({
+            return conditional.set_validators(JsonResponse({
                 "price": stock.price,
                 "change": stock.change,
                 "shares": portfolio.shares
-            })
+            }), get_price_etag(request, user, portfolio), stock.updated_at)
         except Portfolio.DoesNotExist:
             return JsonResponse({
                 "error": f"{upper_ticker} doesn't exist in the user's porfolio"
             }, status=HTTPStatus.BAD_REQUEST)
+
+
+def get_price_etag(request, user, portfolio):
+    # A price only changes when its quote is updated
+    return conditional.get_etag(request, user, portfolio.stock_id, portfolio.stock.updated_at,
+                                portfolio.shares)
+
+
+class PricesView(generic.View):
+    async def get(self, request):
+        # Get the price, change, and shares of all the stocks in the user's portfolio at once
+        # Optionally only include the comma-separated tickers in ?tickers=
+        tickers = {ticker.strip().upper() for ticker in request.GET.get("tickers", "").split(",")
+                   if ticker.strip()}
+        user = await request.auser()
+        # Fetch each portfolio and its stock in a single JOIN
+        portfolios = Portfolio.objects.filter(user=user).select_related("stock")
+
+        if tickers:
+            portfolios = portfolios.filter(stock__in=tickers)
+
+        portfolios = [portfolio async for portfolio in portfolios]
+        prices = {}
+        # Only ask FMP for the prices the quote refresher hasn't updated recently
+        stale_portfolios = []
+
+        for portfolio in portfolios:
+            if quotes.is_fresh(portfolio.stock):
+                prices[portfolio.stock.ticker] = {
+                    "price": float(portfolio.stock.price),
+                    "change": portfolio.stock.change,
+                    "shares": portfolio.shares
+                }
+            else:
+                stale_portfolios.append(portfolio)
+
+        if len(stale_portfolios) > 0:
+            raw_quotes = await async_api.get_quotes(
+                [portfolio.stock.ticker for portfolio in stale_portfolios])
+            logger.debug("raw_quotes=%s", raw_quotes)
+
+            # quotes should be an array of dicts, display an error if that's not the case
+            if api.is_rate_limited(raw_quotes):
+                return JsonResponse({
+                    "error": raw_quotes["Error Message"]
+                }, status=HTTPStatus.TOO_MANY_REQUESTS)
+            elif not isinstance(raw_quotes, list):
+                error = raw_quotes.get("Error Message", raw_quotes) if hasattr(
+                    raw_quotes, "get") else raw_quotes
+                return JsonResponse({
+                    "error": error
+                }, status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+            quotes_by_ticker = {quote["symbol"]: quote for quote in raw_quotes}
+            updated_stocks = []
+
+            for portfolio in stale_portfolios:
+                stock = portfolio.stock
+                quote = quotes_by_ticker.get(stock.ticker)
+
+                if quote is None:
+                    prices[stock.ticker] = {"error": f"No stock {stock.ticker} found"}
+                    continue
+
+                quotes.update_stock(stock, quote)
+                updated_stocks.append(stock)
+                prices[stock.ticker] = {
+                    "price": stock.price,
+                    "change": stock.change,
+                    "shares": portfolio.shares
+                }
+
+            # Save all the new prices in one query
+            await Stock.objects.abulk_update(updated_stocks,
+                                             ["name", "price", "change", "updated_at"])
+
+        for ticker in tickers - prices.keys():
+            prices[ticker] = {"error": f"{ticker} doesn't exist in the user's porfolio"}
+
+        return JsonResponse(prices)
+
+
+class PriceStreamView(generic.View):
+    async def get(self, request):
+        # Push the price and change of the comma-separated ?tickers= as Server-Sent Events
+        tickers = sorted({ticker.strip().upper() for ticker in
+                          request.GET.get("tickers", "").split(",") if ticker.strip()})
+
+        # A stream can watch every stock in the user's portfolio, however many there are, but any
+        # other tickers are capped so one stream can't start too many pollers
+        too_many = len(tickers) > stream.MAX_TICKERS and await Portfolio.objects.filter(
+            user=await request.auser(), stock__in=tickers).acount() < len(tickers)
+
+        if not tickers or too_many:
+            return JsonResponse({
+                "error": f"tickers must have between 1 and {stream.MAX_TICKERS} tickers, "
+                         "unless they're all in your portfolio"
+            }, status=HTTPStatus.BAD_REQUEST)
+
+        # A WSGI worker would be stuck serving the stream forever, and 204 tells the browser
+        # to stop reconnecting, so the page keeps the prices it loaded with
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=HTTPStatus.NO_CONTENT)
+
+        response = StreamingHttpResponse(stream.get_events(stream.get_hub(), tickers),
+                                         content_type="text/event-stream")
+        patch_cache_control(response, no_cache=True)
+        # Don't let proxies like nginx hold the events back
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class NetWorthView(generic.View):
+    async def get(self, request):
+        # Get the user's balance, net worth, and ROI from the last saved prices
+        user = await request.auser()
+        net_worth = await sync_to_async(networth.get_net_worth)(user)
+        return JsonResponse({key: float(value) for key, value in net_worth.items()})
+
+
+def get_history_range(params):
+    # Either use a preset ?range= or a custom ?from=YYYY-MM-DD&to=YYYY-MM-DD (both inclusive)
+    # Raises a ValueError if the range is invalid
+    if "from" in params or "to" in params:
+        end = date.fromisoformat(params["to"]) if "to" in params else timezone.localdate()
+        start = date.fromisoformat(params["from"]) if "from" in params \
+            else end - HISTORY_RANGES["1y"]
+
+        if start > end:
+            raise ValueError(f"from ({start}) must be before to ({end})")
+
+        return start, end
+
+    preset = params.get("range", "1y")
+
+    if preset not in HISTORY_RANGES:
+        raise ValueError(f"range must be one of: {', '.join(HISTORY_RANGES)}")
+
+    end = timezone.localdate()
+    return end - HISTORY_RANGES[preset], end
+
+
+class HistoryView(generic.View):
+    async def get(self, request, ticker):
+        # Get the daily prices of the given ticker within a date range (newest first)
+        try:
+            start, end = get_history_range(request.GET)
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=HTTPStatus.BAD_REQUEST)
+
+        raw_history = await history.aget_stock_history(ticker, start, end)
+        error_response = get_history_error(raw_history, ticker)
+
+        if error_response is not None:
+            return error_response
+
+        # The history only changes when a new EOD bar is stored
+        user = await request.auser()
+        etag = conditional.get_etag(request, user, ticker.upper(), start, end,
+                                    raw_history[0]["date"] if raw_history else None,
+                                    len(raw_history))
+        return conditional.get_not_modified(request, etag) or \
+            conditional.set_validators(JsonResponse(raw_history, safe=False), etag)
+
+
+class StatsView(generic.View):
+    async def get(self, request, ticker):
+        # Get the short-term and long-term stats and predictions of the given ticker
+        # A year of calendar days has fewer trading days than the long-term window needs
+        end = timezone.localdate()
+        raw_history = await history.aget_stock_history(ticker, end - analytics.LONG_TERM_SPAN, end)
+        error_response = get_history_error(raw_history, ticker)
+
+        if error_response is not None:
+            return error_response
+
+        try:
+            stats = await sync_to_async(analytics.get_analysis)(ticker, raw_history)
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=HTTPStatus.BAD_REQUEST)
+
+        return JsonResponse(stats)
+
+
+class TradePreviewView(generic.View):
+    async def get(self, request, ticker):
+        # Get the balance and how many shares can be bought or sold, ?shares= also gets the cost
+        upper_ticker = ticker.upper()
+
+        try:
+            shares = int(request.GET["shares"]) if "shares" in request.GET else None
+        except ValueError:
+            shares = 0
+
+        if shares is not None and shares <= 0:
+            return JsonResponse({"error": "shares must be a positive integer"},
+                                status=HTTPStatus.BAD_REQUEST)
+
+        # The profile is cached, so this only calls FMP once a minute per ticker
+        raw_profile = await async_api.get_company_profile(upper_ticker)
+        error = get_profile_error(raw_profile, upper_ticker)
+
+        if error is not None:
+            return error
+
+        user = await request.auser()
+        held_shares = await Portfolio.objects.filter(user=user, stock=upper_ticker) \
+            .values_list("shares", flat=True).afirst() or 0
+        price = raw_profile[0]["price"]
+        etag = conditional.get_etag(request, user, upper_ticker, price, user.balance,
+                                    held_shares, shares)
+
+        return conditional.get_not_modified(request, etag) or conditional.set_validators(
+            JsonResponse(trades.get_preview(user.balance, held_shares, price, shares)), etag)
+
+
+class TradesView(generic.View):
+    async def get(self, request):
+        # Get the user's most recent trades (newest first), up to ?limit= trades
+        try:
+            limit = min(int(request.GET.get("limit", 50)), 500)
+        except ValueError:
+            return JsonResponse({"error": "limit must be a number"},
+                                status=HTTPStatus.BAD_REQUEST)
+
+        user = await request.auser()
+        ledger = Trade.objects.filter(user=user).order_by("-timestamp", "-pk")[:limit]
+
+        return JsonResponse([{
+            "ticker": trade.stock_id,
+            "side": trade.side,
+            "shares": trade.shares,
+            "price": float(trade.price),
+            "realizedGain": float(trade.realized_gain),
+            "timestamp": trade.timestamp.isoformat()
+        } async for trade in ledger], safe=False)
+
+
+@staff_member_required
+def get_metrics(request):
+    # Expose the FMP client's counters for Prometheus to scrape
+    return HttpResponse(metrics.render(api.get_cache_stats()),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def get_history_error(raw_history, ticker):
+    # history should be an array of dicts, return an error response if that's not the case
+    if isinstance(raw_history, list):
+        return None
+    elif api.is_rate_limited(raw_history):
+        return JsonResponse({
+            "error": raw_history["Error Message"]
+        }, status=HTTPStatus.TOO_MANY_REQUESTS)
+    else:
+        error = raw_history.get("Error Message", raw_history) if hasattr(
+            raw_history, "get") else raw_history
+        return JsonResponse({
+            "error": error or f"No stock {ticker.upper()} found"
+        }, status=HTTPStatus.BAD_REQUEST)
+
+
+def get_profile_error(raw_profile, ticker):
+    # profile should be an array with one element, return an error response if that's not the case
+    if isinstance(raw_profile, list) and len(raw_profile) >= 1:
+        return None
+    elif api.is_rate_limited(raw_profile):
+        return JsonResponse({
+            "error": raw_profile["Error Message"]
+        }, status=HTTPStatus.TOO_MANY_REQUESTS)
+    elif not raw_profile:
+        return JsonResponse({
+            "error": f"No stock {ticker.upper()} found"
+        }, status=HTTPStatus.BAD_REQUEST)
+    else:
+        error = raw_profile.get("Error Message", raw_profile) if hasattr(
+            raw_profile, "get") else raw_profile
+        return JsonResponse({
+            "error": error
+        }, status=HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -64,6 +64,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First so it times everything else
+    'stockapp.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,7 +84,8 @@ ROOT_URLCONF = 'stockhelper.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The same as DjangoTemplates, but each render is timed for the Server-Timing header
+        'BACKEND': 'stockapp.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'stockhelper/templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -118,6 +121,75 @@ if IS_PROD:
         conn_max_age=600, ssl_require=False)
 
 
+# Cache FMP responses so the same ticker isn't fetched repeatedly by different users
+# Use Redis in prod so the cache is shared between all the gunicorn workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 1000)),
+        },
+    }
+}
+
+if IS_PROD:
+    # Every worker shares the FMP responses, rate limit, and counters through Redis, whose add()
+    # and incr() are atomic. Set Redis' maxmemory-policy to volatile-lru so only entries with a
+    # timeout are evicted, never the counters and versions stored with timeout=None.
+    if "REDIS_URL" not in os.environ:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            "REDIS_URL must be set in prod, e.g. fly secrets set REDIS_URL=redis://...")
+
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# How long (in seconds) to cache each FMP endpoint, 0 disables caching
+# Quotes change throughout the day, but EOD history only changes once a day
+FMP_CACHE_TTL = {
+    'profile': int(os.environ.get('FMP_PROFILE_TTL', 60)),
+    'batch-quote': int(os.environ.get('FMP_QUOTE_TTL', 60)),
+    'historical-price-eod/full': int(os.environ.get('FMP_HISTORY_TTL', 60 * 60 * 6)),
+    'company-screener': int(os.environ.get('FMP_SCREENER_TTL', 60 * 15)),
+}
+
+# How long (in seconds) after the TTL an entry can still be served while it's refreshed in the
+# background, so popular screener searches never wait on FMP
+FMP_CACHE_STALE = {
+    'company-screener': int(os.environ.get('FMP_SCREENER_STALE', 60 * 60)),
+}
+
+# Size the FMP connection pool to the number of threads that could be calling FMP at once
+FMP_POOL_SIZE = int(os.environ.get('FMP_POOL_SIZE', 10))
+# Seconds to wait when connecting to and reading from FMP
+FMP_TIMEOUT = float(os.environ.get('FMP_TIMEOUT', 10))
+
+# passthrough calls FMP, record also saves the responses to FMP_RECORDINGS, and replay only
+# answers from FMP_RECORDINGS (e.g. to run the tests offline)
+FMP_TRANSPORT = os.environ.get('FMP_TRANSPORT', 'passthrough')
+FMP_RECORDINGS = Path(os.environ.get(
+    'FMP_RECORDINGS', BASE_DIR / 'stockapp' / 'fixtures' / 'recordings'))
+
+# Client-side FMP quota shared by all the workers, calls are spaced out before FMP rejects them
+FMP_RATE_LIMIT = {
+    'calls': int(os.environ.get('FMP_RATE_LIMIT_CALLS', 300)),
+    'period': int(os.environ.get('FMP_RATE_LIMIT_PERIOD', 60)),
+    'burst': int(os.environ.get('FMP_RATE_LIMIT_BURST', 10)),
+}
+# Max seconds a request will wait for the quota before returning a "rate limited" error
+FMP_RATE_LIMIT_WAIT = float(os.environ.get('FMP_RATE_LIMIT_WAIT', 5))
+
+# Stock prices younger than this many seconds are served from the database instead of FMP
+# Run "python manage.py refresh_quotes --interval <seconds>" to keep them fresh in the background
+QUOTE_MAX_AGE = int(os.environ.get('QUOTE_MAX_AGE', 60))
+# Seconds between price checks of each ticker watched by a price stream (see stockapp/stream.py)
+STREAM_INTERVAL = float(os.environ.get('STREAM_INTERVAL', 15))
+
+# Requests that take longer than this many milliseconds are logged as warnings
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Password validation
@@ -199,5 +271,12 @@ LOGGING = {
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
+        # Anything from the app, e.g. slow requests (see stockapp/timing.py)
+        # Set LOG_LEVEL=DEBUG to also log the timing of every request
+        'stockapp': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }
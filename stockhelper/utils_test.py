@@ -1,3 +1,12 @@
 # Don't name this file test*.py
+from unittest.mock import MagicMock
+
 USERNAME = "testuser"
 PASSWORD = "howtostock"
+
+
+def mock_response(json, status_code=200):
+    # A response from FMP, e.g. for api.get_session().get to return
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = json
+    return response